@@ -1,7 +1,9 @@
 import os
-import xml.etree.ElementTree as ET
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
+from fcd_store import open_fcd_store, vehicle_sorted
+from trajectory_analytics import trajectory_metrics, iter_vehicle_batches
 
 # Paths
 OUTPUT_DIR = r"D:/PhD/codingPractices/progress-report-dec-2024/outputs/french/"
@@ -13,53 +15,43 @@ ANALYSIS_FILE = os.path.join(OUTPUT_DIR, "french_simulation_analysis.csv")
 
 def parse_fcd_output(output_file):
     """
-    Parses the FCD output file and extracts vehicle trajectory data.
+    Streams the FCD output file into the memory-mapped trajectory store (see fcd_store.py).
 
     Args:
         output_file (str): Path to the FCD output XML file.
 
     Returns:
-        DataFrame: A pandas DataFrame containing trajectory data.
+        dict: The opened FCD store (columns time, vehicle, x, y, speed, edge).
     """
-    tree = ET.parse(output_file)
-    root = tree.getroot()
+    return open_fcd_store(output_file)
 
-    # Initialize storage for trajectory data
-    data = []
 
-    for timestep in root.findall("timestep"):
-        time = float(timestep.attrib["time"])
-        for vehicle in timestep.findall("vehicle"):
-            vehicle_id = vehicle.attrib["id"]
-            x = float(vehicle.attrib["x"])
-            y = float(vehicle.attrib["y"])
-            speed = float(vehicle.attrib["speed"])
-            data.append({"time": time, "vehicle_id": vehicle_id, "x": x, "y": y, "speed": speed})
-
-    # Convert to DataFrame
-    df = pd.DataFrame(data)
-    return df
-
-
-def analyze_trajectories(df):
+def analyze_trajectories(store):
     """
-    Performs basic analysis on vehicle trajectories.
+    Performs per-vehicle analysis of the trajectories (see trajectory_analytics.py).
+
+    The vehicle-sorted layout of the store is processed in batches of whole
+    vehicles, so memory stays bounded by the batch size.
 
     Args:
-        df (DataFrame): DataFrame containing trajectory data.
+        store (dict): FCD store from parse_fcd_output().
 
     Returns:
-        DataFrame: Summary statistics for each vehicle.
+        DataFrame: Summary statistics for each vehicle (Euclidean total_distance,
+            speeds and speed percentiles, stopped time, acceleration and jerk).
     """
-    # Group by vehicle and calculate statistics
-    summary = df.groupby("vehicle_id").agg(
-        total_distance=("x", lambda x: x.diff().abs().sum()),
-        avg_speed=("speed", "mean"),
-        max_speed=("speed", "max"),
-        total_time=("time", lambda t: t.max() - t.min()),
-    ).reset_index()
+    trajectories = vehicle_sorted(store)
+    offsets = trajectories["offsets"]
+
+    batches = []
+    for first, last in iter_vehicle_batches(offsets):
+        start, stop = offsets[first], offsets[last]
+        columns = [np.asarray(trajectories[name][start:stop]) for name in ("time", "x", "y", "speed")]
+        batches.append(trajectory_metrics(offsets[first:last + 1] - start, *columns))
 
-    return summary
+    summary = pd.concat(batches, ignore_index=True) if batches else pd.DataFrame()
+    summary.insert(0, "vehicle_id", trajectories["vehicle_ids"])
+    return summary.sort_values("vehicle_id").reset_index(drop=True)
 
 
 def plot_analysis(summary):
@@ -109,11 +101,11 @@ def plot_analysis(summary):
 def main():
     # Parse the output file
     print("Parsing simulation output...")
-    df = parse_fcd_output(OUTPUT_FILE)
+    store = parse_fcd_output(OUTPUT_FILE)
 
     # Perform analysis
     print("Analyzing trajectories...")
-    summary = analyze_trajectories(df)
+    summary = analyze_trajectories(store)
 
     # Print summary to the console
     print("\n=== Simulation Analysis Summary ===")
@@ -5,8 +5,11 @@ Parses SUMO simulation output files to compute performance KPIs for trains:
 - Total travel time per train
 - Average speed
 - Dwell time at each stop
-- Headway between trains at key stations
-- (Optional) emissions/energy placeholder
+- Headway between trains at every station and direction (see headway_engine.py)
+- (Optional) emissions/energy totals per train
+
+The output XML files are streamed once into Parquet tables (see
+sumo_output_reader.py); KPIs are computed on those columns.
 
 Saves results as CSVs in: outputs/kpi_results/
 
@@ -15,9 +18,10 @@ Author: GPT-4 + Onur | April 2025
 
 import os
 import logging
-import xml.etree.ElementTree as ET
+import numpy as np
 import pandas as pd
-from collections import defaultdict
+from sumo_output_reader import load_sumo_output
+from headway_engine import compute_headways as compute_station_headways, headway_distribution
 
 # -------------------------
 # Configuration
@@ -30,7 +34,7 @@ EMISSIONS_PATH = r"D:\PhD\codingPractices\progress-report-dec-2024\outputs\sumo\
 OUTPUT_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\outputs\kpi_results"
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
-KEY_STOPS = ["edge_8503000", "edge_8501120", "edge_8501008", "edge_8507000"]  # Example: Genève, Lausanne, Zürich HB, Basel SBB
+KEY_STOPS = ["edge_8503000", "edge_8501120", "edge_8501008", "edge_8507000"]  # Logged in detail: Genève, Lausanne, Zürich HB, Basel SBB
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
@@ -41,20 +45,17 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 
 def parse_tripinfo(file_path):
     logging.info("📈 Parsing tripinfo.xml...")
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-
-    rows = []
-    for trip in root.findall("tripinfo"):
-        vid = trip.attrib["id"]
-        depart = float(trip.attrib["depart"])
-        arrival = float(trip.attrib["arrival"])
-        duration = arrival - depart
-        speed = float(trip.attrib.get("speed", 0))
-        distance = float(trip.attrib.get("routeLength", 0))
-        rows.append([vid, depart, arrival, duration, distance, speed])
-
-    df = pd.DataFrame(rows, columns=["train_id", "depart", "arrival", "total_travel_time", "route_length", "average_speed"])
+    trips = load_sumo_output(file_path, "tripinfo", columns=["id", "depart", "arrival", "routeLength"])
+
+    df = pd.DataFrame({
+        "train_id": trips["id"],
+        "depart": trips["depart"],
+        "arrival": trips["arrival"],
+        "total_travel_time": trips["arrival"] - trips["depart"],
+        "route_length": trips["routeLength"].fillna(0),
+    })
+    # tripinfo has no speed attribute; the average speed follows from length and travel time
+    df["average_speed"] = (df["route_length"] / df["total_travel_time"]).where(df["total_travel_time"] > 0, 0.0)
     df.to_csv(os.path.join(OUTPUT_DIR, "travel_time.csv"), index=False)
     logging.info("💾 Saved: travel_time.csv")
     return df
@@ -66,58 +67,75 @@ def parse_tripinfo(file_path):
 
 def parse_stopinfo(file_path):
     logging.info("🚉 Parsing stopinfo.xml...")
-    tree = ET.parse(file_path)
-    root = tree.getroot()
-
-    rows = []
-    for stop in root.findall("stopinfo"):
-        train = stop.attrib["id"]
-        edge = stop.attrib["edge"]
-        arrival = float(stop.attrib["arrival"])
-        departure = float(stop.attrib["departure"])
-        duration = departure - arrival
-        rows.append([train, edge, arrival, departure, duration])
-
-    df = pd.DataFrame(rows, columns=["train_id", "stop_edge", "arrival_time", "departure_time", "dwell_time"])
+    stops = load_sumo_output(
+        file_path, "stopinfo", columns=["id", "lane", "edge", "started", "ended", "arrival", "departure"]
+    )
+
+    # Current SUMO versions write lane/started/ended instead of edge/arrival/departure
+    edge = stops["edge"].fillna(stops["lane"].str.rsplit("_", n=1).str[0])
+    arrival = stops["arrival"].fillna(stops["started"])
+    departure = stops["departure"].fillna(stops["ended"])
+
+    df = pd.DataFrame({
+        "train_id": stops["id"],
+        "stop_edge": edge,
+        "arrival_time": arrival,
+        "departure_time": departure,
+        "dwell_time": departure - arrival,
+    })
     df.to_csv(os.path.join(OUTPUT_DIR, "dwell_time.csv"), index=False)
     logging.info("💾 Saved: dwell_time.csv")
     return df
 
 
 # -------------------------
-# KPI 4: Headway at Key Stops
+# KPI 4: Headways at All Stations
 # -------------------------
 
 def compute_headways(stop_df):
-    logging.info("🔗 Computing headways at key stations...")
-    headways = []
-
-    for stop in KEY_STOPS:
-        df_key = stop_df[stop_df["stop_edge"] == stop].sort_values("arrival_time")
-        arrivals = df_key["arrival_time"].tolist()
-
-        for i in range(1, len(arrivals)):
-            gap = arrivals[i] - arrivals[i - 1]
-            headways.append([stop, arrivals[i], gap])
-
-    df_hw = pd.DataFrame(headways, columns=["station_edge", "arrival_time", "headway_sec"])
+    logging.info("🔗 Computing headways at all stations...")
+    df_hw = compute_station_headways(stop_df)
     df_hw.to_csv(os.path.join(OUTPUT_DIR, "headways.csv"), index=False)
     logging.info("💾 Saved: headways.csv")
+
+    summary = headway_distribution(df_hw)
+    summary.to_csv(os.path.join(OUTPUT_DIR, "headway_summary.csv"), index=False)
+    logging.info(f"💾 Saved: headway_summary.csv ({len(summary):,} station directions)")
+
+    for row in summary[summary["station_edge"].isin(KEY_STOPS)].itertuples():
+        logging.info(
+            f"🚉 {row.station_edge} ({row.direction}): min headway {row.min_headway_sec:.0f} s, "
+            f"median {row.headway_p50:.0f} s over {row.n_headways} headways"
+        )
     return df_hw
 
 
 # -------------------------
-# (Optional) KPI 5: Emissions (Placeholder)
+# (Optional) KPI 5: Emissions per Train
 # -------------------------
 
+EMISSION_COLUMNS = ["CO2", "CO", "HC", "NOx", "PMx", "fuel", "electricity"]
+
 def parse_emissions(file_path):
     if not os.path.exists(file_path):
         logging.warning("⚠️ emissions.xml not found. Skipping emissions KPI.")
         return None
 
-    logging.info("🌫️ Parsing emissions.xml... (not yet implemented in detail)")
-    # Implementation depends on SUMO vehicle emission settings
-    return None
+    logging.info("🌫️ Parsing emissions.xml...")
+    df = load_sumo_output(file_path, "emissions", columns=["time", "id"] + EMISSION_COLUMNS)
+    if df.empty:
+        logging.warning("⚠️ emissions.xml has no vehicle samples. Skipping emissions KPI.")
+        return None
+
+    # Values are rates (mg/s, Wh/s); totals are rates times the simulation step length
+    times = np.unique(df["time"].to_numpy())
+    step_length = float(np.median(np.diff(times))) if len(times) > 1 else 1.0
+    totals = df.groupby("id", sort=True)[EMISSION_COLUMNS].sum(min_count=1) * step_length
+    totals = totals.add_suffix("_total").rename_axis("train_id").reset_index()
+
+    totals.to_csv(os.path.join(OUTPUT_DIR, "emissions.csv"), index=False)
+    logging.info("💾 Saved: emissions.csv")
+    return totals
 
 
 # -------------------------
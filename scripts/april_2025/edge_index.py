@@ -0,0 +1,137 @@
+"""
+edge_index.py
+
+Reusable nearest-edge matcher for the April 2025 pipeline.
+Builds an STRtree over the projected rail edge geometries once and answers
+bulk nearest-edge queries (top-k candidates within a search radius) for all
+stops in a single call.
+
+Parsed geometries are cached as hex WKB in a sidecar .npz next to the edge CSV
+(one per id column, so callers keyed on different ID columns do not evict each
+other's cache), so the WKT parsing of rail_edges_named.csv only happens when the CSV changes.
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import logging
+import numpy as np
+import pandas as pd
+import shapely
+
+# --- Config ---
+PROJECTION = "EPSG:2056"
+SEARCH_RADIUS_METERS = 500
+TOP_K = 3
+
+
+def edge_index_cache_path(edge_path, id_column="edge_id_human"):
+    """Returns the sidecar cache path for a given edge CSV and ID column."""
+    return f"{os.path.splitext(edge_path)[0]}.{id_column}.edge_index.npz"
+
+
+def _source_key(edge_path, id_column):
+    stat = os.stat(edge_path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}:{id_column}"
+
+
+def _read_edge_geometries(edge_path, id_column, use_cache):
+    cache_path = edge_index_cache_path(edge_path, id_column)
+    source_key = _source_key(edge_path, id_column)
+
+    if use_cache and os.path.exists(cache_path):
+        with np.load(cache_path) as cached:
+            if str(cached["source_key"]) == source_key:
+                logging.info(f"⚡ Loaded edge index cache: {cache_path}")
+                return cached["edge_ids"], shapely.from_wkb(cached["wkb"])
+        logging.info("♻️ Edge CSV changed since last run. Rebuilding edge index cache...")
+
+    df = pd.read_csv(edge_path, usecols=[id_column, "geometry"], dtype={id_column: str})
+    df = df.dropna(subset=[id_column, "geometry"])
+    geometries = shapely.from_wkt(df["geometry"].to_numpy())
+    edge_ids = df[id_column].to_numpy(dtype=str)
+
+    if use_cache:
+        np.savez(
+            cache_path,
+            source_key=np.array(source_key),
+            edge_ids=edge_ids,
+            wkb=shapely.to_wkb(geometries, hex=True).astype(str),
+        )
+        logging.info(f"💾 Saved edge index cache: {cache_path}")
+
+    return edge_ids, geometries
+
+
+def load_edge_index(edge_path, id_column="edge_id_human", valid_edge_ids=None, use_cache=True):
+    """
+    Loads projected rail edges and builds an STRtree over their geometries.
+
+    Args:
+        edge_path (str): CSV with an edge id column and WKT geometry in EPSG:2056.
+        id_column (str): Column used as edge identifier in the results.
+        valid_edge_ids (set, optional): Restrict the index to these edge IDs
+            (e.g. the edges present in the compiled .net.xml).
+        use_cache (bool): Read/write the sidecar .npz geometry cache.
+
+    Returns:
+        dict: {"edge_ids": ndarray[str], "geometries": ndarray[Geometry], "tree": STRtree}
+    """
+    edge_ids, geometries = _read_edge_geometries(edge_path, id_column, use_cache)
+
+    if valid_edge_ids is not None:
+        mask = np.isin(edge_ids, list(valid_edge_ids))
+        logging.info(f"🔍 Keeping {mask.sum():,} of {len(edge_ids):,} edges present in the network.")
+        edge_ids, geometries = edge_ids[mask], geometries[mask]
+
+    tree = shapely.STRtree(geometries)
+    logging.info(f"🌲 Built STRtree over {len(geometries):,} edges.")
+    return {"edge_ids": edge_ids, "geometries": geometries, "tree": tree}
+
+
+def query_nearest_edges(index, points, search_radius=SEARCH_RADIUS_METERS, k=TOP_K):
+    """
+    Finds the k nearest edges within search_radius for every point in one bulk query.
+
+    Args:
+        index (dict): Result of load_edge_index().
+        points (array-like): Point geometries in the same CRS as the index.
+        search_radius (float): Maximum stop-to-edge distance in meters.
+        k (int): Number of candidates to keep per point.
+
+    Returns:
+        pd.DataFrame: point_idx, rank, edge_id, edge_idx (position in the index), distance —
+            sorted by point and distance.
+            Points without any edge inside the radius do not appear.
+    """
+    points = np.asarray(points, dtype=object)
+    point_idx, edge_idx = index["tree"].query(points, predicate="dwithin", distance=search_radius)
+    distances = shapely.distance(points[point_idx], index["geometries"][edge_idx])
+
+    order = np.lexsort((distances, point_idx))
+    point_idx, edge_idx, distances = point_idx[order], edge_idx[order], distances[order]
+
+    # Rank of each candidate inside its point group
+    group_starts = np.flatnonzero(np.r_[True, point_idx[1:] != point_idx[:-1]]) if len(point_idx) else np.array([], dtype=int)
+    group_sizes = np.diff(np.r_[group_starts, len(point_idx)])
+    rank = np.arange(len(point_idx)) - np.repeat(group_starts, group_sizes)
+    keep = rank < k
+
+    return pd.DataFrame({
+        "point_idx": point_idx[keep],
+        "rank": rank[keep],
+        "edge_id": index["edge_ids"][edge_idx[keep]],
+        "edge_idx": edge_idx[keep],
+        "distance": distances[keep],
+    })
+
+
+def nearest_edge_ids(index, points, search_radius=SEARCH_RADIUS_METERS):
+    """
+    Returns the closest edge ID per point (None where nothing lies within search_radius).
+    """
+    candidates = query_nearest_edges(index, points, search_radius=search_radius, k=1)
+    result = np.full(len(points), None, dtype=object)
+    result[candidates["point_idx"].to_numpy()] = candidates["edge_id"].to_numpy()
+    return result
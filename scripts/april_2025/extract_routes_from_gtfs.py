@@ -10,14 +10,22 @@ Extracts Swiss intercity train routes from GTFS data and summarizes:
 Output:
 - cleaned_routes_summary.csv (all routes)
 - top_intercity_candidates.csv (filtered high-volume routes)
-- individual route stop sequences saved as separate files
+- individual route stop sequences saved as separate files (written in parallel),
+  or as one partitioned Parquet dataset when EXPORT_AS_DATASET is set
+
+The per-route export joins stop_times with stops once and groups once,
+instead of re-filtering the full tables for every route.
 
 Author: GPT-4 + Onur, April 2025
 """
 
-import pandas as pd
 import logging
 import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "route_extraction"))
+from gtfs_store import load_gtfs_table, load_stop_times
 
 # Setup logging
 logging.basicConfig(
@@ -27,23 +35,60 @@ logging.basicConfig(
 
 # Paths
 GTFS_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\data\raw\swiss\gtfs_ftp_2025"
+GTFS_STORE_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\gtfs_store"
 OUTPUT_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes"
+DATASET_DIR = os.path.join(OUTPUT_DIR, "intercity_route_stops")
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# Export options
+EXPORT_AS_DATASET = False  # True -> one Parquet dataset partitioned by route_id instead of CSV files
+EXPORT_WORKERS = os.cpu_count()
+
+
+def write_route_stops(route_id, stop_seq):
+    """Worker: writes the stop sequence of one route to route_<route_id>_stops.csv."""
+    stop_seq.to_csv(os.path.join(OUTPUT_DIR, f"route_{route_id}_stops.csv"), index=False)
+    return route_id
+
+
+def export_route_stop_sequences(intercity_routes, trips, stop_times, stops):
+    """
+    Exports the stop sequence of the first trip of every candidate route
+    with one join and one groupby over all routes.
+    """
+    first_trips = trips[trips["route_id"].isin(intercity_routes["route_id"])]
+    first_trips = first_trips.drop_duplicates("route_id")[["route_id", "trip_id"]].astype("string")
+
+    export = stop_times[stop_times["trip_id"].isin(first_trips["trip_id"])].astype({"trip_id": "string"})
+    export = export.merge(first_trips, on="trip_id", how="inner")
+    export = export.sort_values(["route_id", "stop_sequence"], kind="stable")
+    export = export.merge(stops, on="stop_id", how="left")
+
+    if EXPORT_AS_DATASET:
+        export.to_parquet(DATASET_DIR, index=False, partition_cols=["route_id"])
+        logging.info(f"💾 Saved {export['route_id'].nunique()} routes to dataset: {DATASET_DIR}")
+        return
+
+    groups = [(route_id, group.drop(columns="route_id")) for route_id, group in export.groupby("route_id", sort=False)]
+    with ProcessPoolExecutor(max_workers=EXPORT_WORKERS) as pool:
+        for route_id in pool.map(write_route_stops, *zip(*groups)) if groups else []:
+            logging.debug(f"💾 Saved route_{route_id}_stops.csv")
+    logging.info(f"💾 Saved {len(groups)} route stop sequence files to: {OUTPUT_DIR}")
+
+
 def main():
-    logging.info("📥 Loading GTFS files...")
-    routes = pd.read_csv(os.path.join(GTFS_DIR, "routes.txt"))
-    trips = pd.read_csv(os.path.join(GTFS_DIR, "trips.txt"))
-    stop_times = pd.read_csv(os.path.join(GTFS_DIR, "stop_times.txt"))
-    stops = pd.read_csv(os.path.join(GTFS_DIR, "stops.txt"))
+    logging.info("📥 Loading GTFS tables from store...")
+    store = {"gtfs_dir": GTFS_DIR, "store_dir": GTFS_STORE_DIR}
+    routes = load_gtfs_table("routes", **store)
+    trips = load_gtfs_table("trips", **store)
+    stop_times = load_stop_times(
+        columns=["trip_id", "stop_id", "stop_sequence", "arrival_time", "departure_time"], **store
+    )
+    stops = load_gtfs_table("stops", **store)
 
     logging.info("🔗 Merging trips with route info...")
     trip_route = trips.merge(routes, on="route_id", how="left")
 
-    logging.info("📌 Grouping stop sequences...")
-    stop_times_sorted = stop_times.sort_values(["trip_id", "stop_sequence"])
-    trip_stops = stop_times_sorted.groupby("trip_id")["stop_id"].apply(list).reset_index()
-
     logging.info("🔍 Counting trips per route...")
     route_trip_counts = trip_route["route_id"].value_counts().rename("trip_count").reset_index()
     route_trip_counts.columns = ["route_id", "trip_count"]
@@ -60,17 +105,7 @@ def main():
 
     logging.info(f"✅ Found {len(intercity_routes)} intercity candidates.")
     logging.info("🔄 Saving individual route stop sequences for inspection...")
-
-    for _, route_row in intercity_routes.iterrows():
-        route_id = route_row["route_id"]
-        trip_ids = trips[trips["route_id"] == route_id]["trip_id"].unique()
-        if len(trip_ids) == 0:
-            continue
-        one_trip_id = trip_ids[0]
-        stop_seq = stop_times_sorted[stop_times_sorted["trip_id"] == one_trip_id].merge(
-            stops, on="stop_id", how="left"
-        )
-        stop_seq.to_csv(os.path.join(OUTPUT_DIR, f"route_{route_id}_stops.csv"), index=False)
+    export_route_stop_sequences(intercity_routes, trips, stop_times, stops)
 
     logging.info("🎯 Phase 1 complete: Real-world routes extracted.")
 
@@ -14,6 +14,7 @@ Output:
 """
 
 import os
+import sys
 import subprocess
 import logging
 
@@ -44,8 +45,9 @@ def main():
         subprocess.run(cmd, check=True)
         logging.info(f"✅ Network generated: {OUTPUT_FILE}")
         logging.info("🎉 Phase 5 complete. Ready to inspect in SUMO-GUI or run validation.")
-    except subprocess.CalledProcessError as e:
+    except subprocess.CalledProcessError:
         logging.error("❌ netconvert failed!", exc_info=True)
+        sys.exit(1)
 
 if __name__ == "__main__":
     main()
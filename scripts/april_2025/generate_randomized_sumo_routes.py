@@ -13,14 +13,20 @@ Output:
 - selected_intercity_routes.rou.xml
 - vehicle_types.veh.xml
 
+Both files are streamed to disk element by element (see sumo_xml.py).
+
+All random draws go through one random.Random(SEED), so a seed reproduces the
+same scenario. generate_route_file() also takes the dwell range, a vehicle mix
+and several trains per route at randomized headways (used by scenario_sweep.py).
+
 Author: GPT-4 + Onur | April 2025
 """
 
 import os
 import random
 import logging
-import xml.etree.ElementTree as ET
 import pandas as pd
+from sumo_xml import open_sumo_xml, write_element, start_element, end_element
 
 # -------------------------
 # Configuration
@@ -41,33 +47,49 @@ DEPARTURE_START = 6 * 3600  # 06:00 in seconds
 DEPARTURE_END = 10 * 3600   # 10:00 in seconds
 DWELL_MIN = 30  # seconds
 DWELL_MAX = 90  # seconds
+SEED = None  # None -> different realization on every run
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 
 def generate_vehicle_type_xml():
     logging.info("🚧 Generating vehicle types...")
-    root = ET.Element("vTypeDistribution", id="train_types")
-
-    for veh_id, attrs in VEHICLE_TYPES.items():
-        vtype = ET.SubElement(root, "vType", id=veh_id, **attrs)
-        vtype.set("vClass", "rail")
+    with open_sumo_xml(VEHICLE_OUTPUT, "vTypeDistribution", {"id": "train_types"}) as f:
+        for veh_id, attrs in VEHICLE_TYPES.items():
+            write_element(f, "vType", {"id": veh_id, **attrs, "vClass": "rail"})
 
-    tree = ET.ElementTree(root)
-    tree.write(VEHICLE_OUTPUT, encoding="utf-8", xml_declaration=True)
     logging.info(f"💾 Saved vehicle types to: {VEHICLE_OUTPUT}")
 
 
-def generate_route_file():
+def generate_route_file(route_output=ROUTE_OUTPUT, rng=None, dwell_range=(DWELL_MIN, DWELL_MAX),
+                        vehicle_mix=None, trains_per_route=1, headway_range=None):
+    """
+    Writes one vehicle per route (trains_per_route > 1: a train sequence following the first one).
+
+    Vehicles are written sorted by departure time (ties by trip number), as SUMO expects.
+
+    Args:
+        route_output (str): Output .rou.xml path.
+        rng (random.Random, optional): Source of all random draws (default: seeded with SEED).
+        dwell_range (tuple): Min/max dwell time (s) per stop.
+        vehicle_mix (dict, optional): Vehicle type -> weight; by default IC routes get
+            ic_double_deck and all others ir_single_deck.
+        trains_per_route (int): Trains per route.
+        headway_range (tuple, optional): Min/max headway (s) between consecutive trains of a route
+            (required when trains_per_route > 1).
+
+    Returns:
+        int: Number of vehicles written.
+    """
+    if trains_per_route > 1 and headway_range is None:
+        raise ValueError("headway_range is required when trains_per_route > 1")
+    rng = rng or random.Random(SEED)
     logging.info("🚧 Generating .rou.xml route file...")
-    root = ET.Element("routes")
 
-    # Reference vehicle types
-    for veh_id, attrs in VEHICLE_TYPES.items():
-        ET.SubElement(root, "vType", id=veh_id, **attrs, vClass="rail")
-
-    trip_id = 0
-    for file in os.listdir(STOP_SEQ_DIR):
+    # Draw all vehicles first: SUMO loads route files incrementally and skips
+    # vehicles that are not sorted by departure time.
+    vehicles = []
+    for file in sorted(os.listdir(STOP_SEQ_DIR)):
         if not file.endswith(".csv"):
             continue
 
@@ -77,29 +99,43 @@ def generate_route_file():
             logging.warning(f"⚠️ Skipping route {route_id}: too few stops.")
             continue
 
-        edge_list = [f"edge_{stop_id}" for stop_id in df["stop_id"].tolist()]
-        route_str = " ".join(edge_list)
+        route_str = " ".join(f"edge_{stop_id}" for stop_id in df["stop_id"])
+
+        # Departure time of the first train
+        depart = rng.randint(DEPARTURE_START, DEPARTURE_END)
+
+        for train in range(trains_per_route):
+            if train:
+                depart += rng.randint(*headway_range)
 
-        # Assign vehicle type
-        veh_type = "ic_double_deck" if "IC" in route_id else "ir_single_deck"
+            # Assign vehicle type
+            if vehicle_mix:
+                veh_type = rng.choices(list(vehicle_mix), weights=list(vehicle_mix.values()))[0]
+            else:
+                veh_type = "ic_double_deck" if "IC" in route_id else "ir_single_deck"
 
-        # Departure time
-        depart = random.randint(DEPARTURE_START, DEPARTURE_END)
+            # Stops with dwell times
+            stops = [(stop_id, rng.randint(*dwell_range)) for stop_id in df["stop_id"]]
+            vehicles.append({"trip_id": len(vehicles), "depart": depart, "type": veh_type,
+                             "edges": route_str, "stops": stops})
 
-        # Define vehicle
-        veh_elem = ET.SubElement(root, "vehicle", id=f"train_{trip_id}", type=veh_type, depart=str(depart))
-        ET.SubElement(veh_elem, "route", edges=route_str)
+    vehicles.sort(key=lambda vehicle: (vehicle["depart"], vehicle["trip_id"]))
 
-        # Add stops with dwell times
-        for stop_id in df["stop_id"]:
-            ET.SubElement(veh_elem, "stop", lane=f"edge_{stop_id}_0",
-                          duration=str(random.randint(DWELL_MIN, DWELL_MAX)))
+    with open_sumo_xml(route_output, "routes") as f:
+        # Reference vehicle types
+        for veh_id, attrs in VEHICLE_TYPES.items():
+            write_element(f, "vType", {"id": veh_id, **attrs, "vClass": "rail"})
 
-        trip_id += 1
+        for vehicle in vehicles:
+            start_element(f, "vehicle", {"id": f"train_{vehicle['trip_id']}", "type": vehicle["type"],
+                                         "depart": vehicle["depart"]})
+            write_element(f, "route", {"edges": vehicle["edges"]}, depth=2)
+            for stop_id, duration in vehicle["stops"]:
+                write_element(f, "stop", {"lane": f"edge_{stop_id}_0", "duration": duration}, depth=2)
+            end_element(f, "vehicle")
 
-    tree = ET.ElementTree(root)
-    tree.write(ROUTE_OUTPUT, encoding="utf-8", xml_declaration=True)
-    logging.info(f"💾 Saved route file to: {ROUTE_OUTPUT}")
+    logging.info(f"💾 Saved route file to: {route_output}")
+    return len(vehicles)
 
 
 def main():
@@ -0,0 +1,289 @@
+"""
+map_matching.py
+
+HMM map matching of GTFS traces (shapes.txt point sequences or stop sequences)
+onto the rail edges of the compiled .net.xml.
+
+Snapping every point to its nearest edge independently picks parallel tracks
+and sidings. Here every trace is matched as a whole with a hidden Markov model
+(Newson & Krumm style):
+
+- States: the CANDIDATES_PER_POINT nearest edges of every point, taken from the
+  STRtree edge index in one bulk query over all points of all traces.
+- Emission: Gaussian in the point-to-edge distance, scored for all candidates
+  at once with NumPy.
+- Transition: exponential in |network distance - straight-line distance|
+  between consecutive candidates. Network distances come from a bounded
+  Dijkstra per source edge (route_completion.reachable_edges), memoized, so
+  every edge is expanded at most once per worker.
+- Decoding: Viterbi; when no candidate pair of two consecutive points is
+  connected the model restarts at the second point (an HMM break).
+
+The decoded edges are connected with shortest paths (route_completion.complete_route).
+
+Input:
+- GTFS shapes.txt
+- Compiled SUMO network and rail_edges_named.csv (edge geometries, EPSG:2056)
+
+Output:
+- data/processed/routes/shape_edge_sequences.csv (shape_id, n_points, n_dropped_points,
+  n_breaks, n_edges, n_gaps, edges)
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import sys
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import shapely
+from edge_index import load_edge_index, query_nearest_edges
+from net_reader import load_edge_ids
+from route_completion import init_route_completion, edge_graph, reachable_edges, complete_route
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocess"))
+from projection import pyproj_projector
+
+# --- Config ---
+SHAPES_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\raw\swiss\gtfs_ftp_2025\shapes.txt"
+EDGE_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\rail_edges_named.csv"
+NET_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\april_2025_swiss\april_2025_swiss.net.xml"
+OUTPUT_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\shape_edge_sequences.csv"
+
+PROJECTION = "EPSG:2056"
+CANDIDATE_RADIUS_METERS = 200  # Points without an edge inside this radius are dropped
+CANDIDATES_PER_POINT = 5
+GPS_SIGMA_METERS = 25  # Std. dev. of the point-to-track distance
+TRANSITION_BETA_METERS = 100  # Tolerated detour between network and straight-line distance
+BACKWARD_TOLERANCE_METERS = GPS_SIGMA_METERS  # Larger moves against the edge direction are not drivable
+TRANSITION_LIMIT_METERS = 50_000  # Bounded Dijkstra radius per candidate edge
+MATCHING_WORKERS = os.cpu_count()
+TRACES_PER_TASK = 32
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+def load_shape_traces(shapes_path):
+    """Reads GTFS shapes.txt into a trace table: trace_id, lon, lat (in shape_pt_sequence order)."""
+    shapes = pd.read_csv(
+        shapes_path,
+        usecols=["shape_id", "shape_pt_lat", "shape_pt_lon", "shape_pt_sequence"],
+        dtype={"shape_id": str},
+    )
+    shapes = shapes.sort_values(["shape_id", "shape_pt_sequence"], kind="stable")
+    return pd.DataFrame({
+        "trace_id": shapes["shape_id"].to_numpy(),
+        "lon": shapes["shape_pt_lon"].to_numpy(),
+        "lat": shapes["shape_pt_lat"].to_numpy(),
+    })
+
+
+def stop_sequence_traces(route_stops, stops_df):
+    """
+    Builds a trace table from stop sequences.
+
+    Args:
+        route_stops (dict): route_id -> list of stop IDs.
+        stops_df (pd.DataFrame): GTFS stops with stop_id, stop_lat, stop_lon.
+    """
+    sequences = pd.DataFrame(
+        [(route_id, stop_id) for route_id, stop_ids in route_stops.items() for stop_id in stop_ids],
+        columns=["trace_id", "stop_id"],
+    )
+    coords = stops_df.drop_duplicates("stop_id").set_index("stop_id")
+    sequences = sequences.join(coords[["stop_lon", "stop_lat"]], on="stop_id", how="inner")
+    return sequences.rename(columns={"stop_lon": "lon", "stop_lat": "lat"})[["trace_id", "lon", "lat"]]
+
+
+def score_candidates(traces, edge_index):
+    """
+    Finds the candidate edges of all trace points and scores their emissions in bulk.
+
+    Returns:
+        pd.DataFrame: one row per candidate (trace_id, point, edge_id, offset, length,
+            x, y, emission), sorted by trace and point. point numbers the kept
+            points of a trace in order.
+    """
+    traces = traces.reset_index(drop=True)
+    xy = pyproj_projector("EPSG:4326", PROJECTION)(traces[["lon", "lat"]].to_numpy(dtype=np.float64))
+    points = shapely.points(xy)
+
+    candidates = query_nearest_edges(edge_index, points, search_radius=CANDIDATE_RADIUS_METERS, k=CANDIDATES_PER_POINT)
+    point_idx = candidates["point_idx"].to_numpy()
+    geometries = edge_index["geometries"][candidates["edge_idx"].to_numpy()]
+
+    scored = pd.DataFrame({
+        "trace_id": traces["trace_id"].to_numpy()[point_idx],
+        "point": point_idx,
+        "edge_id": candidates["edge_id"].to_numpy(),
+        "offset": shapely.line_locate_point(geometries, points[point_idx]),
+        "length": shapely.length(geometries),
+        "x": xy[point_idx, 0],
+        "y": xy[point_idx, 1],
+        "emission": -0.5 * np.square(candidates["distance"].to_numpy() / GPS_SIGMA_METERS),
+    })
+
+    # Renumber the kept points per trace so consecutive points are consecutive integers
+    scored["point"] = scored.groupby("trace_id", sort=False)["point"].rank(method="dense").astype(np.int64) - 1
+    logging.info(f"🎯 {len(scored):,} candidates for {len(traces):,} points ({scored['trace_id'].nunique():,} traces).")
+    return scored
+
+
+def transition_scores(prev, cur, nodes, edges, offsets, lengths, xy):
+    """
+    Log transition scores from the candidates prev of one point to the candidates cur of the next.
+
+    Returns:
+        np.ndarray: (len(prev), len(cur)); -inf where the candidates are not connected.
+    """
+    straight = np.hypot(*(xy[cur[0]] - xy[prev[0]]))
+    routed = np.full((len(prev), len(cur)), np.inf)
+
+    for row, i in enumerate(prev):
+        # Along the same edge; small backward moves are positioning noise
+        same = edges[cur] == edges[i]
+        advance = offsets[cur] - offsets[i]
+        along = same & (advance > -BACKWARD_TOLERANCE_METERS)
+        routed[row, along] = np.abs(advance[along])
+        if nodes[i] < 0:
+            continue
+        reached, dist = reachable_edges(edges[i], TRANSITION_LIMIT_METERS)
+        pos = np.minimum(np.searchsorted(reached, nodes[cur]), len(reached) - 1)
+        found = ~same & (reached[pos] == nodes[cur])
+        # Rest of edge i, then the network distance to the end of the next edge, back to the offset
+        routed[row, found] = np.maximum(
+            lengths[i] - offsets[i] + dist[pos[found]] - lengths[cur[found]] + offsets[cur[found]], 0
+        )
+
+    return np.where(np.isfinite(routed), -np.abs(routed - straight) / TRANSITION_BETA_METERS, -np.inf)
+
+
+def viterbi(groups, nodes, edges, offsets, lengths, xy, emission):
+    """
+    Decodes the most likely candidate of every point.
+
+    Args:
+        groups (list): Candidate index arrays, one per point in trace order.
+
+    Returns:
+        tuple: (chosen candidate index per point, number of HMM breaks)
+    """
+    score = np.full(len(edges), -np.inf)
+    back = np.full(len(edges), -1, dtype=np.int64)
+    score[groups[0]] = emission[groups[0]]
+    breaks = 0
+
+    for prev, cur in zip(groups, groups[1:]):
+        total = score[prev, None] + transition_scores(prev, cur, nodes, edges, offsets, lengths, xy)
+        best = np.argmax(total, axis=0)
+        best_score = total[best, np.arange(len(cur))]
+        if np.isfinite(best_score).any():
+            score[cur] = best_score + emission[cur]
+            back[cur] = np.where(np.isfinite(best_score), prev[best], -1)
+        else:
+            breaks += 1
+            score[cur] = emission[cur]
+
+    chosen = []
+    g = len(groups) - 1
+    while g >= 0:
+        c = groups[g][np.argmax(score[groups[g]])]
+        chosen.append(c)
+        g -= 1
+        while back[c] >= 0:
+            c = back[c]
+            chosen.append(c)
+            g -= 1
+    return chosen[::-1], breaks
+
+
+def match_trace(item):
+    """Matches one trace (trace_id, candidate arrays) and returns trace_id, ((edge list, gaps), breaks)."""
+    trace_id, (point, edges, offsets, lengths, xy, emission) = item
+    starts = np.flatnonzero(np.r_[True, point[1:] != point[:-1]])
+    groups = np.split(np.arange(len(point)), starts[1:])
+    nodes = edge_graph()["nodes"].get_indexer(edges)
+
+    chosen, breaks = viterbi(groups, nodes, edges, offsets, lengths, xy, emission)
+    return trace_id, (complete_route(list(edges[chosen])), breaks)
+
+
+def _trace_items(scored):
+    for trace_id, group in scored.groupby("trace_id", sort=False):
+        yield trace_id, (
+            group["point"].to_numpy(),
+            group["edge_id"].to_numpy(dtype=object),
+            group["offset"].to_numpy(),
+            group["length"].to_numpy(),
+            group[["x", "y"]].to_numpy(),
+            group["emission"].to_numpy(),
+        )
+
+
+def match_traces(traces, edge_index, net_path, workers=MATCHING_WORKERS):
+    """
+    Map-matches many traces at once.
+
+    Args:
+        traces (pd.DataFrame): trace_id, lon, lat; points of a trace in order.
+        edge_index (dict): Result of edge_index.load_edge_index (restricted to network edges).
+        net_path (str): Compiled SUMO .net.xml.
+        workers (int): Worker processes (1 -> run in this process).
+
+    Returns:
+        tuple: (trace_id -> (continuous edge list, number of unconnected edge pairs), like
+                route_completion.complete_routes; report DataFrame with one row per input trace:
+                trace_id, n_points, n_dropped_points (no candidate edge within
+                CANDIDATE_RADIUS_METERS), n_breaks, n_edges, n_gaps).
+                Traces without any matched point are missing from the first dict.
+    """
+    scored = score_candidates(traces, edge_index)
+    items = list(_trace_items(scored))
+    logging.info(f"🧭 Map-matching {len(items):,} traces...")
+
+    if workers is None or workers <= 1 or len(items) <= TRACES_PER_TASK:
+        init_route_completion(net_path)
+        matched = dict(map(match_trace, items))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_route_completion, initargs=(net_path,)) as pool:
+            matched = dict(pool.map(match_trace, items, chunksize=TRACES_PER_TASK))
+
+    n_points = traces.groupby("trace_id", sort=False).size()
+    n_matched_points = scored.groupby("trace_id", sort=False)["point"].nunique().reindex(n_points.index, fill_value=0)
+    report = pd.DataFrame({
+        "trace_id": n_points.index,
+        "n_points": n_points.to_numpy(),
+        "n_dropped_points": (n_points - n_matched_points).to_numpy(),
+    })
+    report["n_breaks"] = report["trace_id"].map(lambda t: matched[t][1] if t in matched else 0)
+    report["n_edges"] = report["trace_id"].map(lambda t: len(matched[t][0][0]) if t in matched else 0)
+    report["n_gaps"] = report["trace_id"].map(lambda t: matched[t][0][1] if t in matched else 0)
+
+    logging.info(
+        f"✅ Matched {len(matched):,} traces ({report['n_breaks'].sum():,} HMM breaks, "
+        f"{report['n_dropped_points'].sum():,} points without a candidate edge)."
+    )
+    return {trace_id: result for trace_id, (result, _) in matched.items()}, report
+
+
+def main():
+    logging.info("📍 Loading rail edge index...")
+    edge_index = load_edge_index(EDGE_FILE, id_column="edge_id_human", valid_edge_ids=load_edge_ids(NET_FILE))
+
+    logging.info(f"📥 Loading GTFS shapes: {SHAPES_FILE}")
+    traces = load_shape_traces(SHAPES_FILE)
+
+    matched, report = match_traces(traces, edge_index, NET_FILE)
+    os.makedirs(os.path.dirname(OUTPUT_FILE), exist_ok=True)
+    edges = pd.Series({trace_id: " ".join(edge_ids) for trace_id, (edge_ids, _) in matched.items()}, dtype=object)
+    report.assign(edges=report["trace_id"].map(edges).fillna("")).rename(columns={"trace_id": "shape_id"}).to_csv(
+        OUTPUT_FILE, index=False
+    )
+    logging.info(f"💾 Saved matched edge sequences to: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
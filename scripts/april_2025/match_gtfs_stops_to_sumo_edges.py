@@ -2,6 +2,11 @@
 match_gtfs_stops_to_sumo_edges.py
 
 Robust version: maps GTFS stops to SUMO edges, ensures all edge_ids are valid according to .net.xml.
+All stops of all routes are projected once and matched in a single bulk query
+against the STRtree edge index (see edge_index.py). The matched stop edges are
+then connected into continuous routes over the network (see route_completion.py).
+With MATCHING_METHOD = "hmm" the stop sequences are map-matched as a whole
+instead (see map_matching.py), which avoids snapping stops to parallel tracks.
 Author: GPT-4 + Onur | April 2025
 """
 
@@ -9,9 +14,11 @@ import os
 import glob
 import pandas as pd
 import geopandas as gpd
-from shapely.geometry import Point
 import logging
-import xml.etree.ElementTree as ET
+from edge_index import load_edge_index, nearest_edge_ids
+from net_reader import load_edge_ids
+from route_completion import complete_routes, route_path_summary
+from map_matching import CANDIDATE_RADIUS_METERS, match_traces, stop_sequence_traces
 
 # ----------------------------------------
 # Config paths
@@ -21,9 +28,12 @@ STOPS_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\raw\swiss\gt
 EDGE_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\rail_edges_named.csv"
 NET_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\april_2025_swiss\april_2025_swiss.net.xml"
 OUTPUT_FOLDER = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\mapped_rou"
+COMPLETION_SUMMARY = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\route_completion_summary.csv"
 os.makedirs(OUTPUT_FOLDER, exist_ok=True)
 
 PROJECTION = "EPSG:2056"
+SEARCH_RADIUS_METERS = 500  # Stops farther than this from any valid edge are skipped
+MATCHING_METHOD = "hmm"  # "hmm" (map-match whole stop sequences) or "nearest" (snap stops independently)
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 
@@ -31,23 +41,20 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 # Load known edges from .net.xml
 # ----------------------------------------
 def load_valid_edge_ids(net_path):
-    tree = ET.parse(net_path)
-    root = tree.getroot()
-    return {edge.attrib['id'] for edge in root.findall(".//edge") if 'id' in edge.attrib}
+    return load_edge_ids(net_path)
 
 
-def load_edges(edge_path):
-    df = pd.read_csv(edge_path)
-    df = df.dropna(subset=["geometry"])
-    df["geometry"] = gpd.GeoSeries.from_wkt(df["geometry"])
-    return gpd.GeoDataFrame(df, geometry="geometry", crs=PROJECTION)
-
-
-def find_closest_edge(point, edge_gdf, valid_edge_ids):
-    distances = edge_gdf.distance(point)
-    idx = distances.idxmin()
-    edge_id = edge_gdf.loc[idx, "edge_id_human"]
-    return edge_id if edge_id in valid_edge_ids else None
+def match_stops_to_edges(stops_df, edge_index):
+    """
+    Projects all stops once and returns a stop_id -> closest valid edge_id mapping.
+    Stops without a valid edge inside SEARCH_RADIUS_METERS map to None.
+    """
+    stop_points = gpd.GeoSeries(
+        gpd.points_from_xy(stops_df["stop_lon"], stops_df["stop_lat"]),
+        crs="EPSG:4326"
+    ).to_crs(PROJECTION)
+    edge_ids = nearest_edge_ids(edge_index, stop_points, search_radius=SEARCH_RADIUS_METERS)
+    return dict(zip(stops_df["stop_id"], edge_ids))
 
 
 def build_route_file(route_id, edge_ids, output_path):
@@ -59,51 +66,103 @@ def build_route_file(route_id, edge_ids, output_path):
         f.write("</routes>\n")
 
 
-def main():
-    logging.info("📍 Loading rail edges...")
-    edge_gdf = load_edges(EDGE_FILE)
+def snap_and_complete(route_stops, stops_df, edge_index):
+    """Snaps every stop to its nearest edge and connects consecutive stop edges."""
+    used_stop_ids = {sid for stop_ids in route_stops.values() for sid in stop_ids}
+    used_stops = stops_df[stops_df["stop_id"].isin(used_stop_ids)].drop_duplicates("stop_id")
+    logging.info(f"🔗 Matching {len(used_stops):,} unique stops from {len(route_stops)} routes...")
+    stop_to_edge = match_stops_to_edges(used_stops, edge_index)
+
+    route_stop_edges = {}
+    for route_id, stop_ids in route_stops.items():
+        logging.info(f"🔁 Processing route: {route_id}")
+
+        if any(sid not in stop_to_edge for sid in stop_ids):
+            logging.warning(f"⚠️ Skipping {route_id} — missing coordinates.")
+            continue
+
+        edge_ids = []
+        for sid in stop_ids:
+            edge_id = stop_to_edge[sid]
+            if edge_id:
+                edge_ids.append(edge_id)
+            else:
+                logging.warning(f"⚠️ Skipping stop {sid} — no valid edge within {SEARCH_RADIUS_METERS} m.")
+
+        if len(edge_ids) < 2:
+            logging.warning(f"⚠️ Skipping {route_id} — not enough valid edges.")
+            continue
+
+        route_stop_edges[route_id] = edge_ids
+
+    # --- Connect consecutive stop edges into continuous routes ---
+    return complete_routes(route_stop_edges, NET_FILE)
+
+
+def map_match_routes(route_stops, stops_df, edge_index):
+    """Map-matches the stop sequences of all routes; routes with unusable stops are skipped or flagged."""
+    known_stops = set(stops_df["stop_id"])
+    usable = {}
+    for route_id, stop_ids in route_stops.items():
+        if any(sid not in known_stops for sid in stop_ids):
+            logging.warning(f"⚠️ Skipping {route_id} — missing coordinates.")
+            continue
+        usable[route_id] = stop_ids
+
+    logging.info(f"🧭 Map-matching stop sequences of {len(usable)} routes...")
+    matched, report = match_traces(stop_sequence_traces(usable, stops_df), edge_index, NET_FILE)
+
+    completed = {}
+    for row in report.itertuples():
+        if row.n_points - row.n_dropped_points < 2:
+            logging.warning(f"⚠️ Skipping {row.trace_id} — not enough stops within reach of a valid edge.")
+            continue
+        if row.n_dropped_points:
+            logging.warning(
+                f"⚠️ {row.trace_id}: {row.n_dropped_points} stop(s) without a valid edge within "
+                f"{CANDIDATE_RADIUS_METERS} m are not on the route."
+            )
+        if row.n_breaks:
+            logging.warning(f"⚠️ {row.trace_id}: {row.n_breaks} HMM break(s) — consecutive stops not connected.")
+        completed[row.trace_id] = matched[row.trace_id]
+    return completed
+
 
+def main():
     logging.info("📥 Loading valid SUMO edge IDs from .net.xml...")
     valid_edge_ids = load_valid_edge_ids(NET_FILE)
     logging.info(f"✅ Loaded {len(valid_edge_ids):,} valid edge IDs")
 
+    logging.info("📍 Loading rail edge index...")
+    edge_index = load_edge_index(EDGE_FILE, id_column="edge_id_human", valid_edge_ids=valid_edge_ids)
+
     logging.info("📥 Loading GTFS stop coordinates...")
     stops_df = pd.read_csv(STOPS_FILE, dtype={"stop_id": str})
     stops_df = stops_df.dropna(subset=["stop_lat", "stop_lon"])
     stops_df = stops_df[["stop_id", "stop_lat", "stop_lon"]].copy()
 
-    stop_files = glob.glob(os.path.join(STOP_FOLDER, "*.csv"))
-
-    for stop_file in stop_files:
+    # --- Read all stop sequences first so every stop is matched in one bulk query ---
+    route_stops = {}
+    for stop_file in glob.glob(os.path.join(STOP_FOLDER, "*.csv")):
         route_id = os.path.basename(stop_file).replace("_stops.csv", "")
-        logging.info(f"🔁 Processing route: {route_id}")
-
         df = pd.read_csv(stop_file, dtype={"stop_id": str})
         if "stop_id" not in df.columns:
             logging.warning(f"⚠️ Skipping {route_id} — no 'stop_id' column.")
             continue
+        route_stops[route_id] = df["stop_id"].tolist()
 
-        merged = pd.merge(df, stops_df, on="stop_id", how="left")
-        if merged["stop_lat"].isna().any():
-            logging.warning(f"⚠️ Skipping {route_id} — missing coordinates.")
-            continue
-
-        gdf = gpd.GeoDataFrame(
-            merged,
-            geometry=[Point(lon, lat) for lon, lat in zip(merged["stop_lon"], merged["stop_lat"])],
-            crs="EPSG:4326"
-        ).to_crs(PROJECTION)
-
-        edge_ids = []
-        for pt in gdf.geometry:
-            edge_id = find_closest_edge(pt, edge_gdf, valid_edge_ids)
-            if edge_id:
-                edge_ids.append(edge_id)
-            else:
-                logging.warning(f"⚠️ Skipping point — no valid edge found nearby.")
+    if MATCHING_METHOD == "hmm":
+        completed = map_match_routes(route_stops, stops_df, edge_index)
+    else:
+        completed = snap_and_complete(route_stops, stops_df, edge_index)
+    route_path_summary(completed).to_csv(COMPLETION_SUMMARY, index=False)
 
+    for route_id, (edge_ids, gaps) in completed.items():
         if len(edge_ids) < 2:
-            logging.warning(f"⚠️ Skipping {route_id} — not enough valid edges.")
+            logging.warning(f"⚠️ Skipping {route_id} — fewer than 2 edges after matching.")
+            continue
+        if gaps:
+            logging.warning(f"⚠️ Skipping {route_id} — {gaps} stop pair(s) not connected in the network.")
             continue
 
         output_path = os.path.join(OUTPUT_FOLDER, f"mapped_routes_{route_id}.rou.xml")
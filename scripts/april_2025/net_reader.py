@@ -0,0 +1,196 @@
+"""
+net_reader.py
+
+Shared streaming reader for compiled SUMO .net.xml files.
+
+The network is parsed once with iterparse (elements are cleared as soon as
+they are consumed, so memory stays flat) into four compact columnar tables:
+- edges:       id, from, to, function, type, priority, num_lanes
+- lanes:       id, edge_id, index, speed, length, allow, disallow
+- junctions:   id, type, x, y
+- connections: from, to, from_lane, to_lane, via, dir, state
+
+The tables are persisted as Parquet in a sidecar cache directory
+(<net file>.cache/<content hash>/), so later loads skip XML parsing entirely.
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import json
+import hashlib
+import logging
+import xml.etree.ElementTree as ET
+import pandas as pd
+
+TABLES = ("edges", "lanes", "junctions", "connections")
+
+COLUMNS = {
+    "edges": ["id", "from", "to", "function", "type", "priority", "num_lanes"],
+    "lanes": ["id", "edge_id", "index", "speed", "length", "allow", "disallow"],
+    "junctions": ["id", "type", "x", "y"],
+    "connections": ["from", "to", "from_lane", "to_lane", "via", "dir", "state"],
+}
+
+NUMERIC_COLUMNS = {
+    "edges": {"priority": "float64", "num_lanes": "int32"},
+    "lanes": {"index": "int32", "speed": "float64", "length": "float64"},
+    "junctions": {"x": "float64", "y": "float64"},
+    "connections": {"from_lane": "int32", "to_lane": "int32"},
+}
+
+# Low-cardinality string columns are stored dictionary-encoded
+CATEGORY_COLUMNS = {
+    "edges": ["function", "type"],
+    "lanes": ["allow", "disallow"],
+    "junctions": ["type"],
+    "connections": ["dir", "state"],
+}
+
+HASH_CHUNK_BYTES = 1 << 20
+
+
+def net_cache_dir(net_path):
+    """Returns the sidecar cache directory for a .net.xml file."""
+    return f"{net_path}.cache"
+
+
+def file_digest(path):
+    """BLAKE2b content hash of a file, read in 1 MB chunks."""
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_BYTES), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _net_digest(net_path):
+    """
+    Returns the content hash of the net file. The hash is remembered in the cache
+    manifest together with size/mtime, so unchanged files are not re-hashed.
+    """
+    cache_dir = net_cache_dir(net_path)
+    manifest_path = os.path.join(cache_dir, "manifest.json")
+    stat = os.stat(net_path)
+
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+        if manifest.get("size") == stat.st_size and manifest.get("mtime_ns") == stat.st_mtime_ns:
+            return manifest["digest"]
+
+    digest = file_digest(net_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "digest": digest}, f)
+    return digest
+
+
+def _to_frame(name, buffers):
+    df = pd.DataFrame(buffers, columns=COLUMNS[name])
+    for col, dtype in NUMERIC_COLUMNS[name].items():
+        df[col] = pd.to_numeric(df[col]).astype(dtype)
+    for col in CATEGORY_COLUMNS[name]:
+        df[col] = df[col].astype("category")
+    return df
+
+
+def parse_net_tables(net_path):
+    """
+    Streams a .net.xml file with iterparse and returns its columnar tables.
+
+    Returns:
+        dict: {"edges": DataFrame, "lanes": DataFrame, "junctions": DataFrame, "connections": DataFrame}
+    """
+    logging.info(f"📂 Streaming network: {net_path}")
+    rows = {name: [] for name in TABLES}
+    current_edge = None
+    root = None
+
+    for event, elem in ET.iterparse(net_path, events=("start", "end")):
+        if root is None:
+            root = elem
+            continue
+
+        tag = elem.tag
+        if event == "start":
+            if tag == "edge":
+                current_edge = elem.get("id")
+            continue
+
+        if tag == "lane" and current_edge is not None:
+            rows["lanes"].append((
+                elem.get("id"), current_edge, elem.get("index", 0), elem.get("speed"),
+                elem.get("length"), elem.get("allow"), elem.get("disallow"),
+            ))
+        elif tag == "edge":
+            num_lanes = sum(1 for child in elem if child.tag == "lane")
+            rows["edges"].append((
+                elem.get("id"), elem.get("from"), elem.get("to"), elem.get("function", "normal"),
+                elem.get("type"), elem.get("priority"), num_lanes,
+            ))
+            current_edge = None
+        elif tag == "junction":
+            rows["junctions"].append((elem.get("id"), elem.get("type"), elem.get("x"), elem.get("y")))
+        elif tag == "connection":
+            rows["connections"].append((
+                elem.get("from"), elem.get("to"), elem.get("fromLane"), elem.get("toLane"),
+                elem.get("via"), elem.get("dir"), elem.get("state"),
+            ))
+
+        # Drop finished top-level elements (and their children) from memory
+        if current_edge is None:
+            root.clear()
+
+    tables = {name: _to_frame(name, rows[name]) for name in TABLES}
+    logging.info(
+        f"✅ Parsed {len(tables['edges']):,} edges, {len(tables['lanes']):,} lanes, "
+        f"{len(tables['junctions']):,} junctions, {len(tables['connections']):,} connections"
+    )
+    return tables
+
+
+def load_net_tables(net_path, tables=TABLES, use_cache=True):
+    """
+    Loads the requested columnar tables of a .net.xml file, using the Parquet
+    sidecar cache when it exists for the current file content.
+
+    Args:
+        net_path (str): Path to the SUMO .net.xml file.
+        tables (tuple): Subset of TABLES to return.
+        use_cache (bool): Read/write the sidecar Parquet cache.
+
+    Returns:
+        dict: {table_name: DataFrame}
+    """
+    if not use_cache:
+        parsed = parse_net_tables(net_path)
+        return {name: parsed[name] for name in tables}
+
+    cache_dir = os.path.join(net_cache_dir(net_path), _net_digest(net_path))
+    cache_paths = {name: os.path.join(cache_dir, f"{name}.parquet") for name in TABLES}
+
+    if all(os.path.exists(p) for p in cache_paths.values()):
+        logging.info(f"⚡ Loading cached network tables from: {cache_dir}")
+        return {name: pd.read_parquet(cache_paths[name]) for name in tables}
+
+    parsed = parse_net_tables(net_path)
+    os.makedirs(cache_dir, exist_ok=True)
+    for name, df in parsed.items():
+        df.to_parquet(cache_paths[name], index=False)
+    logging.info(f"💾 Cached network tables in: {cache_dir}")
+    return {name: parsed[name] for name in tables}
+
+
+def load_edge_ids(net_path, include_internal=True):
+    """Returns the set of edge IDs defined in a .net.xml file."""
+    edges = load_net_tables(net_path, tables=("edges",))["edges"]
+    if not include_internal:
+        edges = edges[edges["function"] != "internal"]
+    return set(edges["id"])
+
+
+def load_junction_ids(net_path):
+    """Returns the set of junction IDs defined in a .net.xml file."""
+    return set(load_net_tables(net_path, tables=("junctions",))["junctions"]["id"])
@@ -0,0 +1,199 @@
+"""
+network_connectivity.py
+
+Connectivity engine for the rail node/edge tables of the April 2025 pipeline.
+
+Builds the edge-to-edge adjacency of the network (edge A -> edge B when A ends
+at the node B starts from; turnarounds excluded, matching netconvert's
+--no-turnarounds) as a SciPy sparse matrix. When edge geometries are given,
+moves that deflect by more than MAX_DEFLECTION_DEG at the node are dropped:
+at a switch, a train can run from the stem onto either leg, but not from one
+diverging leg onto the other. The matrix is used to derive:
+
+- explicit rail connections for the .con.xml, so netconvert no longer guesses them
+- strongly connected components (scipy.sparse.csgraph.connected_components)
+- dead ends (edges without successor) and entry edges (edges without predecessor)
+- edges referencing nodes missing from the node table
+- stop edges outside the main strongly connected component, i.e. stops that
+  trains cannot both reach and leave on the main network
+
+Everything is vectorized over the whole network, so the national network is
+checked in seconds.
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+import shapely
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import connected_components
+
+MAX_DEFLECTION_DEG = 90  # Larger direction changes between two edges are not drivable
+HEADING_DISTANCE_METERS = 20  # Edge headings are measured over this length next to the shared node
+
+
+def _end_points(geometries, at_start):
+    """Endpoint of every line and the point HEADING_DISTANCE_METERS inside it, at its start or end."""
+    lengths = shapely.length(geometries)
+    inner = np.where(at_start, np.minimum(HEADING_DISTANCE_METERS, lengths), np.maximum(lengths - HEADING_DISTANCE_METERS, 0))
+    end = np.where(at_start, 0.0, lengths)
+    return (
+        shapely.get_coordinates(shapely.line_interpolate_point(geometries, end)),
+        shapely.get_coordinates(shapely.line_interpolate_point(geometries, inner)),
+    )
+
+
+def deflection_angles(geometries, next_geometries):
+    """
+    Direction change (degrees) when running from each line onto the next one.
+
+    The shared node is taken as the closest pair of endpoints, so the digitizing
+    direction of the geometries does not matter. NaN where a geometry is missing.
+    """
+    angles = np.full(len(geometries), np.nan)
+    valid = ~(shapely.is_missing(geometries) | shapely.is_missing(next_geometries))
+    valid &= ~(shapely.is_empty(geometries) | shapely.is_empty(next_geometries))
+    if not valid.any():
+        return angles
+    a, b = geometries[valid], next_geometries[valid]
+
+    a_first, a_last = shapely.get_point(a, 0), shapely.get_point(a, -1)
+    b_first, b_last = shapely.get_point(b, 0), shapely.get_point(b, -1)
+    gaps = np.stack([
+        shapely.distance(a_last, b_first), shapely.distance(a_last, b_last),
+        shapely.distance(a_first, b_first), shapely.distance(a_first, b_last),
+    ])
+    shared = np.argmin(gaps, axis=0)
+    a_node, a_inner = _end_points(a, at_start=shared >= 2)
+    b_node, b_inner = _end_points(b, at_start=(shared % 2) == 0)
+
+    incoming = a_node - a_inner
+    outgoing = b_inner - b_node
+    norms = np.hypot(*incoming.T) * np.hypot(*outgoing.T)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cosine = np.einsum("ij,ij->i", incoming, outgoing) / norms
+    angles[valid] = np.degrees(np.arccos(np.clip(cosine, -1, 1)))
+    return angles
+
+
+def edge_successors(edges, allow_turnarounds=False, max_deflection=MAX_DEFLECTION_DEG):
+    """
+    Pairs every edge with the edges leaving its end node.
+
+    Args:
+        edges (pd.DataFrame): id, from, to and optionally geometry (shapely lines or WKT).
+        allow_turnarounds (bool): Keep A -> B where B leads straight back to A's start node.
+        max_deflection (float): With geometries, drop A -> B when the direction changes by more
+            than this many degrees at the node (pairs with a missing geometry are kept).
+
+    Returns:
+        pd.DataFrame: from, to (edge IDs), one row per connection.
+    """
+    columns = ["id", "from", "to"]
+    pairs = edges[columns].merge(edges[columns], left_on="to", right_on="from", suffixes=("", "_next"))
+    keep = pairs["id"] != pairs["id_next"]
+    if not allow_turnarounds:
+        keep &= pairs["to_next"] != pairs["from"]
+    if "geometry" in edges.columns and max_deflection is not None:
+        geometries = edges["geometry"].to_numpy()
+        if any(isinstance(g, str) for g in geometries):
+            geometries = shapely.from_wkt(np.where(pd.isna(geometries), None, geometries))
+        geometries = pd.Series(geometries, index=edges["id"].to_numpy())
+        deflection = deflection_angles(
+            geometries.reindex(pairs["id"]).to_numpy(), geometries.reindex(pairs["id_next"]).to_numpy()
+        )
+        keep &= ~(deflection > max_deflection)
+    return pd.DataFrame({
+        "from": pairs.loc[keep, "id"].to_numpy(),
+        "to": pairs.loc[keep, "id_next"].to_numpy(),
+    })
+
+
+def adjacency_matrix(edge_ids, connections):
+    """Sparse edge x edge adjacency matrix of the connections (rows/columns follow edge_ids)."""
+    index = pd.Index(edge_ids)
+    src = index.get_indexer(connections["from"])
+    dst = index.get_indexer(connections["to"])
+    n = len(index)
+    return csr_matrix((np.ones(len(src), dtype=np.int8), (src, dst)), shape=(n, n))
+
+
+def connectivity_report(node_ids, edges, stop_edge_ids=None, allow_turnarounds=False, max_deflection=MAX_DEFLECTION_DEG):
+    """
+    Checks the connectivity of a rail network.
+
+    Args:
+        node_ids (array-like): Node IDs of the node table.
+        edges (pd.DataFrame): id, from, to and optionally geometry.
+        stop_edge_ids (array-like, optional): Edges that must lie on the main network.
+        allow_turnarounds, max_deflection: See edge_successors.
+
+    Returns:
+        dict:
+            connections: pd.DataFrame from, to — explicit edge connections
+            edges:       pd.DataFrame id, component, in_main, n_successors, n_predecessors,
+                         dead_end, entry, missing_node, stop_edge
+            unreachable_stop_edges: list of stop edge IDs outside the main component (or unknown)
+            summary:     dict of counts
+    """
+    columns = ["id", "from", "to"] + (["geometry"] if "geometry" in edges.columns else [])
+    edges = edges[columns].drop_duplicates("id").reset_index(drop=True)
+    missing_node = ~edges["from"].isin(node_ids) | ~edges["to"].isin(node_ids)
+
+    connections = edge_successors(edges, allow_turnarounds=allow_turnarounds, max_deflection=max_deflection)
+    matrix = adjacency_matrix(edges["id"], connections)
+    n_components, labels = connected_components(matrix, directed=True, connection="strong")
+    main_component = np.argmax(np.bincount(labels)) if len(labels) else -1
+
+    n_successors = np.diff(matrix.indptr)
+    n_predecessors = np.bincount(matrix.indices, minlength=matrix.shape[0])
+    table = pd.DataFrame({
+        "id": edges["id"],
+        "component": labels,
+        "in_main": labels == main_component,
+        "n_successors": n_successors,
+        "n_predecessors": n_predecessors,
+        "dead_end": n_successors == 0,
+        "entry": n_predecessors == 0,
+        "missing_node": missing_node.to_numpy(),
+    })
+
+    unreachable = []
+    if stop_edge_ids is not None:
+        stop_edge_ids = pd.unique(pd.Series(stop_edge_ids).dropna())
+        in_main = table.set_index("id")["in_main"].reindex(stop_edge_ids, fill_value=False)
+        unreachable = list(in_main.index[~in_main.to_numpy()])
+    table["stop_edge"] = table["id"].isin([] if stop_edge_ids is None else stop_edge_ids)
+
+    summary = {
+        "n_nodes": len(pd.unique(np.asarray(node_ids))),
+        "n_edges": len(table),
+        "n_connections": len(connections),
+        "n_components": int(n_components),
+        "main_component_edges": int(table["in_main"].sum()),
+        "dead_ends": int(table["dead_end"].sum()),
+        "entries": int(table["entry"].sum()),
+        "edges_with_missing_nodes": int(table["missing_node"].sum()),
+        "stop_edges": 0 if stop_edge_ids is None else len(stop_edge_ids),
+        "unreachable_stop_edges": len(unreachable),
+    }
+    return {"connections": connections, "edges": table, "unreachable_stop_edges": unreachable, "summary": summary}
+
+
+def log_summary(summary):
+    logging.info(
+        f"🕸️ {summary['n_edges']:,} edges, {summary['n_connections']:,} connections, "
+        f"{summary['n_components']:,} strongly connected components "
+        f"(main: {summary['main_component_edges']:,} edges)"
+    )
+    if summary["edges_with_missing_nodes"]:
+        logging.warning(f"⚠️ {summary['edges_with_missing_nodes']:,} edges reference missing nodes.")
+    logging.info(f"🚧 Dead ends: {summary['dead_ends']:,} | Entry-only edges: {summary['entries']:,}")
+    if summary["unreachable_stop_edges"]:
+        logging.warning(
+            f"⚠️ {summary['unreachable_stop_edges']:,} of {summary['stop_edges']:,} stop edges "
+            f"are outside the main network component."
+        )
@@ -1,64 +1,145 @@
 """
 regenerate_single_mapped_route.py
 
-Regenerates a single mapped SUMO route file using GTFS stop coordinates
+Regenerates mapped SUMO route files using GTFS stop coordinates
 and nearest edge matching in the rail network.
 
+Set TARGET_ROUTE_ID to a route ID to regenerate a single route, or to None
+to regenerate every route in stop_sequences/ (batch mode). Stops that are not
+yet in the stop -> edge assignment cache are matched in one bulk query against
+the shared edge index (see edge_index.py), so one route or all routes cost
+about the same. The cache is discarded when SEARCH_RADIUS_METERS, stops.txt
+or the edge file change (manifest next to the cache CSV).
+
 Author: GPT-4 + Onur | April 2025
 """
 
 import os
+import glob
+import json
 import pandas as pd
 import geopandas as gpd
 import logging
-from shapely.geometry import Point
-from shapely.ops import nearest_points
+from edge_index import load_edge_index, nearest_edge_ids
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 # Inputs
-TARGET_ROUTE_ID = "91-29-Y-j25-1"
+TARGET_ROUTE_ID = "91-29-Y-j25-1"  # None -> regenerate all routes in STOP_SEQUENCE_DIR
 STOPS_PATH = r"D:\PhD\codingPractices\progress-report-dec-2024\data\raw\swiss\gtfs_ftp_2025\stops.txt"
-STOP_SEQUENCE_PATH = fr"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\stop_sequences\{TARGET_ROUTE_ID}_stops.csv"
+STOP_SEQUENCE_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\stop_sequences"
 EDGE_PATH = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\rail_edges_named.csv"
-OUTPUT_ROU_PATH = fr"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\mapped_rou\mapped_routes_{TARGET_ROUTE_ID}.rou.xml"
+OUTPUT_ROU_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\mapped_rou"
+ASSIGNMENT_CACHE_PATH = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\stop_edge_assignments.csv"
+ASSIGNMENT_MANIFEST_PATH = f"{ASSIGNMENT_CACHE_PATH}.manifest.json"
 
-def main():
-    logging.info(f"🔁 Regenerating route for: {TARGET_ROUTE_ID}")
-
-    # Load GTFS stops
-    stops_df = pd.read_csv(STOPS_PATH)
-    stops_df = stops_df.rename(columns={"stop_id": "stop_id", "stop_lat": "lat", "stop_lon": "lon"})
-    stops_df = stops_df.dropna(subset=["lat", "lon"])
-
-    # Load stop sequence for target route
-    route_stops = pd.read_csv(STOP_SEQUENCE_PATH)
-    route_stops = route_stops.merge(stops_df, on="stop_id", how="left")
-    route_stops = route_stops.dropna(subset=["lat", "lon"])
-    stop_gdf = gpd.GeoDataFrame(route_stops, geometry=gpd.points_from_xy(route_stops["lon"], route_stops["lat"]), crs="EPSG:4326").to_crs(epsg=2056)
-
-    # Load rail edges
-    edge_df = pd.read_csv(EDGE_PATH)
-    edge_df = edge_df.dropna(subset=["geometry"])
-    edge_gdf = gpd.GeoDataFrame(edge_df, geometry=edge_df["geometry"].apply(wkt.loads), crs="EPSG:2056")
-
-    # Find nearest edge to each stop
-    matched_edges = []
-    for stop in stop_gdf.itertuples():
-        nearest = edge_gdf.distance(stop.geometry).sort_values().index[0]
-        edge_id = edge_gdf.loc[nearest, "edge_id"]
-        matched_edges.append(edge_id)
-
-    # Generate route XML
-    with open(OUTPUT_ROU_PATH, "w", encoding="utf-8") as f:
+SEARCH_RADIUS_METERS = 2000
+
+
+def load_stop_sequences(route_id=None):
+    """Returns {route_id: [stop_id, ...]} for one route or for every file in STOP_SEQUENCE_DIR."""
+    if route_id is not None:
+        paths = [os.path.join(STOP_SEQUENCE_DIR, f"{route_id}_stops.csv")]
+    else:
+        paths = sorted(glob.glob(os.path.join(STOP_SEQUENCE_DIR, "*_stops.csv")))
+
+    sequences = {}
+    for path in paths:
+        rid = os.path.basename(path).replace("_stops.csv", "")
+        sequences[rid] = pd.read_csv(path, usecols=["stop_id"], dtype={"stop_id": str})["stop_id"].tolist()
+    return sequences
+
+
+def _file_manifest(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def assignment_manifest():
+    """What the cached assignments depend on: search radius, stops.txt and the edge file."""
+    return {
+        "search_radius": SEARCH_RADIUS_METERS,
+        "stops": _file_manifest(STOPS_PATH),
+        "edges": _file_manifest(EDGE_PATH),
+    }
+
+
+def load_assignment_cache():
+    """Loads cached stop -> edge assignments; discarded when the radius, stops.txt or the edge file changed."""
+    if not os.path.exists(ASSIGNMENT_CACHE_PATH) or not os.path.exists(ASSIGNMENT_MANIFEST_PATH):
+        return {}
+    with open(ASSIGNMENT_MANIFEST_PATH, "r", encoding="utf-8") as f:
+        if json.load(f) != assignment_manifest():
+            logging.info("♻️ Search radius or input files changed since last run. Discarding stop -> edge cache.")
+            return {}
+    cache_df = pd.read_csv(ASSIGNMENT_CACHE_PATH, dtype={"stop_id": str, "edge_id": str})
+    return dict(zip(cache_df["stop_id"], cache_df["edge_id"].where(cache_df["edge_id"].notna(), None)))
+
+
+def save_assignment_cache(assignments):
+    cache_df = pd.DataFrame({"stop_id": list(assignments.keys()), "edge_id": list(assignments.values())})
+    cache_df.to_csv(ASSIGNMENT_CACHE_PATH, index=False)
+    with open(ASSIGNMENT_MANIFEST_PATH, "w", encoding="utf-8") as f:
+        json.dump(assignment_manifest(), f)
+    logging.info(f"💾 Saved {len(cache_df):,} stop -> edge assignments to: {ASSIGNMENT_CACHE_PATH}")
+
+
+def assign_missing_stops(stop_ids, assignments):
+    """Matches all stops not yet in the cache with a single bulk nearest-edge query."""
+    missing = sorted(set(stop_ids) - set(assignments))
+    if not missing:
+        logging.info("⚡ All stops already assigned (cache hit).")
+        return assignments
+
+    stops_df = pd.read_csv(STOPS_PATH, usecols=["stop_id", "stop_lat", "stop_lon"], dtype={"stop_id": str})
+    stops_df = stops_df.dropna(subset=["stop_lat", "stop_lon"]).drop_duplicates("stop_id")
+    stops_df = stops_df[stops_df["stop_id"].isin(missing)]
+
+    logging.info(f"🔗 Matching {len(stops_df):,} new stops to the nearest rail edge...")
+    stop_points = gpd.GeoSeries(
+        gpd.points_from_xy(stops_df["stop_lon"], stops_df["stop_lat"]),
+        crs="EPSG:4326"
+    ).to_crs(epsg=2056)
+
+    edge_index = load_edge_index(EDGE_PATH, id_column="edge_id")
+    matched = nearest_edge_ids(edge_index, stop_points, search_radius=SEARCH_RADIUS_METERS)
+
+    assignments.update(dict.fromkeys(missing))  # Stops without coordinates stay unmatched
+    assignments.update(zip(stops_df["stop_id"], matched))
+    save_assignment_cache(assignments)
+    return assignments
+
+
+def write_route_file(route_id, matched_edges):
+    output_path = os.path.join(OUTPUT_ROU_DIR, f"mapped_routes_{route_id}.rou.xml")
+    with open(output_path, "w", encoding="utf-8") as f:
         f.write("<routes>\n")
-        f.write('    <vehicle id="{0}" type="IC" depart="0">\n'.format(TARGET_ROUTE_ID))
+        f.write('    <vehicle id="{0}" type="IC" depart="0">\n'.format(route_id))
         f.write('        <route edges="{0}"/>\n'.format(" ".join(matched_edges)))
         f.write("    </vehicle>\n")
         f.write("</routes>\n")
+    logging.info(f"✅ Saved regenerated file: {output_path}")
+
+
+def main():
+    if TARGET_ROUTE_ID is None:
+        logging.info(f"🔁 Regenerating all routes in: {STOP_SEQUENCE_DIR}")
+    else:
+        logging.info(f"🔁 Regenerating route for: {TARGET_ROUTE_ID}")
+    os.makedirs(OUTPUT_ROU_DIR, exist_ok=True)
+
+    sequences = load_stop_sequences(TARGET_ROUTE_ID)
+    all_stop_ids = [sid for stop_ids in sequences.values() for sid in stop_ids]
+
+    assignments = assign_missing_stops(all_stop_ids, load_assignment_cache())
+
+    for route_id, stop_ids in sequences.items():
+        matched_edges = [assignments[sid] for sid in stop_ids if assignments.get(sid)]
+        if len(matched_edges) < 2:
+            logging.warning(f"⚠️ Skipping {route_id} — not enough matched edges.")
+            continue
+        write_route_file(route_id, matched_edges)
 
-    logging.info(f"✅ Saved regenerated file: {OUTPUT_ROU_PATH}")
 
 if __name__ == "__main__":
-    from shapely import wkt
     main()
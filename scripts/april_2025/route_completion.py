@@ -0,0 +1,197 @@
+"""
+route_completion.py
+
+Route completion stage: turns the sequence of stop edges of a route (the edge
+nearest each stop) into a continuous SUMO route by connecting consecutive stop
+edges with shortest paths over the edge graph of the compiled .net.xml.
+
+- Edge graph: one node per normal edge; edge A -> edge B when the network has a
+  connection A -> B (junction topology A.to == B.from is used when the net has
+  no connections). The weight of A -> B is the length of B.
+- Stop-edge pairs are routed over distance-bounded shortest-path trees (one
+  Dijkstra per source edge, rail_routing.tree_path per target). Both the trees
+  and the resulting paths are kept in bounded LRU caches: routes leaving the
+  same edge towards different targets share one tree, and the same
+  consecutive stop pairs repeat across many routes of a timetable.
+- complete_routes() spreads the routes over a process pool; every worker loads
+  the Parquet-cached network tables (see net_reader.py) once.
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import sys
+import logging
+import numpy as np
+from functools import lru_cache
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+from net_reader import load_net_tables
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "preprocess"))
+from rail_routing import build_rail_graph, tree_path
+
+PATH_CACHE_SIZE = 100_000  # Edge pairs kept in the LRU cache of every worker
+SOURCE_TREE_CACHE_SIZE = 64  # Shortest-path trees kept per worker (about 12 bytes per network edge each)
+REACHABLE_CACHE_SIZE = 256  # Source edges kept in the reachable-set cache (about 12 bytes per reached edge)
+SEARCH_LIMIT_METERS = 100_000  # Consecutive stops farther apart than this stay unconnected
+COMPLETION_WORKERS = os.cpu_count()
+ROUTES_PER_TASK = 16
+
+# Per-process state, set by init_route_completion()
+_graph = None
+_matrix = None
+
+
+def load_edge_graph(net_path):
+    """
+    Builds the CSR edge graph of a .net.xml file (nodes are normal edge IDs).
+
+    Returns:
+        dict: CSR graph as returned by rail_routing.build_rail_graph.
+    """
+    tables = load_net_tables(net_path, tables=("edges", "lanes", "connections"))
+    edges = tables["edges"]
+    edges = edges[edges["function"] != "internal"]
+    edge_ids = set(edges["id"])
+
+    lengths = tables["lanes"].groupby("edge_id", observed=True)["length"].max()
+
+    connections = tables["connections"]
+    arcs = connections.loc[
+        connections["from"].isin(edge_ids) & connections["to"].isin(edge_ids), ["from", "to"]
+    ].drop_duplicates()
+
+    if arcs.empty:
+        logging.info("ℹ️ No connections in network. Using junction topology for the edge graph.")
+        arcs = edges[["id", "to"]].merge(edges[["id", "from"]], left_on="to", right_on="from", suffixes=("", "_next"))
+        arcs = arcs.loc[arcs["id"] != arcs["id_next"], ["id", "id_next"]].set_axis(["from", "to"], axis=1)
+
+    weights = lengths.reindex(arcs["to"]).fillna(0).to_numpy()
+    graph = build_rail_graph(arcs["from"].to_numpy(), arcs["to"].to_numpy(), weights)
+    logging.info(f"🕸️ Edge graph: {len(graph['nodes']):,} edges, {len(graph['indices']):,} connections")
+    return graph
+
+
+def init_route_completion(net_path):
+    """Loads the edge graph of net_path into this process (also used as pool initializer)."""
+    global _graph, _matrix
+    _graph = load_edge_graph(net_path)
+    n = len(_graph["nodes"])
+    _matrix = csr_matrix((_graph["weights"], _graph["indices"], _graph["indptr"]), shape=(n, n))
+    source_tree.cache_clear()
+    edge_path.cache_clear()
+    reachable_edges.cache_clear()
+
+
+def edge_graph():
+    """The edge graph loaded by init_route_completion() in this process."""
+    return _graph
+
+
+@lru_cache(maxsize=SOURCE_TREE_CACHE_SIZE)
+def source_tree(from_edge):
+    """
+    Shortest-path tree from from_edge, bounded by SEARCH_LIMIT_METERS.
+
+    Returns:
+        dict: dist and pred arrays over all edges, as used by rail_routing.tree_path.
+    """
+    source = _graph["nodes"].get_loc(from_edge)
+    dist, pred = dijkstra(
+        _matrix, directed=True, indices=source, limit=SEARCH_LIMIT_METERS, return_predecessors=True
+    )
+    return {"dist": dist, "pred": pred.astype(np.int32)}
+
+
+@lru_cache(maxsize=PATH_CACHE_SIZE)
+def edge_path(from_edge, to_edge):
+    """Shortest edge sequence from from_edge to to_edge (both included), or None."""
+    nodes = _graph["nodes"]
+    if from_edge not in nodes or to_edge not in nodes:
+        return None
+    if from_edge == to_edge:
+        return (from_edge,)
+
+    path = tree_path(source_tree(from_edge), nodes.get_loc(to_edge))
+    return tuple(nodes[path]) if path else None
+
+
+@lru_cache(maxsize=REACHABLE_CACHE_SIZE)
+def reachable_edges(from_edge, limit=SEARCH_LIMIT_METERS):
+    """
+    Network distances from from_edge to every edge reachable within limit meters.
+
+    Returns:
+        tuple: (sorted node indices, distances); the distance to an edge includes its own length.
+    """
+    if limit <= SEARCH_LIMIT_METERS:
+        dist = source_tree(from_edge)["dist"]
+        dist = np.where(dist <= limit, dist, np.inf)
+    else:
+        dist = dijkstra(_matrix, directed=True, indices=_graph["nodes"].get_loc(from_edge), limit=limit)
+    reached = np.flatnonzero(np.isfinite(dist)).astype(np.int32)
+    return reached, dist[reached]
+
+
+def complete_route(stop_edges):
+    """
+    Connects consecutive stop edges with shortest paths.
+
+    Returns:
+        tuple: (continuous edge list, number of stop pairs that could not be connected)
+    """
+    stop_edges = [e for i, e in enumerate(stop_edges) if i == 0 or e != stop_edges[i - 1]]
+    route = stop_edges[:1]
+    gaps = 0
+    for from_edge, to_edge in zip(stop_edges, stop_edges[1:]):
+        path = edge_path(from_edge, to_edge)
+        if path is None:
+            gaps += 1
+            route.append(to_edge)
+        else:
+            route.extend(path[1:])
+    return route, gaps
+
+
+def _complete_item(item):
+    route_id, stop_edges = item
+    return route_id, complete_route(stop_edges)
+
+
+def complete_routes(route_stop_edges, net_path, workers=COMPLETION_WORKERS):
+    """
+    Completes many routes at once.
+
+    Args:
+        route_stop_edges (dict): route_id -> list of stop edge IDs.
+        net_path (str): Compiled SUMO .net.xml.
+        workers (int): Worker processes (1 -> run in this process).
+
+    Returns:
+        dict: route_id -> (continuous edge list, number of unconnected stop pairs)
+    """
+    items = list(route_stop_edges.items())
+    logging.info(f"🧩 Completing {len(items):,} routes over the network edge graph...")
+
+    if workers is None or workers <= 1 or len(items) <= ROUTES_PER_TASK:
+        init_route_completion(net_path)
+        results = dict(map(_complete_item, items))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_route_completion, initargs=(net_path,)) as pool:
+            results = dict(pool.map(_complete_item, items, chunksize=ROUTES_PER_TASK))
+
+    incomplete = sum(1 for _, gaps in results.values() if gaps)
+    logging.info(f"✅ Completed {len(results) - incomplete:,} routes; {incomplete:,} still have gaps.")
+    return results
+
+
+def route_path_summary(results):
+    """Per-route summary table: route_id, n_edges, n_gaps."""
+    return pd.DataFrame(
+        [(route_id, len(edges), gaps) for route_id, (edges, gaps) in results.items()],
+        columns=["route_id", "n_edges", "n_gaps"],
+    )
@@ -0,0 +1,287 @@
+"""
+run_april_pipeline.py
+
+Incremental runner for the April 2025 SUMO Swiss pipeline.
+
+Every phase script is declared with the files/folders it reads and writes.
+Before a phase runs, its inputs (and the phase script itself) are fingerprinted
+by content; if the fingerprint matches the last successful run and all outputs
+still exist, the phase is skipped. Phases whose inputs are produced by other
+phases wait for them; independent phases run concurrently. A run only counts
+as successful if the script exits 0 and rewrote all of its outputs (output
+folders are cleared before the phase runs, so no stale files survive).
+
+Because fingerprints are content hashes, a phase that is re-run but produces
+byte-identical outputs does not invalidate the phases after it, and editing the
+vehicle types or a single stop sequence never triggers a network rebuild.
+
+Run from the repository root:
+    python scripts/april_2025/run_april_pipeline.py
+
+State: data/processed/april_2025_pipeline_state.json
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import subprocess
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from net_reader import file_digest
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# --- Config ---
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATE_PATH = os.path.join(ROOT_DIR, "data", "processed", "april_2025_pipeline_state.json")
+
+MAX_WORKERS = 4
+FORCE_PHASES = []  # Phase names to re-run even when their inputs are unchanged
+MTIME_TOLERANCE_NS = 2_000_000_000  # Coarse file system timestamps (e.g. FAT: 2 s)
+
+SUMO_DIR = "sumo/inputs/april_2025_swiss"
+ROUTES_DIR = "data/processed/routes"
+
+# Paths are relative to the repository root
+PHASES = [
+    {
+        "name": "extract_nodes_and_edges",
+        "inputs": ["data/raw/swiss/swissTNE_Base_20240507.gpkg"],
+        "outputs": ["data/processed/rail_nodes.csv", "data/processed/rail_edges.csv"],
+    },
+    {
+        "name": "assign_human_friendly_names",
+        "inputs": ["data/processed/rail_nodes.csv", "data/raw/swiss/haltestelle-haltekante.csv"],
+        "outputs": ["data/processed/rail_nodes_named.csv"],
+    },
+    {
+        "name": "assign_human_friendly_edge_names",
+        "inputs": ["data/processed/rail_edges.csv", "data/processed/rail_nodes_named.csv"],
+        "outputs": ["data/processed/rail_edges_named.csv"],
+    },
+    {
+        "name": "write_sumo_nodes",
+        "inputs": ["data/processed/rail_nodes_named.csv"],
+        "outputs": [f"{SUMO_DIR}/april_2025_swiss.nod.xml"],
+    },
+    {
+        "name": "write_sumo_edges",
+        "inputs": ["data/processed/rail_edges_named.csv"],
+        "outputs": [f"{SUMO_DIR}/april_2025_swiss.edg.xml"],
+    },
+    {
+        "name": "write_sumo_connections",
+        "inputs": [
+            "data/processed/rail_nodes_named.csv",
+            "data/processed/rail_edges_named.csv",
+            f"{ROUTES_DIR}/stop_sequences",
+            "data/raw/swiss/gtfs_ftp_2025/stops.txt",
+        ],
+        "outputs": [f"{SUMO_DIR}/april_2025_swiss.con.xml", "data/processed/rail_connectivity_report.csv"],
+    },
+    {
+        "name": "generate_net_with_netconvert",
+        "inputs": [
+            f"{SUMO_DIR}/april_2025_swiss.nod.xml",
+            f"{SUMO_DIR}/april_2025_swiss.edg.xml",
+            f"{SUMO_DIR}/april_2025_swiss.con.xml",
+        ],
+        "outputs": [f"{SUMO_DIR}/april_2025_swiss.net.xml"],
+    },
+    {
+        "name": "regenerate_vehicle_types_ic_ir_only",
+        "inputs": [],
+        "outputs": [f"{ROUTES_DIR}/vehicle_types.veh.xml"],
+    },
+    {
+        "name": "match_gtfs_stops_to_sumo_edges",
+        "inputs": [
+            f"{ROUTES_DIR}/stop_sequences",
+            "data/raw/swiss/gtfs_ftp_2025/stops.txt",
+            "data/processed/rail_edges_named.csv",
+            f"{SUMO_DIR}/april_2025_swiss.net.xml",
+        ],
+        "outputs": [f"{ROUTES_DIR}/mapped_rou"],
+    },
+    {
+        "name": "create_sumocfg_file_mapped_routes_kpis",
+        "inputs": [
+            f"{ROUTES_DIR}/mapped_rou",
+            f"{ROUTES_DIR}/vehicle_types.veh.xml",
+            f"{SUMO_DIR}/april_2025_swiss.net.xml",
+        ],
+        "outputs": [f"{SUMO_DIR}/april_2025_swiss_mapped_kpis.sumocfg"],
+    },
+]
+
+
+# --- Fingerprints ---
+
+def load_state():
+    if not os.path.exists(STATE_PATH):
+        return {"files": {}, "phases": {}}
+    with open(STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    with open(STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def cached_file_digest(path, file_memo):
+    """Content hash of a file; re-hashed only when its size or mtime changed."""
+    stat = os.stat(path)
+    memo = file_memo.get(path)
+    if memo and memo[0] == stat.st_size and memo[1] == stat.st_mtime_ns:
+        return memo[2]
+    digest = file_digest(path)
+    file_memo[path] = [stat.st_size, stat.st_mtime_ns, digest]
+    return digest
+
+
+def path_fingerprint(rel_path, file_memo):
+    """Digest of a file, or of every file (name + content) below a folder. None if missing."""
+    path = os.path.join(ROOT_DIR, rel_path)
+    if os.path.isfile(path):
+        return cached_file_digest(path, file_memo)
+    if not os.path.isdir(path):
+        return None
+    entries = []
+    for folder, _, files in os.walk(path):
+        for file_name in files:
+            file_path = os.path.join(folder, file_name)
+            rel_file = os.path.relpath(file_path, path).replace(os.sep, "/")
+            entries.append(f"{rel_file}:{cached_file_digest(file_path, file_memo)}")
+    return sorted(entries)
+
+
+def phase_fingerprint(phase, file_memo):
+    script_path = os.path.join(SCRIPT_DIR, f"{phase['name']}.py")
+    return {
+        "script": cached_file_digest(script_path, file_memo),
+        "inputs": {rel_path: path_fingerprint(rel_path, file_memo) for rel_path in phase["inputs"]},
+    }
+
+
+def outputs_exist(phase):
+    return all(os.path.exists(os.path.join(ROOT_DIR, rel_path)) for rel_path in phase["outputs"])
+
+
+def oldest_mtime_ns(path):
+    """mtime of a file, or the oldest mtime of the files in a folder (the folder's own if it is empty)."""
+    if not os.path.isdir(path):
+        return os.stat(path).st_mtime_ns
+    mtimes = [os.stat(os.path.join(folder, f)).st_mtime_ns for folder, _, files in os.walk(path) for f in files]
+    return min(mtimes) if mtimes else os.stat(path).st_mtime_ns
+
+
+def outputs_written_since(phase, started_ns):
+    """True if every output exists and every output file was (re)written after started_ns."""
+    return outputs_exist(phase) and all(
+        oldest_mtime_ns(os.path.join(ROOT_DIR, rel_path)) >= started_ns - MTIME_TOLERANCE_NS
+        for rel_path in phase["outputs"]
+    )
+
+
+def clear_folder_outputs(phase):
+    """Removes the output folders of a phase, so files from earlier runs cannot be left behind."""
+    for rel_path in phase["outputs"]:
+        path = os.path.join(ROOT_DIR, rel_path)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+
+
+# --- Scheduling ---
+
+def phase_dependencies(phases):
+    """Maps each phase name to the phases that produce one of its inputs."""
+    producers = {out: phase["name"] for phase in phases for out in phase["outputs"]}
+    return {
+        phase["name"]: {producers[inp] for inp in phase["inputs"] if inp in producers}
+        for phase in phases
+    }
+
+
+def run_phase(phase):
+    """Runs one phase script in a subprocess from the repository root."""
+    script_path = os.path.join(SCRIPT_DIR, f"{phase['name']}.py")
+    logging.info(f"▶️ Running {phase['name']}...")
+    clear_folder_outputs(phase)
+    started_ns = time.time_ns()
+    result = subprocess.run([sys.executable, script_path], cwd=ROOT_DIR)
+    if result.returncode != 0:
+        return False
+    # Some phase scripts log errors without exiting non-zero; outputs left over from an
+    # earlier run must not count as produced by this one
+    if not outputs_written_since(phase, started_ns):
+        logging.error(f"❌ {phase['name']} exited 0 but did not (re)write all of its outputs.")
+        return False
+    return True
+
+
+def main():
+    state = load_state()
+    file_memo = state["files"]
+    phases = {phase["name"]: phase for phase in PHASES}
+    dependencies = phase_dependencies(PHASES)
+
+    pending = set(phases)
+    done, failed, skipped = set(), set(), set()
+    running = {}
+
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as pool:
+        while pending or running:
+            # Phases whose upstream phases failed (or were blocked) cannot run
+            for name in sorted(pending):
+                if dependencies[name] & failed:
+                    logging.warning(f"⛔ {name} blocked by failed upstream phase(s).")
+                    pending.discard(name)
+                    failed.add(name)
+
+            # Every phase whose upstream phases are finished is ready
+            for name in [n for n in phases if n in pending and dependencies[n] <= done]:
+                pending.discard(name)
+                phase = phases[name]
+                fingerprint = phase_fingerprint(phase, file_memo)
+                if (name not in FORCE_PHASES and outputs_exist(phase)
+                        and state["phases"].get(name) == fingerprint):
+                    logging.info(f"⏭️ {name}: inputs unchanged, skipping.")
+                    done.add(name)
+                    skipped.add(name)
+                    continue
+                running[pool.submit(run_phase, phase)] = (name, fingerprint)
+
+            if not running:
+                continue
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name, fingerprint = running.pop(future)
+                if future.result():
+                    logging.info(f"✅ {name} complete.")
+                    state["phases"][name] = fingerprint
+                    done.add(name)
+                else:
+                    logging.error(f"❌ {name} failed.")
+                    state["phases"].pop(name, None)
+                    failed.add(name)
+                save_state(state)
+
+    save_state(state)
+    logging.info(
+        f"🏁 Pipeline finished: {len(done) - len(skipped)} run, {len(skipped)} skipped, {len(failed)} failed."
+    )
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
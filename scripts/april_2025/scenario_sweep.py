@@ -0,0 +1,183 @@
+"""
+scenario_sweep.py
+
+Monte Carlo sweep over randomized virtual-coupling scenarios.
+
+Every combination of headway range, dwell range and vehicle mix is run with
+N_SEEDS seeds. Each scenario gets:
+- a seed drawn from np.random.SeedSequence(BASE_SEED), used both for the route
+  generator (generate_randomized_sumo_routes.py) and for SUMO's --seed. The
+  same BASE_SEED therefore reproduces the whole sweep.
+- its own output directory (<SWEEP_DIR>/<scenario_id>/) with the route file,
+  the .sumocfg, tripinfo/stopinfo outputs and per-station KPIs.
+
+Scenarios run in a process pool, each in a fresh worker process
+(max_tasks_per_child=1): libsumo runs SUMO inside the calling process and
+allows only one simulation there. KPIs are aggregated online
+(traci_control.py) and collected into:
+- sweep_kpis.csv:        one row per scenario (n_vehicles generated, n_arrived
+                         trips and the KPIs)
+- sweep_kpi_summary.csv: mean/std of the KPIs over the seeds of each variant
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import sys
+import time
+import logging
+import itertools
+import random
+import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+import pandas as pd
+from generate_randomized_sumo_routes import generate_route_file
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from sumo_runner import sumo_command
+from traci_control import run_kpi_simulation, kpi_summary, station_table
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# ------------------ Config ------------------
+
+NET_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\april_2025_swiss\april_2025_swiss.net.xml"
+SWEEP_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\outputs\april_2025_swiss_sweep"
+
+BASE_SEED = 20250401
+N_SEEDS = 10
+SWEEP_WORKERS = os.cpu_count()  # 1 -> run scenarios one after another
+BACKEND = "libsumo"
+END_TIME = 50000  # s
+TRAINS_PER_ROUTE = 4
+
+# Variant axes (name -> value); every combination is a variant
+HEADWAY_RANGES = {"h60-120": (60, 120), "h120-240": (120, 240), "h300-600": (300, 600)}
+DWELL_RANGES = {"d30-90": (30, 90), "d60-180": (60, 180)}
+VEHICLE_MIXES = {
+    "by_route": None,  # IC routes -> ic_double_deck, others -> ir_single_deck
+    "ic_heavy": {"ic_double_deck": 0.8, "ir_single_deck": 0.2},
+    "ir_heavy": {"ic_double_deck": 0.2, "ir_single_deck": 0.8},
+}
+
+# ------------------ Scenarios ------------------
+
+def build_scenarios(n_seeds=N_SEEDS, base_seed=BASE_SEED):
+    """All (headway, dwell, vehicle mix) variants times n_seeds, each with its own reproducible seed."""
+    variants = list(itertools.product(HEADWAY_RANGES, DWELL_RANGES, VEHICLE_MIXES))
+    children = np.random.SeedSequence(base_seed).spawn(len(variants) * n_seeds)
+    scenarios = []
+    for (headway, dwell, mix), seed_index in itertools.product(variants, range(n_seeds)):
+        variant = f"{headway}_{dwell}_{mix}"
+        seed = int(children[len(scenarios)].generate_state(1)[0] & 0x7FFFFFFF)  # SUMO seeds are int32
+        scenarios.append({
+            "scenario_id": f"{variant}_s{seed_index:03d}",
+            "variant": variant,
+            "headway": headway,
+            "dwell": dwell,
+            "vehicle_mix": mix,
+            "seed_index": seed_index,
+            "seed": seed,
+        })
+    return scenarios
+
+
+def write_scenario_config(scenario_dir, route_file, seed):
+    """Writes the .sumocfg of one scenario (all outputs inside scenario_dir)."""
+    root = ET.Element("configuration")
+    input_elem = ET.SubElement(root, "input")
+    ET.SubElement(input_elem, "net-file", value=NET_FILE)
+    ET.SubElement(input_elem, "route-files", value=route_file)
+
+    time_elem = ET.SubElement(root, "time")
+    ET.SubElement(time_elem, "begin", value="0")
+    ET.SubElement(time_elem, "end", value=str(END_TIME))
+
+    output_elem = ET.SubElement(root, "output")
+    ET.SubElement(output_elem, "tripinfo-output", value=os.path.join(scenario_dir, "tripinfo.xml"))
+    ET.SubElement(output_elem, "stop-output", value=os.path.join(scenario_dir, "stopinfo.xml"))
+
+    random_elem = ET.SubElement(root, "random_number")
+    ET.SubElement(random_elem, "seed", value=str(seed))
+
+    config_file = os.path.join(scenario_dir, "scenario.sumocfg")
+    ET.ElementTree(root).write(config_file, encoding="utf-8", xml_declaration=True)
+    return config_file
+
+
+def run_scenario(scenario, sweep_dir=SWEEP_DIR):
+    """Generates, simulates and evaluates one scenario. Returns its KPI row."""
+    started = time.perf_counter()
+    scenario_dir = os.path.join(sweep_dir, scenario["scenario_id"])
+    os.makedirs(scenario_dir, exist_ok=True)
+
+    route_file = os.path.join(scenario_dir, "routes.rou.xml")
+    n_vehicles = generate_route_file(
+        route_file,
+        rng=random.Random(scenario["seed"]),
+        dwell_range=DWELL_RANGES[scenario["dwell"]],
+        vehicle_mix=VEHICLE_MIXES[scenario["vehicle_mix"]],
+        trains_per_route=TRAINS_PER_ROUTE,
+        headway_range=HEADWAY_RANGES[scenario["headway"]],
+    )
+    config_file = write_scenario_config(scenario_dir, route_file, scenario["seed"])
+
+    kpis, run_stats = run_kpi_simulation(sumo_command(config_file), end_time=END_TIME, backend=BACKEND)
+    station_table(kpis).to_csv(os.path.join(scenario_dir, "station_kpis.csv"), index=False)
+
+    row = {**scenario, "n_vehicles": n_vehicles, "n_arrived": kpis["travel_time"]["n"], "steps": run_stats["steps"], "sim_time": run_stats["sim_time"]}
+    for kpi, values in kpi_summary(kpis).items():
+        if isinstance(values, dict):
+            row.update({f"{kpi}_{stat}": value for stat, value in values.items()})
+        else:
+            row[kpi] = values
+    row["wall_time_sec"] = round(time.perf_counter() - started, 3)
+    return row
+
+
+def run_sweep(scenarios, workers=SWEEP_WORKERS, sweep_dir=SWEEP_DIR):
+    """
+    Runs all scenarios in a process pool, one fresh process per scenario (also when workers <= 1).
+
+    Returns:
+        pd.DataFrame: One KPI row per scenario, in scenario order.
+    """
+    os.makedirs(sweep_dir, exist_ok=True)
+    rows = []
+    with ProcessPoolExecutor(max_workers=max(workers or 1, 1), max_tasks_per_child=1) as pool:
+        futures = {pool.submit(run_scenario, scenario, sweep_dir): scenario for scenario in scenarios}
+        for future in as_completed(futures):
+            rows.append(future.result())
+            logging.info(f"✅ [{len(rows)}/{len(scenarios)}] {futures[future]['scenario_id']}")
+
+    order = {scenario["scenario_id"]: i for i, scenario in enumerate(scenarios)}
+    return pd.DataFrame(rows).sort_values("scenario_id", key=lambda ids: ids.map(order)).reset_index(drop=True)
+
+
+def summarize_sweep(results):
+    """Mean and standard deviation of every KPI over the seeds of each variant."""
+    kpi_columns = [
+        column for column in results.select_dtypes("number").columns
+        if column not in ("seed", "seed_index")
+    ]
+    summary = results.groupby(["variant", "headway", "dwell", "vehicle_mix"])[kpi_columns].agg(["mean", "std"])
+    summary.columns = [f"{kpi}_{stat}" for kpi, stat in summary.columns]
+    return summary.reset_index()
+
+
+# ------------------ Main ------------------
+
+def main():
+    scenarios = build_scenarios()
+    logging.info(f"🎲 Running {len(scenarios)} scenarios ({len(scenarios) // N_SEEDS} variants x {N_SEEDS} seeds)")
+    results = run_sweep(scenarios)
+
+    results.to_csv(os.path.join(SWEEP_DIR, "sweep_kpis.csv"), index=False)
+    summarize_sweep(results).to_csv(os.path.join(SWEEP_DIR, "sweep_kpi_summary.csv"), index=False)
+    logging.info(f"💾 Saved sweep KPIs to: {SWEEP_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+sumo_output_reader.py
+
+Shared streaming reader for SUMO simulation outputs used by the KPI scripts:
+- tripinfo:  one row per <tripinfo> (with its nested <emissions> totals, if any)
+- stopinfo:  one row per <stopinfo>
+- emissions: one row per <vehicle> of every <timestep> of the emission output
+
+Files are parsed once with iterparse (finished elements are cleared, so memory
+stays flat). Attributes are cast straight into typed column buffers and written
+in chunks to Parquet in a sidecar cache (<output file>.cache/<kind>.parquet).
+Later loads read only the requested Parquet columns; the cache is rebuilt when
+the output file changes (size/mtime).
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import json
+import logging
+import xml.etree.ElementTree as ET
+from array import array
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+F8, STR = "float64", "string"
+
+# element: row element; parent: enclosing element whose "time" is added as column (if any);
+# child: nested element whose attributes are added as columns
+SCHEMAS = {
+    "tripinfo": {
+        "element": "tripinfo",
+        "columns": {
+            "id": STR, "vType": STR, "depart": F8, "departDelay": F8, "arrival": F8, "arrivalLane": STR,
+            "duration": F8, "routeLength": F8, "waitingTime": F8, "waitingCount": F8, "stopTime": F8,
+            "timeLoss": F8, "rerouteNo": F8,
+        },
+        "child": ("emissions", {
+            "CO2_abs": F8, "CO_abs": F8, "HC_abs": F8, "PMx_abs": F8, "NOx_abs": F8,
+            "fuel_abs": F8, "electricity_abs": F8,
+        }),
+    },
+    "stopinfo": {
+        "element": "stopinfo",
+        "columns": {
+            "id": STR, "type": STR, "lane": STR, "edge": STR, "pos": F8, "parking": STR,
+            "started": F8, "ended": F8, "arrival": F8, "departure": F8, "delay": F8,
+            "busStop": STR, "trainStop": STR, "tripId": STR, "line": STR,
+        },
+    },
+    "emissions": {
+        "element": "vehicle",
+        "parent": "timestep",
+        "columns": {
+            "id": STR, "eclass": STR, "CO2": F8, "CO": F8, "HC": F8, "NOx": F8, "PMx": F8,
+            "fuel": F8, "electricity": F8, "speed": F8, "lane": STR,
+        },
+    },
+}
+
+CHUNK_ROWS = 500_000
+
+
+def output_cache_dir(output_path):
+    """Returns the sidecar cache directory for a SUMO output file."""
+    return f"{output_path}.cache"
+
+
+def _source_manifest(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _columns(schema):
+    columns = {}
+    if "parent" in schema:
+        columns["time"] = F8
+    columns.update(schema["columns"])
+    if "child" in schema:
+        columns.update(schema["child"][1])
+    return columns
+
+
+def _new_buffers(columns):
+    return {name: array("d") if dtype == F8 else [] for name, dtype in columns.items()}
+
+
+def _to_table(buffers, columns):
+    return pa.table({
+        name: pa.array(np.frombuffer(buffers[name], dtype=np.float64)) if dtype == F8
+        else pa.array(buffers[name], type=pa.string())
+        for name, dtype in columns.items()
+    })
+
+
+def _append(buffers, columns, attrib):
+    for name, dtype in columns.items():
+        value = attrib.get(name)
+        if dtype == F8:
+            buffers[name].append(np.nan if value is None else float(value))
+        else:
+            buffers[name].append(value)
+
+
+def ingest_sumo_output(output_path, kind, parquet_path, chunk_rows=CHUNK_ROWS):
+    """
+    Streams a tripinfo/stopinfo/emissions XML file into a Parquet file.
+
+    Returns:
+        int: Number of rows written.
+    """
+    schema = SCHEMAS[kind]
+    columns = _columns(schema)
+    element, parent = schema["element"], schema.get("parent")
+    child_tag, child_columns = schema.get("child", (None, {}))
+    own_columns = {name: dtype for name, dtype in columns.items() if name in schema["columns"]}
+
+    logging.info(f"📂 Streaming {kind} output: {output_path}")
+    buffers = _new_buffers(columns)
+    n_rows = pending = 0
+    time = np.nan
+    root = None
+    tmp_path = f"{parquet_path}.tmp"
+    writer = pq.ParquetWriter(tmp_path, _to_table(_new_buffers(columns), columns).schema)
+
+    try:
+        for event, elem in ET.iterparse(output_path, events=("start", "end")):
+            if root is None:
+                root = elem
+                continue
+            tag = elem.tag
+            if event == "start":
+                if parent is not None and tag == parent:
+                    time = float(elem.get("time"))
+                continue
+
+            if tag == element:
+                if parent is not None:
+                    buffers["time"].append(time)
+                _append(buffers, own_columns, elem.attrib)
+                if child_tag is not None:
+                    child = elem.find(child_tag)
+                    _append(buffers, child_columns, {} if child is None else child.attrib)
+                pending += 1
+                if pending >= chunk_rows:
+                    writer.write_table(_to_table(buffers, columns))
+                    n_rows += pending
+                    buffers, pending = _new_buffers(columns), 0
+                if parent is None:
+                    root.clear()
+            elif tag == parent:
+                root.clear()
+
+        if pending:
+            writer.write_table(_to_table(buffers, columns))
+            n_rows += pending
+    except BaseException:
+        writer.close()
+        os.remove(tmp_path)
+        raise
+    writer.close()
+    os.replace(tmp_path, parquet_path)
+
+    logging.info(f"✅ Parsed {n_rows:,} {element} rows")
+    return n_rows
+
+
+def sumo_output_parquet(output_path, kind, use_cache=True):
+    """Returns the Parquet file of a SUMO output, (re)building it when the output changed."""
+    cache_dir = output_cache_dir(output_path)
+    parquet_path = os.path.join(cache_dir, f"{kind}.parquet")
+    manifest_path = os.path.join(cache_dir, f"{kind}.manifest.json")
+
+    if use_cache and os.path.exists(parquet_path) and os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) == _source_manifest(output_path):
+                logging.info(f"⚡ Using cached {kind} table: {parquet_path}")
+                return parquet_path
+
+    os.makedirs(cache_dir, exist_ok=True)
+    ingest_sumo_output(output_path, kind, parquet_path)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump(_source_manifest(output_path), f)
+    logging.info(f"💾 Cached {kind} table in: {parquet_path}")
+    return parquet_path
+
+
+def load_sumo_output(output_path, kind, columns=None, use_cache=True):
+    """
+    Loads a SUMO output as a DataFrame.
+
+    Args:
+        output_path (str): tripinfo, stopinfo or emission output XML file.
+        kind (str): "tripinfo", "stopinfo" or "emissions" (see SCHEMAS).
+        columns (list, optional): Columns to read (all by default).
+        use_cache (bool): Reuse the Parquet sidecar cache when it is current.
+    """
+    return pd.read_parquet(sumo_output_parquet(output_path, kind, use_cache=use_cache), columns=columns)
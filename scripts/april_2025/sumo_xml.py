@@ -0,0 +1,140 @@
+"""
+sumo_xml.py
+
+Shared streaming writer for SUMO XML files (.nod.xml, .edg.xml, .rou.xml, ...).
+
+Elements are written to a buffered file as soon as they are produced, so no
+ElementTree/minidom document is ever held in memory:
+
+    with open_sumo_xml(path, "edges") as f:
+        write_element(f, "edge", {"id": "e_1", "from": "n_1", "to": "n_2"})
+        write_frame(f, "edge", edges_df)           # vectorized, chunked
+
+Nested elements (e.g. <vehicle> with <stop> children) use start_element /
+end_element. Attribute values are escaped; None/NaN attributes are omitted.
+format_shapes turns a flat coordinate array into SUMO shape strings in bulk.
+The file is written to <path>.tmp and moved into place only when complete.
+
+Author: Onur Deniz
+Date: 2025-04
+"""
+
+import os
+import re
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
+
+XML_DECLARATION = '<?xml version="1.0" encoding="UTF-8"?>\n'
+INDENT = "    "
+WRITE_BUFFER_BYTES = 1 << 20
+FRAME_CHUNK_ROWS = 100_000
+SHAPE_POINT_FORMAT = b"%.3f,%.3f "
+
+_NEEDS_ESCAPE = re.compile(r'[&<>"\n\r\t]')
+_ESCAPES = [("&", "&amp;"), ("<", "&lt;"), (">", "&gt;"), ('"', "&quot;"),
+            ("\n", "&#10;"), ("\r", "&#13;"), ("\t", "&#9;")]
+
+
+def escape_attr(value) -> str:
+    """Escapes a value for use inside a double-quoted XML attribute."""
+    value = str(value)
+    if not _NEEDS_ESCAPE.search(value):
+        return value
+    for char, entity in _ESCAPES:
+        value = value.replace(char, entity)
+    return value
+
+
+def _attr_string(attrib) -> str:
+    if not attrib:
+        return ""
+    return "".join(
+        f' {key}="{escape_attr(value)}"' for key, value in attrib.items()
+        if value is not None and not (isinstance(value, float) and value != value)
+    )
+
+
+@contextmanager
+def open_sumo_xml(path, root_tag, root_attrib=None):
+    """
+    Opens a SUMO XML file for streaming and writes the declaration and root element.
+    Yields the open file handle; the root element is closed on exit.
+    """
+    path = str(path)
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8", newline="\n", buffering=WRITE_BUFFER_BYTES) as f:
+            f.write(XML_DECLARATION)
+            f.write(f"<{root_tag}{_attr_string(root_attrib)}>\n")
+            yield f
+            f.write(f"</{root_tag}>\n")
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def write_element(f, tag, attrib=None, depth=1):
+    """Writes one self-closing element."""
+    f.write(f"{INDENT * depth}<{tag}{_attr_string(attrib)}/>\n")
+
+
+def start_element(f, tag, attrib=None, depth=1):
+    """Opens an element that will receive child elements."""
+    f.write(f"{INDENT * depth}<{tag}{_attr_string(attrib)}>\n")
+
+
+def end_element(f, tag, depth=1):
+    f.write(f"{INDENT * depth}</{tag}>\n")
+
+
+def write_elements(f, tag, rows, depth=1):
+    """Writes one self-closing element per attribute dict in rows (any iterable)."""
+    prefix, suffix = f"{INDENT * depth}<{tag}", "/>\n"
+    f.writelines(f"{prefix}{_attr_string(attrib)}{suffix}" for attrib in rows)
+
+
+def write_frame(f, tag, df: pd.DataFrame, depth=1, chunk_rows=FRAME_CHUNK_ROWS):
+    """
+    Writes one self-closing element per DataFrame row, with one attribute per column.
+    Attribute strings are built column-wise with pandas string operations,
+    chunk by chunk, so no Python object is created per element.
+    """
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        line = pd.Series(f"{INDENT * depth}<{tag}", index=chunk.index, dtype=object)
+        for col in chunk.columns:
+            values = chunk[col]
+            missing = values.isna()
+            text = values.astype(str)
+            if text.str.contains(_NEEDS_ESCAPE).any():
+                for char, entity in _ESCAPES:
+                    text = text.str.replace(char, entity, regex=False)
+            line = line + (f' {col}="' + text + '"').where(~missing, "")
+        f.write("".join(line + "/>\n"))
+
+
+def format_shapes(coords: np.ndarray, offsets: np.ndarray, point_format=SHAPE_POINT_FORMAT) -> list:
+    """
+    Formats SUMO shape strings ("x1,y1 x2,y2 ...") for many lines at once.
+
+    Args:
+        coords (np.ndarray): (n_points, 2) coordinates of all lines, concatenated.
+        offsets (np.ndarray): Line i owns coords[offsets[i]:offsets[i + 1]]; lines must be non-empty.
+        point_format (bytes): Fixed %-template of one point, ending in the separator, e.g. b"%r,%r ".
+
+    Returns:
+        list: One shape string per line.
+    """
+    if len(coords) == 0:
+        return []
+    # One template per point; the separator after the last point of every line
+    # becomes "\n", so a single %-format and one split yield one shape per line
+    width = len(point_format)
+    template = np.frombuffer(point_format * len(coords), dtype=np.uint8).copy()
+    template[np.asarray(offsets[1:]) * width - 1] = ord("\n")
+    text = template.tobytes().decode("ascii") % tuple(np.asarray(coords, dtype=np.float64).ravel().tolist())
+    return text.split("\n")[:-1]
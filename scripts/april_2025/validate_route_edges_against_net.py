@@ -2,62 +2,174 @@
 validate_all_route_edges_against_net.py
 
 Checks all mapped route XML files in `mapped_rou/` folder to ensure
-each edge in the route is present in the compiled SUMO network (.net.xml).
+each edge in the route is present in the compiled SUMO network (.net.xml)
+and that consecutive edges are connected in the network.
+
+The edge IDs and the edge graph are loaded from the cached network tables
+(see net_reader.py) once per worker process; route files are spread over a
+process pool and streamed with iterparse. Results are written as a structured
+report:
+- route_validation_issues.csv: file, vehicle, issue, edge, next_edge
+- route_validation_report.json: totals plus per-file counts and timing
 
 Author: GPT-4 + Onur | April 2025
 """
 
 import os
+import json
+import time
 import logging
 import xml.etree.ElementTree as ET
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from net_reader import load_edge_ids
+from route_completion import load_edge_graph
 
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 # Paths
 NET_PATH = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\april_2025_swiss\april_2025_swiss.net.xml"
 ROUTE_FOLDER = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\mapped_rou"
+ISSUES_CSV = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\route_validation_issues.csv"
+REPORT_JSON = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\routes\route_validation_report.json"
+
+VALIDATION_WORKERS = os.cpu_count()  # 1 -> validate serially in this process
+FILES_PER_TASK = 8
+VEHICLE_TAGS = {"vehicle", "trip", "flow"}
+
+# Per-process state, set by init_validation()
+_valid_edges = None
+_connected_pairs = None
 
 def get_valid_edge_ids(net_file):
     logging.info(f"📥 Loading edge IDs from network: {net_file}")
-    tree = ET.parse(net_file)
-    root = tree.getroot()
-    return set(edge.attrib["id"] for edge in root.findall(".//edge") if "id" in edge.attrib)
-
-def validate_route(route_file, valid_edges):
-    invalid_entries = []
-    tree = ET.parse(route_file)
-    for vehicle in tree.findall(".//vehicle"):
-        veh_id = vehicle.attrib.get("id", "unknown")
-        for route in vehicle.findall(".//route"):
-            if "edges" in route.attrib:
-                edge_ids = route.attrib["edges"].split()
-                for eid in edge_ids:
-                    if eid not in valid_edges:
-                        invalid_entries.append((veh_id, eid))
-    return invalid_entries
+    return load_edge_ids(net_file)
 
-def main():
-    valid_edges = get_valid_edge_ids(NET_PATH)
-    logging.info(f"✅ Loaded {len(valid_edges):,} valid edges from network.")
-    
-    all_issues = []
-    route_files = [f for f in os.listdir(ROUTE_FOLDER) if f.endswith(".rou.xml")]
+def get_connected_pairs(net_file):
+    """Set of (from_edge, to_edge) pairs a vehicle can drive between directly."""
+    graph = load_edge_graph(net_file)
+    nodes = graph["nodes"]
+    sources = np.repeat(np.arange(len(nodes)), np.diff(graph["indptr"]))
+    return set(zip(nodes[sources], nodes[graph["indices"]]))
+
+def init_validation(net_file):
+    """Loads the edge-id index into this process (also used as pool initializer)."""
+    global _valid_edges, _connected_pairs
+    _valid_edges = get_valid_edge_ids(net_file)
+    _connected_pairs = get_connected_pairs(net_file)
+
+def validate_route(route_file, valid_edges, connected_pairs=None):
+    """
+    Streams the routes of one file and returns its issues as
+    (vehicle, issue, edge, next_edge) tuples plus the number of routes and edges.
+    """
+    issues = []
+    n_routes = n_edges = 0
+    vehicle_id = None
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(route_file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            if elem.tag in VEHICLE_TAGS:
+                vehicle_id = elem.attrib.get("id", "unknown")
+            continue
+        depth -= 1
+
+        if elem.tag == "route" and "edges" in elem.attrib:
+            edge_ids = elem.attrib["edges"].split()
+            owner = vehicle_id or elem.attrib.get("id", "unknown")
+            n_routes += 1
+            n_edges += len(edge_ids)
+            for eid in edge_ids:
+                if eid not in valid_edges:
+                    issues.append((owner, "invalid_edge", eid, None))
+            if connected_pairs is not None:
+                for pair in zip(edge_ids, edge_ids[1:]):
+                    if pair not in connected_pairs and pair[0] in valid_edges and pair[1] in valid_edges:
+                        issues.append((owner, "disconnected_pair", pair[0], pair[1]))
+        elif elem.tag in VEHICLE_TAGS:
+            vehicle_id = None
+        if depth == 1:
+            root.clear()  # Finished top-level vehicle, route, vType, ...
+    return issues, n_routes, n_edges
+
+def _validate_file(route_path):
+    start = time.perf_counter()
+    issues, n_routes, n_edges = validate_route(route_path, _valid_edges, _connected_pairs)
+    return os.path.basename(route_path), issues, n_routes, n_edges, time.perf_counter() - start
+
+def validate_route_files(route_paths, net_file, workers=VALIDATION_WORKERS):
+    """
+    Validates many route files.
 
+    Returns:
+        tuple: (issues DataFrame: file, vehicle, issue, edge, next_edge;
+                per-file DataFrame: file, n_routes, n_edges, n_invalid_edges, n_disconnected_pairs, seconds)
+    """
+    if workers is None or workers <= 1 or len(route_paths) <= FILES_PER_TASK:
+        init_validation(net_file)
+        results = list(map(_validate_file, route_paths))
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_validation, initargs=(net_file,)) as pool:
+            results = list(pool.map(_validate_file, route_paths, chunksize=FILES_PER_TASK))
+
+    issues = pd.DataFrame(
+        [(name, *issue) for name, file_issues, _, _, _ in results for issue in file_issues],
+        columns=["file", "vehicle", "issue", "edge", "next_edge"],
+    )
+    files = pd.DataFrame(
+        [
+            (
+                name, n_routes, n_edges,
+                sum(1 for issue in file_issues if issue[1] == "invalid_edge"),
+                sum(1 for issue in file_issues if issue[1] == "disconnected_pair"),
+                round(seconds, 6),
+            )
+            for name, file_issues, n_routes, n_edges, seconds in results
+        ],
+        columns=["file", "n_routes", "n_edges", "n_invalid_edges", "n_disconnected_pairs", "seconds"],
+    )
+    return issues, files
+
+def main():
+    route_files = sorted(f for f in os.listdir(ROUTE_FOLDER) if f.endswith(".rou.xml"))
+    route_paths = [os.path.join(ROUTE_FOLDER, rf) for rf in route_files]
     logging.info(f"🔎 Validating {len(route_files)} route files in: {ROUTE_FOLDER}")
-    
-    for rf in route_files:
-        route_path = os.path.join(ROUTE_FOLDER, rf)
-        issues = validate_route(route_path, valid_edges)
-        if issues:
-            logging.warning(f"❌ Found {len(issues)} invalid edge(s) in {rf}:")
-            for veh_id, eid in issues:
-                logging.warning(f" → Vehicle '{veh_id}' references unknown edge '{eid}'")
-            all_issues.extend([(rf, veh_id, eid) for veh_id, eid in issues])
-        else:
-            logging.info(f"✅ {rf} is valid.")
-
-    if all_issues:
-        logging.info(f"🚨 Summary: {len(all_issues)} invalid edge references found across {len(route_files)} file(s).")
+
+    start = time.perf_counter()
+    issues, files = validate_route_files(route_paths, NET_PATH)
+    elapsed = time.perf_counter() - start
+
+    for row in files[(files["n_invalid_edges"] > 0) | (files["n_disconnected_pairs"] > 0)].itertuples():
+        logging.warning(
+            f"❌ {row.file}: {row.n_invalid_edges} unknown edge(s), "
+            f"{row.n_disconnected_pairs} disconnected edge pair(s)"
+        )
+
+    issues.to_csv(ISSUES_CSV, index=False)
+    report = {
+        "net": NET_PATH,
+        "route_folder": ROUTE_FOLDER,
+        "n_files": len(files),
+        "n_invalid_files": int(((files["n_invalid_edges"] > 0) | (files["n_disconnected_pairs"] > 0)).sum()),
+        "n_invalid_edges": int(files["n_invalid_edges"].sum()),
+        "n_disconnected_pairs": int(files["n_disconnected_pairs"].sum()),
+        "seconds": round(elapsed, 3),
+        "files": files.to_dict(orient="records"),
+    }
+    with open(REPORT_JSON, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    logging.info(f"💾 Saved validation report to: {REPORT_JSON} (issues: {ISSUES_CSV})")
+
+    if len(issues):
+        logging.info(
+            f"🚨 Summary: {report['n_invalid_edges']} invalid edge references and "
+            f"{report['n_disconnected_pairs']} disconnected pairs across {report['n_invalid_files']} file(s)."
+        )
     else:
         logging.info("🎉 All route files are clean and match the network.")
 
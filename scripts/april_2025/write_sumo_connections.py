@@ -0,0 +1,100 @@
+"""
+write_sumo_connections.py
+
+Phase 4: Writes explicit rail connections to the SUMO .con.xml file and checks
+network connectivity before netconvert runs (see network_connectivity.py).
+
+Every edge is connected to the edges leaving its end node (no turnarounds, and
+no moves deflecting by more than 90° at the node, e.g. between the two diverging
+legs of a switch).
+The connectivity report lists, per edge, its strongly connected component,
+dead ends, entry-only edges and references to missing nodes. When the GTFS stop
+sequences are available, the nearest edge of every used stop is checked to lie
+on the main network component.
+
+Input:
+- data/processed/rail_nodes_named.csv
+- data/processed/rail_edges_named.csv
+- data/processed/routes/stop_sequences/*.csv + GTFS stops.txt (optional)
+
+Output:
+- sumo/inputs/april_2025_swiss/april_2025_swiss.con.xml
+- data/processed/rail_connectivity_report.csv
+"""
+
+import os
+import glob
+import logging
+import pandas as pd
+import geopandas as gpd
+from sumo_xml import open_sumo_xml, write_frame
+from write_sumo_edges import sanitize_edge_ids
+from edge_index import load_edge_index, nearest_edge_ids
+from network_connectivity import connectivity_report, log_summary
+
+# --- Config ---
+NODES_PATH = "data/processed/rail_nodes_named.csv"
+EDGES_PATH = "data/processed/rail_edges_named.csv"
+STOP_FOLDER = "data/processed/routes/stop_sequences"
+STOPS_FILE = "data/raw/swiss/gtfs_ftp_2025/stops.txt"
+OUTPUT_PATH = "sumo/inputs/april_2025_swiss/april_2025_swiss.con.xml"
+REPORT_PATH = "data/processed/rail_connectivity_report.csv"
+
+PROJECTION = "EPSG:2056"
+SEARCH_RADIUS_METERS = 500
+
+# --- Logging ---
+logging.basicConfig(
+    level=logging.INFO,
+    format="%(asctime)s [%(levelname)s] %(message)s"
+)
+
+def load_stop_edge_ids():
+    """Nearest (sanitized) edge ID of every stop used by the stop sequences; None if unavailable."""
+    stop_files = glob.glob(os.path.join(STOP_FOLDER, "*.csv"))
+    if not stop_files or not os.path.exists(STOPS_FILE):
+        logging.info("ℹ️ No stop sequences found. Skipping the stop edge check.")
+        return None
+
+    used_stop_ids = set()
+    for stop_file in stop_files:
+        df = pd.read_csv(stop_file, dtype={"stop_id": str})
+        if "stop_id" in df.columns:
+            used_stop_ids.update(df["stop_id"].dropna())
+
+    stops = pd.read_csv(STOPS_FILE, usecols=["stop_id", "stop_lat", "stop_lon"], dtype={"stop_id": str})
+    stops = stops[stops["stop_id"].isin(used_stop_ids)].dropna()
+    points = gpd.GeoSeries(gpd.points_from_xy(stops["stop_lon"], stops["stop_lat"]), crs="EPSG:4326").to_crs(PROJECTION)
+
+    edge_index = load_edge_index(EDGES_PATH, id_column="edge_id_human")
+    edge_ids = pd.Series(nearest_edge_ids(edge_index, points, search_radius=SEARCH_RADIUS_METERS)).dropna()
+    logging.info(f"📍 Matched {len(edge_ids):,} of {len(stops):,} used stops to edges.")
+    return sanitize_edge_ids(edge_ids).to_numpy()
+
+def main():
+    logging.info("🧱 Building rail connections from node and edge tables...")
+    os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
+
+    nodes = pd.read_csv(NODES_PATH, usecols=["node_id"])
+    edges = pd.read_csv(EDGES_PATH, usecols=["edge_id_human", "from_node", "to_node", "geometry"])
+    edges = pd.DataFrame({
+        "id": sanitize_edge_ids(edges["edge_id_human"]),
+        "from": edges["from_node"],
+        "to": edges["to_node"],
+        "geometry": edges["geometry"],
+    })
+    logging.info(f"✅ Loaded {len(nodes):,} nodes and {len(edges):,} edges")
+
+    report = connectivity_report(nodes["node_id"], edges, stop_edge_ids=load_stop_edge_ids())
+    log_summary(report["summary"])
+
+    with open_sumo_xml(OUTPUT_PATH, "connections") as f:
+        write_frame(f, "connection", report["connections"])
+    logging.info(f"💾 Saved {len(report['connections']):,} connections to: {OUTPUT_PATH}")
+
+    report["edges"].to_csv(REPORT_PATH, index=False)
+    logging.info(f"💾 Saved connectivity report to: {REPORT_PATH}")
+    logging.info("✅ Phase 4 complete. You're now ready for Phase 5: netconvert.")
+
+if __name__ == "__main__":
+    main()
@@ -9,63 +9,74 @@ Input:
 
 Output:
 - sumo/inputs/april_2025_swiss/april_2025_swiss.edg.xml
+
+Edges are streamed to disk column-wise (see sumo_xml.py). WKT parsing, shape
+formatting and ID sanitizing run in bulk over all edges: geometries are parsed
+with shapely.from_wkt, their coordinates flattened with get_coordinates, and all
+shape strings are produced in one call (sumo_xml.format_shapes).
 """
 
+import numpy as np
 import pandas as pd
 import os
 import logging
-import re
-from shapely import wkt
-from shapely.geometry import LineString
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+import shapely
+from sumo_xml import open_sumo_xml, write_frame, format_shapes
 
 # --- Config ---
 INPUT_PATH = "data/processed/rail_edges_named.csv"
 OUTPUT_PATH = "sumo/inputs/april_2025_swiss/april_2025_swiss.edg.xml"
 
+LINE_TYPE_IDS = [1, 2]  # shapely type ids of LineString and LinearRing
+
 # --- Logging ---
 logging.basicConfig(
     level=logging.INFO,
     format="%(asctime)s [%(levelname)s] %(message)s"
 )
 
-def linestring_to_shape(line: LineString) -> str:
-    """Converts a Shapely LineString into SUMO shape string: x1,y1 x2,y2 ..."""
-    return " ".join([f"{x:.3f},{y:.3f}" for x, y, *_ in line.coords])
-
-def sanitize_edge_id(edge_id: str) -> str:
-    """Make edge ID safe for SUMO by replacing/removing invalid characters."""
-    edge_id = str(edge_id)
-    edge_id = edge_id.replace("&", "and")
-    edge_id = re.sub(r"[ ,:()\.\\/\"']", "_", edge_id)
-    edge_id = re.sub(r"__+", "_", edge_id)  # Collapse multiple underscores
-    return edge_id.strip("_")
+def linestrings_to_shapes(geoms: np.ndarray) -> np.ndarray:
+    """
+    Converts an array of shapely geometries into SUMO shape strings (x1,y1 x2,y2 ...).
+    Entries that are not (non-empty) LineStrings get None.
+    """
+    shapes = np.full(len(geoms), None, dtype=object)
+    is_line = np.isin(shapely.get_type_id(geoms), LINE_TYPE_IDS) & (shapely.get_num_coordinates(geoms) > 0)
+    if not is_line.any():
+        return shapes
+
+    coords, index = shapely.get_coordinates(geoms[is_line], return_index=True)
+    offsets = np.r_[0, np.flatnonzero(index[1:] != index[:-1]) + 1, len(index)]
+    shapes[is_line] = format_shapes(coords, offsets)
+    return shapes
+
+def sanitize_edge_ids(edge_ids: pd.Series) -> pd.Series:
+    """Make edge IDs safe for SUMO by replacing/removing invalid characters."""
+    return (
+        edge_ids.astype(str)
+        .str.replace("&", "and", regex=False)
+        .str.replace(r"[ ,:()\.\\/\"']", "_", regex=True)
+        .str.replace(r"__+", "_", regex=True)  # Collapse multiple underscores
+        .str.strip("_")
+    )
 
 def main():
     logging.info("🚀 Generating SUMO .edg.xml from enriched edge file...")
     os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 
-    df = pd.read_csv(INPUT_PATH)
+    df = pd.read_csv(INPUT_PATH, usecols=["edge_id_human", "from_node", "to_node", "geometry"])
     logging.info(f"✅ Loaded {len(df)} edges from: {INPUT_PATH}")
-    df["geometry"] = df["geometry"].apply(wkt.loads)
-
-    root = Element("edges")
-
-    for _, row in df.iterrows():
-        edge_id = sanitize_edge_id(row["edge_id_human"])
-        attrib = {
-            "id": edge_id,
-            "from": row["from_node"],
-            "to": row["to_node"],
-        }
 
-        if isinstance(row["geometry"], LineString):
-            attrib["shape"] = linestring_to_shape(row["geometry"])
+    edges = pd.DataFrame({
+        "id": sanitize_edge_ids(df["edge_id_human"]),
+        "from": df["from_node"],
+        "to": df["to_node"],
+        "shape": linestrings_to_shapes(shapely.from_wkt(df["geometry"].to_numpy())),
+    })
 
-        SubElement(root, "edge", attrib)
+    with open_sumo_xml(OUTPUT_PATH, "edges") as f:
+        write_frame(f, "edge", edges)
 
-    tree = ElementTree(root)
-    tree.write(OUTPUT_PATH, encoding="UTF-8", xml_declaration=True)
     logging.info(f"💾 Saved edge file to: {OUTPUT_PATH}")
     logging.info("✅ Phase 3 complete (with sanitized IDs). You may now re-run Phase 5.")
 
@@ -8,12 +8,14 @@ Input:
 
 Output:
 - sumo/inputs/april_2025_swiss/april_2025_swiss.nod.xml
+
+Nodes are streamed to disk column-wise (see sumo_xml.py) instead of building an ElementTree.
 """
 
 import pandas as pd
 import os
 import logging
-from xml.etree.ElementTree import Element, SubElement, ElementTree
+from sumo_xml import open_sumo_xml, write_frame
 
 # --- Config ---
 INPUT_PATH = "data/processed/rail_nodes_named.csv"
@@ -29,23 +31,11 @@ def main():
     logging.info("🚀 Generating SUMO .nod.xml from enriched node file...")
     os.makedirs(os.path.dirname(OUTPUT_PATH), exist_ok=True)
 
-    df = pd.read_csv(INPUT_PATH)
+    df = pd.read_csv(INPUT_PATH, usecols=["node_id", "x", "y"])
     logging.info(f"✅ Loaded {len(df)} nodes from: {INPUT_PATH}")
 
-    # Root XML
-    root = Element("nodes")
-
-    for _, row in df.iterrows():
-        SubElement(
-            root,
-            "node",
-            id=row["node_id"],
-            x=str(row["x"]),
-            y=str(row["y"])
-        )
-
-    tree = ElementTree(root)
-    tree.write(OUTPUT_PATH, encoding="UTF-8", xml_declaration=True)
+    with open_sumo_xml(OUTPUT_PATH, "nodes") as f:
+        write_frame(f, "node", df.rename(columns={"node_id": "id"})[["id", "x", "y"]])
     logging.info(f"💾 Saved node file to: {OUTPUT_PATH}")
     logging.info("✅ Phase 2 complete. Ready for Phase 3: write_sumo_edges.py")
 
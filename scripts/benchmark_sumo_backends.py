@@ -0,0 +1,57 @@
+"""
+benchmark_sumo_backends.py
+
+Compares simulation throughput (steps/second) of the traci (socket) and
+libsumo (in-process) backends on the april_2025_swiss scenario.
+
+Every run executes the full online KPI loop of traci_control.py, so the
+per-step query load matches real use. Each run gets its own process: libsumo
+loads SUMO into the calling process and allows only one simulation there.
+Runs are sequential, so they do not compete for cores.
+
+Output:
+- outputs/benchmarks/sumo_backend_benchmark.csv (one row per run)
+"""
+
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from sumo_runner import BACKENDS, sumo_command
+from traci_control import SUMO_CONFIG, END_TIME, run_kpi_simulation
+
+# --- Config ---
+OUTPUT_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\outputs\benchmarks"
+REPEATS = 3
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+def benchmark_run(backend, config_path=SUMO_CONFIG, end_time=END_TIME):
+    """Runs the KPI simulation once with the given backend and returns its run stats."""
+    _, run_stats = run_kpi_simulation(sumo_command(config_path), end_time=end_time, backend=backend)
+    return run_stats
+
+
+def main():
+    rows = []
+    for repeat in range(REPEATS):
+        for backend in BACKENDS:
+            with ProcessPoolExecutor(max_workers=1) as executor:
+                run_stats = executor.submit(benchmark_run, backend).result()
+            rows.append({"repeat": repeat, **run_stats})
+
+    results = pd.DataFrame(rows)
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    results.to_csv(os.path.join(OUTPUT_DIR, "sumo_backend_benchmark.csv"), index=False)
+
+    summary = results.groupby("backend")["steps_per_sec"].median()
+    for backend, steps_per_sec in summary.items():
+        logging.info(f"⏱️ {backend}: {steps_per_sec:,.0f} steps/s (median of {REPEATS})")
+    if set(BACKENDS) <= set(summary.index):
+        logging.info(f"🚀 libsumo speedup: {summary['libsumo'] / summary['traci']:.2f}x")
+    logging.info(f"💾 Saved benchmark to: {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+fcd_store.py
+
+Memory-mapped column store for SUMO FCD (floating car data) output.
+
+The FCD XML is streamed once with iterparse (timesteps are cleared as soon as
+they are consumed) and written in chunks to one fixed-width binary file per
+column next to the source file (<fcd file>.store/):
+
+    time     float64  simulation time (s)
+    vehicle  int32    index into vehicle_ids
+    x, y     float64  position (m)
+    speed    float32  speed (m/s)
+    edge     int32    index into edge_ids (-1 if the vehicle is not on an edge)
+
+Vehicle and edge IDs are interned once (ids.json). Rows keep the order of the
+FCD file (time ascending). Opening the store memory-maps the columns, so
+analyses over multi-gigabyte runs only touch the pages they read; the store is
+rebuilt when the FCD file changes (size/mtime).
+
+vehicle_sorted() adds a second layout (<store>/by_vehicle/) with the columns
+ordered by (vehicle, time) and per-vehicle offsets, as used by
+trajectory_analytics.py.
+
+Typical use:
+    store = open_fcd_store("outputs/fcd.xml")
+    for chunk in iter_chunks(store):
+        ...  # dict of column slices
+"""
+
+import os
+import json
+import logging
+import xml.etree.ElementTree as ET
+import numpy as np
+
+COLUMNS = {
+    "time": np.float64,
+    "vehicle": np.int32,
+    "x": np.float64,
+    "y": np.float64,
+    "speed": np.float32,
+    "edge": np.int32,
+}
+CHUNK_ROWS = 1_000_000
+
+
+def fcd_store_dir(fcd_path):
+    return f"{fcd_path}.store"
+
+
+def _source_manifest(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _flush(buffers, files):
+    for name, values in buffers.items():
+        np.asarray(values, dtype=COLUMNS[name]).tofile(files[name])
+        values.clear()
+
+
+def build_fcd_store(fcd_path, store_dir=None, chunk_rows=CHUNK_ROWS):
+    """
+    Streams an FCD XML file into the column store.
+
+    Returns:
+        str: The store directory.
+    """
+    store_dir = store_dir or fcd_store_dir(fcd_path)
+    os.makedirs(store_dir, exist_ok=True)
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)  # The store is incomplete until the manifest is rewritten
+
+    vehicle_index, edge_index, lane_edges = {}, {}, {}
+    buffers = {name: [] for name in COLUMNS}
+    files = {name: open(os.path.join(store_dir, f"{name}.bin"), "wb") for name in COLUMNS}
+    n_rows = 0
+    time = np.nan
+
+    try:
+        context = ET.iterparse(fcd_path, events=("start", "end"))
+        _, root = next(context)
+        for event, elem in context:
+            if event == "start":
+                if elem.tag == "timestep":
+                    time = float(elem.attrib["time"])
+                continue
+            if elem.tag == "vehicle":
+                attrib = elem.attrib
+                vehicle_id = attrib["id"]
+                vehicle = vehicle_index.get(vehicle_id)
+                if vehicle is None:
+                    vehicle = vehicle_index[vehicle_id] = len(vehicle_index)
+
+                # Lane IDs are <edge>_<index>; mesoscopic output has an edge attribute instead
+                lane = attrib.get("lane")
+                edge_id = lane_edges.get(lane) if lane is not None else attrib.get("edge")
+                if edge_id is None and lane is not None:
+                    edge_id = lane_edges[lane] = lane.rsplit("_", 1)[0]
+                edge = -1
+                if edge_id is not None:
+                    edge = edge_index.get(edge_id)
+                    if edge is None:
+                        edge = edge_index[edge_id] = len(edge_index)
+
+                buffers["time"].append(time)
+                buffers["vehicle"].append(vehicle)
+                buffers["x"].append(float(attrib.get("x", "nan")))
+                buffers["y"].append(float(attrib.get("y", "nan")))
+                buffers["speed"].append(float(attrib.get("speed", "nan")))
+                buffers["edge"].append(edge)
+                n_rows += 1
+                if len(buffers["time"]) >= chunk_rows:
+                    _flush(buffers, files)
+            elif elem.tag == "timestep":
+                root.clear()
+        _flush(buffers, files)
+    finally:
+        for f in files.values():
+            f.close()
+
+    with open(os.path.join(store_dir, "ids.json"), "w", encoding="utf-8") as f:
+        json.dump({"vehicle_ids": list(vehicle_index), "edge_ids": list(edge_index)}, f)
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        json.dump({
+            "source": _source_manifest(fcd_path),
+            "n_rows": n_rows,
+            "columns": {name: np.dtype(dtype).str for name, dtype in COLUMNS.items()},
+        }, f)
+    return store_dir
+
+
+def _store_is_current(fcd_path, store_dir):
+    manifest_path = os.path.join(store_dir, "manifest.json")
+    if not os.path.exists(manifest_path):
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    return manifest["source"] == _source_manifest(fcd_path) and manifest["columns"] == {
+        name: np.dtype(dtype).str for name, dtype in COLUMNS.items()
+    }
+
+
+def open_fcd_store(fcd_path, store_dir=None, rebuild=False):
+    """
+    Opens (building it first if needed) the column store of an FCD file.
+
+    Returns:
+        dict: n_rows, vehicle_ids (np.ndarray[str]), edge_ids (np.ndarray[str]) and one
+              read-only memory-mapped array per column in COLUMNS.
+    """
+    store_dir = store_dir or fcd_store_dir(fcd_path)
+    if rebuild or not _store_is_current(fcd_path, store_dir):
+        logging.info(f"📦 Building FCD store: {store_dir}")
+        build_fcd_store(fcd_path, store_dir)
+
+    with open(os.path.join(store_dir, "manifest.json"), "r", encoding="utf-8") as f:
+        n_rows = json.load(f)["n_rows"]
+    with open(os.path.join(store_dir, "ids.json"), "r", encoding="utf-8") as f:
+        ids = json.load(f)
+
+    store = {
+        "store_dir": store_dir,
+        "n_rows": n_rows,
+        "vehicle_ids": np.asarray(ids["vehicle_ids"], dtype=str),
+        "edge_ids": np.asarray(ids["edge_ids"], dtype=str),
+    }
+    for name, dtype in COLUMNS.items():
+        path = os.path.join(store_dir, f"{name}.bin")
+        # np.memmap cannot map empty files
+        store[name] = np.memmap(path, dtype=dtype, mode="r", shape=(n_rows,)) if n_rows else np.empty(0, dtype=dtype)
+    return store
+
+
+def iter_chunks(store, chunk_rows=CHUNK_ROWS, columns=tuple(COLUMNS)):
+    """Yields consecutive row ranges of the store as dicts of column arrays."""
+    for start in range(0, store["n_rows"], chunk_rows):
+        stop = min(start + chunk_rows, store["n_rows"])
+        yield {name: np.asarray(store[name][start:stop]) for name in columns}
+
+
+def vehicle_sorted(store, chunk_rows=CHUNK_ROWS):
+    """
+    Returns the columns of a store ordered by (vehicle, time), building the
+    by_vehicle layout on first use.
+
+    Returns:
+        dict: n_rows, vehicle_ids, edge_ids, offsets (vehicle k owns rows
+              offsets[k]:offsets[k + 1]) and one memory-mapped array per column
+              except vehicle.
+    """
+    sorted_dir = os.path.join(store["store_dir"], "by_vehicle")
+    manifest_path = os.path.join(sorted_dir, "manifest.json")
+    with open(os.path.join(store["store_dir"], "manifest.json"), "r", encoding="utf-8") as f:
+        source_manifest = json.load(f)
+
+    current = False
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            current = json.load(f) == source_manifest
+    columns = [name for name in COLUMNS if name != "vehicle"]
+
+    if not current:
+        os.makedirs(sorted_dir, exist_ok=True)
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
+        # Counting sort out of core: pass 1 counts the rows per vehicle, pass 2
+        # scatters every chunk to per-vehicle cursors. Rows are in time order,
+        # so every trajectory stays in time order.
+        n_vehicles = len(store["vehicle_ids"])
+        counts = np.zeros(n_vehicles, dtype=np.int64)
+        for chunk in iter_chunks(store, chunk_rows, columns=("vehicle",)):
+            counts += np.bincount(chunk["vehicle"], minlength=n_vehicles)
+        offsets = np.r_[0, np.cumsum(counts)].astype(np.int64)
+        np.save(os.path.join(sorted_dir, "offsets.npy"), offsets)
+
+        outputs = {}
+        for name in columns:
+            path = os.path.join(sorted_dir, f"{name}.bin")
+            if store["n_rows"]:
+                outputs[name] = np.memmap(path, dtype=COLUMNS[name], mode="w+", shape=(store["n_rows"],))
+            else:
+                open(path, "wb").close()  # np.memmap cannot map empty files
+
+        cursors = offsets[:-1].copy()
+        for chunk in iter_chunks(store, chunk_rows, columns=("vehicle", *columns)):
+            vehicle = chunk["vehicle"]
+            order = np.argsort(vehicle, kind="stable")
+            chunk_counts = np.bincount(vehicle, minlength=n_vehicles)
+            chunk_starts = np.cumsum(chunk_counts) - chunk_counts
+            sorted_vehicle = vehicle[order]
+            positions = cursors[sorted_vehicle] + np.arange(len(order)) - chunk_starts[sorted_vehicle]
+            for name in columns:
+                outputs[name][positions] = chunk[name][order]
+            cursors += chunk_counts
+        for output in outputs.values():
+            output.flush()
+        del outputs
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(source_manifest, f)
+
+    n_rows = store["n_rows"]
+    sorted_store = {
+        "n_rows": n_rows,
+        "vehicle_ids": store["vehicle_ids"],
+        "edge_ids": store["edge_ids"],
+        "offsets": np.load(os.path.join(sorted_dir, "offsets.npy")),
+    }
+    for name in columns:
+        path = os.path.join(sorted_dir, f"{name}.bin")
+        sorted_store[name] = np.memmap(path, dtype=COLUMNS[name], mode="r", shape=(n_rows,)) if n_rows else np.empty(0, dtype=COLUMNS[name])
+    return sorted_store
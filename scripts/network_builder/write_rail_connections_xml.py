@@ -0,0 +1,45 @@
+import os
+import sys
+import geopandas as gpd
+import pandas as pd
+import logging
+from pathlib import Path
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "april_2025"))
+from sumo_xml import open_sumo_xml, write_frame
+from network_connectivity import connectivity_report, log_summary
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(message)s")
+
+# === File paths ===
+EDGES_FILE = Path("data/processed/rail_edges_only.geojson")
+NODES_FILE = Path("data/processed/rail_nodes_only.geojson")
+OUTPUT_FILE = Path("data/processed/rail_connections.con.xml")
+
+logging.info("🚀 Starting Phase 5: Write rail_connections.con.xml")
+
+# === Load data (edge IDs as written by write_rail_edges_xml.py) ===
+gdf_edges = gpd.read_file(EDGES_FILE)
+gdf_nodes = gpd.read_file(NODES_FILE, ignore_geometry=True)
+
+edges = pd.DataFrame({
+    "id": "edge_" + gdf_edges["from_node_object_id"].astype(str) + "_" + gdf_edges["to_node_object_id"].astype(str),
+    "from": gdf_edges["from_node_object_id"],
+    "to": gdf_edges["to_node_object_id"],
+    "geometry": gdf_edges.geometry.to_numpy(),  # Turning angles at switches
+})
+# write_rail_edges_xml.py drops edges with unknown nodes and duplicate IDs
+edges = edges[edges["from"].isin(gdf_nodes["object_id"]) & edges["to"].isin(gdf_nodes["object_id"])]
+edges = edges.drop_duplicates("id")
+logging.info(f"✅ Loaded {len(edges)} rail edges and {len(gdf_nodes)} rail nodes")
+
+# === Connectivity check + explicit connections ===
+report = connectivity_report(gdf_nodes["object_id"], edges)
+log_summary(report["summary"])
+
+with open_sumo_xml(OUTPUT_FILE, "connections") as f:
+    write_frame(f, "connection", report["connections"])
+
+logging.info("💾 Wrote %d connections to %s", len(report["connections"]), OUTPUT_FILE)
+logging.info("✅ Phase 5 complete")
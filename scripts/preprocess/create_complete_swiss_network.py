@@ -13,12 +13,18 @@ Features:
 - Avoids duplicate nodes by checking for identical coordinates and IDs.
 - Creates only necessary intermediate nodes based on the number of geometry points.
 - Ensures that `to` nodes of one edge match the `from` nodes of the next.
+- Projects all vertices of the file in one vectorized pass (see projection.py) and
+  formats all edge shapes in bulk.
 """
 
 import os
-import json
+import sys
 import logging
-from pyproj import Transformer
+from geojson_stream import load_features
+from projection import flatten_linestrings, project_vertices, pyproj_projector
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "april_2025"))
+from sumo_xml import format_shapes
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -36,19 +42,13 @@ V_MAX_KMH = 250  # Maximum speed in km/h
 V_MAX_MS = round(V_MAX_KMH / 3.6, 2)  # Convert to m/s
 BIDIRECTIONAL = True
 
-# Initialize Transformer for WGS84 to UTM
-transformer = Transformer.from_crs("epsg:4326", "epsg:32632", always_xy=True)
-
-def wgs84_to_utm(lon, lat, precision=16):
-    """Convert WGS84 coordinates to UTM and round them to a given precision."""
-    utm_x, utm_y = transformer.transform(lon, lat)
-    return round(utm_x, precision), round(utm_y, precision)
+# WGS84 -> UTM zone 32N, applied to whole coordinate arrays
+wgs84_to_utm = pyproj_projector("epsg:4326", "epsg:32632")
 
 def load_geojson(file_path):
-    """Load GeoJSON file and return its content."""
+    """Stream the features of a GeoJSON file (see geojson_stream.py)."""
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return load_features(file_path)
     except Exception as e:
         logger.error(f"Failed to load GeoJSON file: {e}")
         raise
@@ -59,41 +59,30 @@ def generate_sumo_files(features, node_file, edge_file, con_file):
     edges = []
     connections = []
 
-    def add_node(node_id, utm_x, utm_y):
-        """Add a node using UTM coordinates directly."""
-        if node_id not in nodes:
-            nodes[node_id] = (utm_x, utm_y)
-        return node_id, utm_x, utm_y
+    # Convert all WGS84 vertices to UTM at once
+    line_idx, offsets, lonlat = flatten_linestrings(features)
+    utm_xy = project_vertices(lonlat, wgs84_to_utm)
+    shapes = format_shapes(utm_xy, offsets, point_format=b"%r,%r ")
+    logger.info(f"Projected {len(utm_xy):,} vertices of {len(line_idx):,} LineStrings.")
 
-    for feature in features:
-        geometry = feature.get("geometry", {})
-        properties = feature.get("properties", {})
+    for k, feature_idx in enumerate(line_idx):
+        properties = features[feature_idx].get("properties", {})
         bp_anfang = properties.get("bp_anfang", "unknown_start")
         bp_ende = properties.get("bp_ende", "unknown_end")
 
-        if geometry.get("type") == "LineString" and len(geometry.get("coordinates", [])) > 1:
-            # Convert WGS84 to UTM
-            utm_geolist = [wgs84_to_utm(lon, lat) for lon, lat in geometry["coordinates"]]
-
-            # Create start node
-            start_coord = utm_geolist[0]
-            start_node_id, start_utm_x, start_utm_y = add_node(bp_anfang, *start_coord)
-
-            # Create end node
-            end_coord = utm_geolist[-1]
-            end_node_id, end_utm_x, end_utm_y = add_node(bp_ende, *end_coord)
-
-            # Create a single edge with the entire LineString as its shape
-            edge_id = f"edge_{start_node_id}_{end_node_id}"
-            shape = " ".join(f"{x},{y}" for x, y in utm_geolist)
-            edges.append({
-                "id": edge_id,
-                "from": start_node_id,
-                "to": end_node_id,
-                "shape": shape,
-                "v_max": V_MAX_MS,
-                "type": "railway"
-            })
+        # Start and end nodes (first coordinates seen for an ID are kept)
+        nodes.setdefault(bp_anfang, tuple(utm_xy[offsets[k]].tolist()))
+        nodes.setdefault(bp_ende, tuple(utm_xy[offsets[k + 1] - 1].tolist()))
+
+        # Create a single edge with the entire LineString as its shape
+        edges.append({
+            "id": f"edge_{bp_anfang}_{bp_ende}",
+            "from": bp_anfang,
+            "to": bp_ende,
+            "shape": shapes[k],
+            "v_max": V_MAX_MS,
+            "type": "railway"
+        })
 
     # Write Node file
     with open(node_file, "w", encoding="utf-8") as nf:
@@ -139,8 +128,7 @@ def run_netconvert(node_file, edge_file, con_file, net_file):
 def main():
     """Main function to load GeoJSON, generate SUMO files, and run netconvert."""
     logger.info("Loading input GeoJSON file...")
-    data = load_geojson(GEOJSON_FILE)
-    features = data.get("features", [])
+    features = load_geojson(GEOJSON_FILE)
     logger.info("Input file loaded successfully.")
 
     logger.info("Generating SUMO files...")
@@ -1,10 +1,11 @@
 import geopandas as gpd
-import networkx as nx
 import os
+from rail_routing import build_rail_graph, shortest_path_tree, corridor
 
 # File paths
 input_file = "D:/PhD/codingPractices/progress-report-dec-2024/data/raw/swiss/linie_mit_polygon/linie_mit_polygon.geojson"
 output_file = "D:/PhD/codingPractices/progress-report-dec-2024/data/processed/swiss/zurich_basel_path.geojson"
+routing_cache_dir = input_file + ".cache/routing"  # Cached shortest-path trees (see rail_routing.py)
 
 # Define Zurich and Basel stations
 zurich_stations = [
@@ -30,21 +31,15 @@ gdf["bp_end_bez"] = gdf["bp_end_bez"].str.strip()
 
 # Create the graph
 print("Building the graph...")
-G = nx.DiGraph()  # Using a directed graph
+missing_geometry = gdf.geometry.isna()
+for start, end in gdf.loc[missing_geometry, ["bp_anf_bez", "bp_end_bez"]].itertuples(index=False):
+    print(f"Missing geometry information: {start} -> {end}")
+segments_gdf = gdf[~missing_geometry]
 
-# Add nodes and edges
-nodes_added = set()
-for _, row in gdf.iterrows():
-    start = row["bp_anf_bez"]
-    end = row["bp_end_bez"]
-    geometry = row["geometry"]  # Use the correct geometry column
-
-    if geometry is None:
-        print(f"Missing geometry information: {start} -> {end}")
-        continue
-
-    G.add_edge(start, end, geometry=geometry)
-    nodes_added.update([start, end])
+# Segment lengths in meters (edge weights)
+metric_gdf = segments_gdf.to_crs(epsg=2056) if segments_gdf.crs and segments_gdf.crs.is_geographic else segments_gdf
+graph = build_rail_graph(segments_gdf["bp_anf_bez"], segments_gdf["bp_end_bez"], metric_gdf.length)
+nodes_added = set(graph["nodes"])
 
 print(f"{len(nodes_added)} nodes added to the graph.")
 
@@ -57,24 +52,16 @@ if missing_zurich_stations:
 if missing_basel_stations:
     print("Missing Basel stations in the graph:", missing_basel_stations)
 
-# Find paths between Zurich and Basel
-print("Searching for paths between Zurich and Basel...")
-paths = []
-for zurich_station in zurich_stations:
-    for basel_station in basel_stations:
-        if nx.has_path(G, zurich_station, basel_station):
-            path = nx.shortest_path(G, source=zurich_station, target=basel_station)
-            paths.append(path)
+# One multi-source Dijkstra from all Zurich stations (cached), then a lookup for Basel
+print("Searching for the shortest path between Zurich and Basel...")
+tree = shortest_path_tree(graph, zurich_stations, cache_dir=routing_cache_dir)
+selected_path, segment_rows = corridor(graph, tree, basel_stations)
 
-if paths:
-    print(f"{len(paths)} paths found. Processing the first path...")
-    selected_path = paths[0]
-    segments = []
+if selected_path:
+    print(f"Path found: {selected_path[0]} -> {selected_path[-1]} ({len(selected_path)} stations)")
 
     # Retrieve geometry for each segment in the selected path
-    for i in range(len(selected_path) - 1):
-        edge_data = G.get_edge_data(selected_path[i], selected_path[i + 1])
-        segments.append(edge_data["geometry"])
+    segments = list(segments_gdf.geometry.iloc[segment_rows])
 
     # Create GeoDataFrame and save it
     path_gdf = gpd.GeoDataFrame({"geometry": segments})
@@ -0,0 +1,170 @@
+"""geojson_stream.py
+
+Streaming reader for large GeoJSON FeatureCollections (e.g. linie_mit_polygon.geojson).
+
+Features are decoded one at a time from the "features" array, so memory is
+bounded by the largest feature instead of the whole file. Property filters are
+pushed down into the reader:
+
+    segments = load_features(path, where={"linienr": 500})
+    lines = iter_features(path, where={"linienr": [500, 600]})
+    lines = iter_features(path, where=lambda props: props.get("km_anfang", 0) > 10)
+
+The first read of a file also writes a line-delimited copy next to it
+(<file>.cache/features.jsonl, one "<properties JSON>\t<rest of feature JSON>"
+line per feature). Later reads only decode the small properties part of each
+line and decode geometries for matching features only. The copy is rebuilt
+when the source file changes (size/mtime).
+"""
+
+import os
+import re
+import json
+import logging
+
+logger = logging.getLogger()
+
+READ_CHUNK_CHARS = 1 << 20
+_FEATURES_KEY = re.compile(r'"features"\s*:\s*\[')
+_SEPARATORS = re.compile(r"[\s,]*")
+
+
+def geojson_cache_dir(path):
+    return f"{path}.cache"
+
+
+def _matcher(where):
+    """Turns a where filter (None, callable or {property: value or list of values}) into a predicate."""
+    if where is None or callable(where):
+        return where
+    conditions = {
+        key: set(value) if isinstance(value, (list, tuple, set, frozenset)) else {value}
+        for key, value in where.items()
+    }
+    return lambda properties: all(properties.get(key) in values for key, values in conditions.items())
+
+
+def iter_raw_features(path):
+    """Yields the features of a GeoJSON FeatureCollection one by one, reading the file in chunks."""
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        # Skip everything up to the opening bracket of the "features" array
+        buffer = ""
+        while True:
+            chunk = f.read(READ_CHUNK_CHARS)
+            if not chunk:
+                raise ValueError(f"No 'features' array found in {path}")
+            buffer += chunk
+            match = _FEATURES_KEY.search(buffer)
+            if match:
+                buffer = buffer[match.end():]
+                break
+            buffer = buffer[-64:]  # The key may be split across chunks
+
+        pos = 0
+        read_size = READ_CHUNK_CHARS
+        while True:
+            pos = _SEPARATORS.match(buffer, pos).end()
+            if pos < len(buffer) and buffer[pos] == "]":
+                return
+            try:
+                if pos >= len(buffer):
+                    raise json.JSONDecodeError("Incomplete feature", buffer, pos)
+                feature, pos = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                # Feature continues in the next chunk; grow reads for very large features
+                chunk = f.read(read_size)
+                if not chunk:
+                    raise ValueError(f"Truncated GeoJSON features array in {path}")
+                buffer = buffer[pos:] + chunk
+                pos = 0
+                read_size *= 2
+                continue
+            read_size = READ_CHUNK_CHARS
+            yield feature
+
+            if pos > READ_CHUNK_CHARS:
+                buffer = buffer[pos:]
+                pos = 0
+
+
+def _source_manifest(path):
+    stat = os.stat(path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def _cache_paths(path):
+    cache_dir = geojson_cache_dir(path)
+    return os.path.join(cache_dir, "features.jsonl"), os.path.join(cache_dir, "manifest.json")
+
+
+def _cache_is_current(path):
+    lines_path, manifest_path = _cache_paths(path)
+    if not (os.path.exists(lines_path) and os.path.exists(manifest_path)):
+        return False
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        return json.load(f) == _source_manifest(path)
+
+
+def _iter_converting(path, match):
+    """Streams the GeoJSON file once, writing the line-delimited copy while yielding matches."""
+    lines_path, manifest_path = _cache_paths(path)
+    os.makedirs(os.path.dirname(lines_path), exist_ok=True)
+    tmp_path = f"{lines_path}.tmp"
+    logger.info(f"Converting {path} to line-delimited features: {lines_path}")
+
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as out:
+            for feature in iter_raw_features(path):
+                properties = feature.pop("properties", None) or {}
+                # json.dumps escapes control characters, so the tab is an unambiguous separator
+                out.write(f"{json.dumps(properties)}\t{json.dumps(feature)}\n")
+                if match is None or match(properties):
+                    feature["properties"] = properties
+                    yield feature
+        os.replace(tmp_path, lines_path)
+        with open(manifest_path, "w", encoding="utf-8") as f:
+            json.dump(_source_manifest(path), f)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _iter_cached(path, match):
+    lines_path, _ = _cache_paths(path)
+    with open(lines_path, "r", encoding="utf-8") as f:
+        for line in f:
+            properties_json, rest_json = line.split("\t", 1)
+            properties = json.loads(properties_json)
+            if match is None or match(properties):
+                feature = json.loads(rest_json)
+                feature["properties"] = properties
+                yield feature
+
+
+def iter_features(path, where=None, use_cache=True):
+    """
+    Yields the features of a GeoJSON file, optionally filtered by their properties.
+
+    Args:
+        path (str): GeoJSON FeatureCollection file.
+        where (dict or callable, optional): {property: value} (a list/set value means "any of"),
+            or a function properties -> bool.
+        use_cache (bool): Read/write the line-delimited copy in <path>.cache/.
+    """
+    match = _matcher(where)
+    if not use_cache:
+        for feature in iter_raw_features(path):
+            if match is None or match(feature.get("properties") or {}):
+                yield feature
+    elif _cache_is_current(path):
+        yield from _iter_cached(path, match)
+    else:
+        yield from _iter_converting(path, match)
+
+
+def load_features(path, where=None, use_cache=True):
+    """Returns the (filtered) features of a GeoJSON file as a list."""
+    features = list(iter_features(path, where=where, use_cache=use_cache))
+    logger.info(f"Loaded {len(features):,} features from {path}")
+    return features
@@ -1,4 +1,8 @@
-import xml.etree.ElementTree as ET
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "april_2025"))
+from net_reader import load_junction_ids
 
 # Network file path
 NETWORK_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\sw_real_comp\sw_real_compV2.net.xml"
@@ -18,12 +22,8 @@ def check_junctions_in_net(network_file, stations):
         tuple: Two lists - (found_junctions, missing_junctions)
     """
     try:
-        # Parse the network file
-        tree = ET.parse(network_file)
-        root = tree.getroot()
-
-        # Extract all junction IDs from the net file
-        junction_ids = {junction.get("id") for junction in root.findall("junction")}
+        # Extract all junction IDs from the net file (streamed + cached)
+        junction_ids = load_junction_ids(network_file)
 
         # Check which stations are found or missing
         found_junctions = [station for station in stations if station in junction_ids]
@@ -0,0 +1,102 @@
+"""projection.py
+
+Batched coordinate projection for the GeoJSON -> SUMO network scripts.
+
+Instead of projecting one vertex at a time, all LineString vertices of a
+GeoJSON feature collection are flattened into one NumPy array (with per-line
+offsets), de-duplicated (vertices shared by adjoining lines, e.g. stations, are
+projected only once) and projected in a single vectorized call.
+
+Typical use:
+    line_idx, offsets, lonlat = flatten_linestrings(features)
+    xy = project_vertices(lonlat, pyproj_projector("epsg:4326", "epsg:32632"))
+    # line k (features[line_idx[k]]) owns xy[offsets[k]:offsets[k + 1]]
+"""
+
+import numpy as np
+import utm
+from pyproj import Transformer
+
+
+def flatten_linestrings(features, min_points=2):
+    """
+    Flattens the coordinates of all LineString features into one array.
+
+    Args:
+        features (list): GeoJSON features.
+        min_points (int): LineStrings with fewer coordinates are skipped.
+
+    Returns:
+        tuple: (line_idx, offsets, lonlat)
+            line_idx: index into features of every kept LineString
+            offsets:  int64, line k owns lonlat[offsets[k]:offsets[k + 1]]
+            lonlat:   float64 (n_points, 2) array of lon/lat
+    """
+    line_idx, lengths, coords = [], [], []
+    for i, feature in enumerate(features):
+        geometry = feature.get("geometry") or {}
+        points = geometry.get("coordinates") or []
+        if geometry.get("type") == "LineString" and len(points) >= min_points:
+            line_idx.append(i)
+            lengths.append(len(points))
+            coords.extend(point[:2] for point in points)
+
+    offsets = np.r_[0, np.cumsum(lengths, dtype=np.int64)].astype(np.int64)
+    lonlat = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    return np.asarray(line_idx, dtype=np.int64), offsets, lonlat
+
+
+def project_vertices(lonlat, project):
+    """
+    Projects an (n, 2) lon/lat array, projecting every distinct vertex only once.
+
+    Args:
+        lonlat (np.ndarray): (n, 2) lon/lat coordinates.
+        project (callable): Maps a (m, 2) lon/lat array to a (m, 2) x/y array.
+
+    Returns:
+        np.ndarray: (n, 2) projected coordinates, aligned with lonlat.
+    """
+    if len(lonlat) == 0:
+        return np.empty((0, 2), dtype=np.float64)
+    unique_lonlat, inverse = np.unique(lonlat, axis=0, return_inverse=True)
+    return project(unique_lonlat)[inverse.ravel()]
+
+
+def pyproj_projector(src_crs, dst_crs):
+    """Returns a project() function for project_vertices backed by one pyproj Transformer."""
+    transformer = Transformer.from_crs(src_crs, dst_crs, always_xy=True)
+
+    def project(lonlat):
+        x, y = transformer.transform(lonlat[:, 0], lonlat[:, 1])
+        return np.column_stack([x, y])
+
+    return project
+
+
+def utm_zone_numbers(lon, lat):
+    """Vectorized utm.latlon_to_zone_number (including the Norway/Svalbard exceptions)."""
+    lon = (lon % 360 + 540) % 360 - 180
+    zones = ((lon + 180) / 6).astype(np.int64) + 1
+    zones = np.where((lat >= 56) & (lat < 64) & (lon >= 3) & (lon < 12), 32, zones)
+    svalbard = (lat >= 72) & (lat <= 84) & (lon >= 0) & (lon < 42)
+    svalbard_zones = np.select([lon < 9, lon < 21, lon < 33], [31, 33, 35], 37)
+    return np.where(svalbard, svalbard_zones, zones)
+
+
+def utm_project(lonlat):
+    """
+    Projects lon/lat to UTM like utm.from_latlon called per point: every point
+    uses its own zone. Points are converted with one array call per zone/hemisphere.
+    """
+    lon, lat = lonlat[:, 0], lonlat[:, 1]
+    xy = np.empty_like(lonlat, dtype=np.float64)
+    zones = utm_zone_numbers(lon, lat)
+    northern = lat >= 0
+    for zone in np.unique(zones):
+        for is_northern in (True, False):
+            mask = (zones == zone) & (northern == is_northern)
+            if mask.any():
+                x, y, _, _ = utm.from_latlon(lat[mask], lon[mask], force_zone_number=int(zone), force_northern=is_northern)
+                xy[mask, 0], xy[mask, 1] = x, y
+    return xy
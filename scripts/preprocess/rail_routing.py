@@ -0,0 +1,179 @@
+"""rail_routing.py
+
+Reusable shortest-path routing over a rail segment graph.
+
+The graph is held in compact CSR form (like utils.py in route_extraction):
+- nodes:    pd.Index of station names; node i is nodes[i]
+- indptr:   int64, length n_nodes + 1; edges of node i are indices[indptr[i]:indptr[i + 1]]
+- indices:  int32 target node of every edge
+- weights:  float64 length of every edge (meters)
+- segments: int64 row of the source segment table for every edge
+
+Shortest paths are computed with one multi-source Dijkstra run per origin set
+(scipy.sparse.csgraph), and the resulting shortest-path tree (distance,
+predecessor and nearest origin of every node) is cached on disk, keyed by the
+graph content and the origin set. Corridor extraction between station groups
+then only walks predecessor arrays.
+
+Typical use:
+    graph = build_rail_graph(starts, ends, lengths)
+    tree = shortest_path_tree(graph, zurich_stations, cache_dir=CACHE_DIR)
+    path, segment_rows = corridor(graph, tree, basel_stations)
+"""
+
+import os
+import hashlib
+import logging
+import numpy as np
+import pandas as pd
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+logger = logging.getLogger()
+
+# Explicit zero-length edges would be indistinguishable from "no edge" in some
+# scipy versions, so lengths are clamped to this minimum
+MIN_EDGE_WEIGHT = 1e-6
+NO_PREDECESSOR = -9999  # scipy.sparse.csgraph marker
+
+
+def build_rail_graph(starts, ends, lengths) -> dict:
+    """
+    Builds a directed CSR graph from segment endpoints.
+
+    Args:
+        starts, ends (array-like): Start/end station of every segment.
+        lengths (array-like): Segment lengths (meters).
+
+    Returns:
+        dict: CSR graph (see module docstring). Of parallel segments between the
+              same two stations, the shortest is kept.
+    """
+    starts = np.asarray(starts, dtype=object)
+    ends = np.asarray(ends, dtype=object)
+    lengths = np.maximum(np.asarray(lengths, dtype=np.float64), MIN_EDGE_WEIGHT)
+
+    nodes = pd.Index(pd.unique(np.concatenate([starts, ends])))
+    src = nodes.get_indexer(starts)
+    dst = nodes.get_indexer(ends)
+    rows = np.arange(len(starts), dtype=np.int64)
+
+    # Sort by (src, dst, length) and keep the first (shortest) edge of every pair
+    order = np.lexsort((lengths, dst, src))
+    src, dst, lengths, rows = src[order], dst[order], lengths[order], rows[order]
+    keep = np.r_[True, (src[1:] != src[:-1]) | (dst[1:] != dst[:-1])]
+    src, dst, lengths, rows = src[keep], dst[keep], lengths[keep], rows[keep]
+
+    indptr = np.zeros(len(nodes) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(src, minlength=len(nodes)), out=indptr[1:])
+    return {
+        "nodes": nodes,
+        "indptr": indptr,
+        "indices": dst.astype(np.int32),
+        "weights": lengths,
+        "segments": rows,
+    }
+
+
+def _graph_matrix(graph):
+    n = len(graph["nodes"])
+    return csr_matrix((graph["weights"], graph["indices"], graph["indptr"]), shape=(n, n))
+
+
+def graph_digest(graph) -> str:
+    """Content hash of a graph (node names and CSR arrays)."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update("\n".join(map(str, graph["nodes"])).encode("utf-8"))
+    for key in ("indptr", "indices", "weights"):
+        digest.update(np.ascontiguousarray(graph[key]).tobytes())
+    return digest.hexdigest()
+
+
+def node_indices(graph, stations):
+    """Maps station names to node indices, dropping stations that are not in the graph."""
+    idx = graph["nodes"].get_indexer(list(stations))
+    return idx[idx >= 0]
+
+
+def shortest_path_tree(graph, origins, cache_dir=None) -> dict:
+    """
+    Runs one multi-source Dijkstra from all origin stations.
+
+    Args:
+        graph (dict): CSR graph from build_rail_graph.
+        origins (list): Origin station names (unknown names are ignored).
+        cache_dir (str, optional): Directory of the on-disk tree cache.
+
+    Returns:
+        dict:
+            origins:  node indices of the origins
+            dist:     float64 distance from the nearest origin (inf if unreachable)
+            pred:     int32 predecessor on the shortest path (-9999 for origins/unreachable)
+            source:   int32 origin each node is reached from (-9999 if unreachable)
+    """
+    origin_idx = np.unique(node_indices(graph, origins))
+    if len(origin_idx) == 0:
+        raise ValueError("None of the origin stations is in the rail graph.")
+
+    cache_path = None
+    if cache_dir is not None:
+        key = hashlib.blake2b(origin_idx.tobytes(), digest_size=8).hexdigest()
+        cache_path = os.path.join(cache_dir, graph_digest(graph), f"tree_{key}.npz")
+        if os.path.exists(cache_path):
+            logger.info(f"Loading cached shortest-path tree: {cache_path}")
+            with np.load(cache_path) as cached:
+                return {name: cached[name] for name in ("origins", "dist", "pred", "source")}
+
+    dist, pred, source = dijkstra(
+        _graph_matrix(graph), directed=True, indices=origin_idx,
+        return_predecessors=True, min_only=True,
+    )
+    tree = {
+        "origins": origin_idx,
+        "dist": dist,
+        "pred": pred.astype(np.int32),
+        "source": source.astype(np.int32),
+    }
+
+    if cache_path is not None:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        np.savez(cache_path, **tree)
+        logger.info(f"Cached shortest-path tree: {cache_path}")
+    return tree
+
+
+def tree_path(tree, target) -> list:
+    """Node indices of the shortest path from the nearest origin to target ([] if unreachable)."""
+    if not np.isfinite(tree["dist"][target]):
+        return []
+    path = [int(target)]
+    while tree["pred"][path[-1]] != NO_PREDECESSOR:
+        path.append(int(tree["pred"][path[-1]]))
+    return path[::-1]
+
+
+def edge_segments(graph, path) -> list:
+    """Segment rows of the consecutive edges of a node path."""
+    indptr, indices = graph["indptr"], graph["indices"]
+    rows = []
+    for u, v in zip(path, path[1:]):
+        start, end = indptr[u], indptr[u + 1]
+        rows.append(int(graph["segments"][start + np.flatnonzero(indices[start:end] == v)[0]]))
+    return rows
+
+
+def corridor(graph, tree, targets):
+    """
+    Shortest corridor from the tree's origin set to the nearest of the target stations.
+
+    Returns:
+        tuple: (station names of the path, segment rows of its edges); ([], []) if no target is reachable.
+    """
+    target_idx = node_indices(graph, targets)
+    if len(target_idx) == 0:
+        return [], []
+    best = target_idx[np.argmin(tree["dist"][target_idx])]
+    path = tree_path(tree, best)
+    if not path:
+        return [], []
+    return list(graph["nodes"][path]), edge_segments(graph, path)
@@ -1,7 +1,7 @@
 import os
-import json
 import logging
-import utm
+from geojson_stream import load_features
+from projection import flatten_linestrings, project_vertices, utm_project
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -18,29 +18,29 @@ output_net_file = "D:/PhD/codingPractices/progress-report-dec-2024/sumo/inputs/s
 def parse_geojson(geojson_path):
     """Parse a GeoJSON file and extract its features.
 
+    Features are streamed one at a time instead of loading the whole document.
+
     Args:
         geojson_path (str): Path to the GeoJSON file.
 
     Returns:
         list: A list of features extracted from the GeoJSON file.
     """
-    with open(geojson_path, "r", encoding="utf-8") as file:
-        data = json.load(file)
-    return data["features"]
+    return load_features(geojson_path)
 
 
-def wgs84_to_utm(lon, lat):
+def wgs84_to_utm(lonlat):
     """Convert WGS84 coordinates to UTM coordinates.
 
+    Every distinct vertex is projected once, in one vectorized call per UTM zone.
+
     Args:
-        lon (float): Longitude in WGS84.
-        lat (float): Latitude in WGS84.
+        lonlat (np.ndarray): (n, 2) array of longitude/latitude in WGS84.
 
     Returns:
-        tuple: UTM x and y coordinates.
+        np.ndarray: (n, 2) array of UTM x and y coordinates.
     """
-    utm_coords = utm.from_latlon(lat, lon)
-    return utm_coords[0], utm_coords[1]
+    return project_vertices(lonlat, utm_project)
 
 
 def generate_node_id(properties, index):
@@ -70,35 +70,30 @@ def create_sumo_files(features, node_file, edge_file, con_file):
     nodes = {}
     edges = {}
 
-    for feature in features:
-        geometry = feature["geometry"]
-        properties = feature["properties"]
-        lininr = properties.get("lininr", "unknown")
-
-        if geometry["type"] == "LineString" and len(geometry["coordinates"]) > 1:
-            coordinates = geometry["coordinates"]
-            for i, coord in enumerate(coordinates):
-                lon, lat = coord
-                x, y = wgs84_to_utm(lon, lat)
-                node_id = generate_node_id(properties, i)
-                if node_id not in nodes:
-                    nodes[node_id] = (x, y)
-
-                if i > 0:
-                    # Create edge between consecutive nodes
-                    prev_node_id = generate_node_id(properties, i - 1)
-                    edge_id = f"edge_{prev_node_id}_{node_id}"
-                    
-                    # Calculate shape for the edge
-                    shape_coords = coordinates[i - 1:i + 1]
-                    shape = " ".join(
-                        f"{wgs84_to_utm(coord[0], coord[1])[0]},{wgs84_to_utm(coord[0], coord[1])[1]}"
-                        for coord in shape_coords
-                    )
-                    
-                    # Add edge if not already added
-                    if edge_id not in edges:
-                        edges[edge_id] = {"from": prev_node_id, "to": node_id, "shape": shape}
+    line_idx, offsets, lonlat = flatten_linestrings(features)
+    utm_xy = wgs84_to_utm(lonlat)
+    # "x,y" text of every vertex, formatted once and shared by nodes and edge shapes
+    vertex_text = ("%r,%r\n" * len(utm_xy) % tuple(utm_xy.ravel().tolist())).split("\n")
+    utm_xy = utm_xy.tolist()
+
+    for k, feature_idx in enumerate(line_idx):
+        properties = features[feature_idx]["properties"]
+        start, end = offsets[k], offsets[k + 1]
+
+        for i in range(end - start):
+            node_id = generate_node_id(properties, i)
+            if node_id not in nodes:
+                nodes[node_id] = tuple(utm_xy[start + i])
+
+            if i > 0:
+                # Create edge between consecutive nodes
+                prev_node_id = generate_node_id(properties, i - 1)
+                edge_id = f"edge_{prev_node_id}_{node_id}"
+
+                # Add edge if not already added
+                if edge_id not in edges:
+                    shape = f"{vertex_text[start + i - 1]} {vertex_text[start + i]}"
+                    edges[edge_id] = {"from": prev_node_id, "to": node_id, "shape": shape}
 
     # Write nodes to file
     with open(node_file, "w", encoding="utf-8") as nf:
@@ -1,7 +1,8 @@
 import os
 import csv
-import json
 import logging
+from collections import defaultdict, deque
+from geojson_stream import load_features
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -11,22 +12,67 @@ logger = logging.getLogger()
 INPUT_GEOJSON_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\raw\swiss\linie_mit_polygon\linie_mit_polygon.geojson"
 OUTPUT_CSV_FILE = r"D:\PhD\codingPractices\progress-report-dec-2024\data\processed\swiss\swiss_linienr_stations.csv"
 
-# Example input parameters
-LINIENR = 500
-KNOWN_STATIONS = ["BS", "LZ"]  # Provide only the first and last station
+# Lines to extract (None -> every linienr in the file)
+LINIENRS = None
+# Optional fixed origin/destination of the main chain per linienr
+KNOWN_STATIONS = {500: ["BS", "LZ"]}
 
-def load_geojson(file_path):
-    """Load GeoJSON data from a file."""
+def load_segments_by_linenr(file_path, linienrs=None):
+    """Stream the GeoJSON file once and group its segments by linienr."""
+    where = None if linienrs is None else {"linienr": list(linienrs)}
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        features = load_features(file_path, where=where)
     except Exception as e:
         logger.error(f"Failed to load GeoJSON file: {e}")
         raise
 
-def filter_segments_by_linenr(features, linienr):
-    """Filter segments by linienr."""
-    return [feature for feature in features if feature["properties"]["linienr"] == linienr]
+    segments_by_line = defaultdict(list)
+    for feature in features:
+        segments_by_line[feature["properties"].get("linienr")].append(feature)
+    segments_by_line.pop(None, None)
+    return segments_by_line
+
+def build_line_graph(segments):
+    """
+    Build the adjacency index of one line, once: station -> {neighbour: is_forward}.
+
+    Segments are undirected for traversal (reversed segments are followed too);
+    is_forward is True when a segment runs station -> neighbour (bp_anfang -> bp_ende).
+    """
+    adjacency = defaultdict(dict)
+    for segment in segments:
+        properties = segment["properties"]
+        start, end = properties.get("bp_anfang"), properties.get("bp_ende")
+        if start is None or end is None or start == end:
+            continue
+        adjacency[start].setdefault(end, True)
+        adjacency[end].setdefault(start, False)
+    return adjacency
+
+def _bfs(adjacency, sources):
+    """Breadth-first search from one or more stations. Returns (parents, last station reached)."""
+    parents = dict.fromkeys(sources)
+    queue = deque(sources)
+    last = sources[-1]
+    while queue:
+        last = queue.popleft()
+        for neighbour in adjacency[last]:
+            if neighbour not in parents:
+                parents[neighbour] = last
+                queue.append(neighbour)
+    return parents, last
+
+def _path_to(parents, station):
+    path = []
+    while station is not None:
+        path.append(station)
+        station = parents[station]
+    return path[::-1]
+
+def _orient(adjacency, chain):
+    """Reverse a chain when most of its segments run against it."""
+    forward = sum(adjacency[a][b] for a, b in zip(chain, chain[1:]))
+    return chain if 2 * forward >= len(chain) - 1 else chain[::-1]
 
 def extract_ordered_stations(segments, known_stations):
     """
@@ -39,80 +85,113 @@ def extract_ordered_stations(segments, known_stations):
     Returns:
         list: Ordered list of stations for the linienr, formatted for direct use in VEHICLE_ROUTES.
     """
-    origin = known_stations[0]
-    destination = known_stations[-1]
-
-    # Initialize traversal
-    current_station = origin
-    ordered_stations = [current_station]
-    remaining_segments = segments.copy()
-
-    while current_station != destination:
-        # Find the next segment starting from the current station
-        next_segment = next(
-            (seg for seg in remaining_segments if seg["properties"]["bp_anfang"] == current_station),
-            None
-        )
-
-        if not next_segment:
-            raise ValueError(f"No next segment found starting from {current_station}. Check data consistency.")
-
-        # Add the ending station of the found segment
-        next_station = next_segment["properties"]["bp_ende"]
-        ordered_stations.append(next_station)
-
-        # Update current station and remove the used segment
-        current_station = next_station
-        remaining_segments.remove(next_segment)
+    adjacency = build_line_graph(segments)
+    return format_stations(_station_path(adjacency, known_stations[0], known_stations[-1]))
+
+def _station_path(adjacency, origin, destination):
+    """Shortest station path origin -> destination in the line graph."""
+    if origin not in adjacency:
+        raise ValueError(f"No next segment found starting from {origin}. Check data consistency.")
+    parents, _ = _bfs(adjacency, [origin])
+    if destination not in parents:
+        raise ValueError(f"No path from {origin} to {destination}. Check data consistency.")
+    return _path_to(parents, destination)
+
+def extract_line_chains(adjacency, known_stations=None):
+    """
+    Decompose a line graph into ordered station chains.
 
-    # Format for direct use in VEHICLE_ROUTES
-    return [f'"{station}"' for station in ordered_stations]
+    The first chain of every connected part is its longest path (or the
+    known_stations origin -> destination path); every further chain is a branch
+    that starts at a station already on a chain and runs to the farthest
+    station not yet covered.
 
-def save_stations_to_csv(linienr, ordered_stations, output_file):
+    Returns:
+        list: Lists of station IDs, main chain first.
+    """
+    chains = []
+    covered = {}  # Ordered set of stations already on a chain
+
+    def add_branches():
+        while True:
+            parents, farthest = _bfs(adjacency, list(covered))
+            if farthest in covered:
+                return
+            branch = _path_to(parents, farthest)
+            chains.append(_orient(adjacency, branch))
+            covered.update(dict.fromkeys(branch))
+
+    if known_stations:
+        main_chain = _station_path(adjacency, known_stations[0], known_stations[-1])
+        chains.append(main_chain)
+        covered.update(dict.fromkeys(main_chain))
+        add_branches()
+
+    for station in adjacency:
+        if station in covered:
+            continue
+        # Longest path of this connected part: two breadth-first sweeps
+        _, far_end = _bfs(adjacency, [station])
+        parents, other_end = _bfs(adjacency, [far_end])
+        main_chain = _path_to(parents, other_end)
+        chains.append(_orient(adjacency, main_chain))
+        covered.update(dict.fromkeys(main_chain))
+        add_branches()
+
+    return chains
+
+def format_stations(stations):
+    """Format for direct use in VEHICLE_ROUTES."""
+    return [f'"{station}"' for station in stations]
+
+def save_stations_to_csv(line_chains, output_file):
     """
-    Save the ordered stations to a CSV file.
+    Save the ordered stations of every line to a CSV file.
 
     Args:
-        linienr (int): The linienr for which the stations are extracted.
-        ordered_stations (list): List of ordered stations.
+        line_chains (dict): linienr -> list of ordered station chains (main chain first).
         output_file (str): Path to the output CSV file.
     """
     try:
-        formatted_stations = ", ".join(ordered_stations)
+        os.makedirs(os.path.dirname(output_file), exist_ok=True)
         with open(output_file, "w", newline="", encoding="utf-8") as csvfile:
             writer = csv.writer(csvfile)
-            writer.writerow(["linienr", "stations"])
-            writer.writerow([linienr, formatted_stations])  # Write formatted string to CSV
+            writer.writerow(["linienr", "chain", "stations"])
+            for linienr, chains in line_chains.items():
+                for chain_idx, chain in enumerate(chains):
+                    writer.writerow([linienr, chain_idx, ", ".join(format_stations(chain))])
         logger.info(f"Ordered stations saved to {output_file}")
     except Exception as e:
         logger.error(f"Failed to save ordered stations to CSV: {e}")
         raise
 
-def main(linienr, known_stations):
+def main(linienrs=LINIENRS, known_stations=KNOWN_STATIONS):
     """
-    Main function to extract ordered stations for a given linienr and save to a CSV.
+    Main function to extract ordered station chains for every linienr and save them to a CSV.
 
     Args:
-        linienr (int): The linienr to process.
-        known_stations (list): List containing the origin and destination stations.
+        linienrs (list): The linienr values to process (None -> all).
+        known_stations (dict): linienr -> [origin, destination] of the main chain.
     """
-    logger.info("Loading input GeoJSON file...")
-    data = load_geojson(INPUT_GEOJSON_FILE)
-    features = data.get("features", [])
-    logger.info("Input file loaded successfully.")
-
-    logger.info(f"Filtering segments for linienr={linienr}...")
-    filtered_segments = filter_segments_by_linenr(features, linienr)
-    if not filtered_segments:
-        raise ValueError(f"No segments found for linienr={linienr}")
-
-    logger.info("Extracting ordered stations...")
-    ordered_stations = extract_ordered_stations(filtered_segments, known_stations)
-    ordered_stations_str = ", ".join(ordered_stations)
-    logger.info(f"Ordered stations: {ordered_stations_str}")
+    logger.info("Loading segments from input GeoJSON file...")
+    segments_by_line = load_segments_by_linenr(INPUT_GEOJSON_FILE, linienrs)
+    if not segments_by_line:
+        raise ValueError(f"No segments found for linienr={linienrs}")
+
+    logger.info(f"Extracting ordered stations for {len(segments_by_line)} lines...")
+    line_chains = {}
+    for linienr in sorted(segments_by_line, key=str):
+        adjacency = build_line_graph(segments_by_line[linienr])
+        try:
+            line_chains[linienr] = extract_line_chains(adjacency, known_stations.get(linienr))
+        except ValueError as e:
+            logger.warning(f"linienr {linienr}: {e} Falling back to the longest chain.")
+            line_chains[linienr] = extract_line_chains(adjacency)
+        if len(line_chains[linienr]) > 1:
+            logger.info(f"linienr {linienr}: {len(line_chains[linienr])} chains (branches or gaps)")
 
     logger.info("Saving ordered stations to CSV...")
-    save_stations_to_csv(linienr, ordered_stations, OUTPUT_CSV_FILE)
+    save_stations_to_csv(line_chains, OUTPUT_CSV_FILE)
 
 if __name__ == "__main__":
-    main(LINIENR, KNOWN_STATIONS)
+    main()
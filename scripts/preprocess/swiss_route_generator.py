@@ -1,8 +1,12 @@
+import os
+import sys
 import random
 import logging
 import csv
-import xml.etree.ElementTree as ET
-from xml.dom import minidom
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "april_2025"))
+from net_reader import load_net_tables
+from sumo_xml import open_sumo_xml, write_element, start_element, end_element
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -22,11 +26,7 @@ DEFAULT_DECEL_RANGE = (0.5, 2.5)     # in m/s²
 MIN_DEPART_TIME = 30
 MAX_DEPART_TIME = 1000
 MIN_DEPART_GAP = 60  # in seconds
-
-def prettify_xml(elem):
-    rough_string = ET.tostring(elem, "utf-8")
-    reparsed = minidom.parseString(rough_string)
-    return reparsed.toprettyxml(indent="  ")
+SEED = None  # Fixed seed -> reproducible vehicle types, departures and stop durations
 
 def load_linenr_stations(linenr_csv_file, linenr):
     try:
@@ -45,11 +45,8 @@ def load_linenr_stations(linenr_csv_file, linenr):
 def parse_network_file(network_file):
     edge_map = {}
     try:
-        tree = ET.parse(network_file)
-        root = tree.getroot()
-
-        for edge in root.findall("edge"):
-            edge_id = edge.get("id")
+        edges = load_net_tables(network_file, tables=("edges",))["edges"]
+        for edge_id in edges["id"]:
             if edge_id and edge_id.startswith("edge_"):
                 parts = edge_id.split("_")
                 if len(parts) == 3:
@@ -113,9 +110,9 @@ def generate_route_edges(stations, edge_map):
         raise ValueError("No valid route edges could be generated. Check station list and edge mappings.")
     return route_edges
 
-def generate_vehicle_type(root, train_num, accel_range, decel_range):
-    accel = round(random.uniform(*accel_range), 2)
-    decel = round(random.uniform(*decel_range), 2)
+def generate_vehicle_type(f, train_num, accel_range, decel_range, rng=random):
+    accel = round(rng.uniform(*accel_range), 2)
+    decel = round(rng.uniform(*decel_range), 2)
 
     vtype_id = f"trainType_{train_num}"
     vtype_attribs = {
@@ -126,70 +123,66 @@ def generate_vehicle_type(root, train_num, accel_range, decel_range):
         "maxSpeed": "70",
         "vClass": "rail"
     }
-    ET.SubElement(root, "vType", attrib=vtype_attribs)
+    write_element(f, "vType", vtype_attribs)
     return vtype_id
 
-def generate_routes_with_stops(linenr, stations, edge_map, waiting_stations, wait_time_range, speed_range, min_depart_time, max_depart_time, min_depart_gap, output_file):
-    root = ET.Element("routes")
-
+def generate_routes_with_stops(linenr, stations, edge_map, waiting_stations, wait_time_range, speed_range, min_depart_time, max_depart_time, min_depart_gap, output_file, rng=random):
     route_edges = generate_route_edges(stations, edge_map)
     route_id = f"route_linenr_{linenr}"
-    ET.SubElement(root, "route", id=route_id, edges=" ".join(route_edges))
 
     depart_times = []
 
-    for train_num in range(1, 6):
-        vtype_id = generate_vehicle_type(root, train_num, DEFAULT_ACCEL_RANGE, DEFAULT_DECEL_RANGE)
-
-        min_speed, max_speed = speed_range
-        speed = round(random.uniform(min_speed, max_speed) / 3.6, 2)
-
-        while True:
-            if not depart_times:
-                depart_time = random.randint(min_depart_time, max_depart_time)
-            else:
-                next_depart_start = depart_times[-1] + min_depart_gap
-                if next_depart_start > max_depart_time:
-                    logger.warning(f"Cannot add train {train_num} due to insufficient departure window.")
-                    break
-                depart_time = random.randint(next_depart_start, max_depart_time)
-
-            if not depart_times or (depart_time - depart_times[-1]) >= min_depart_gap:
-                depart_times.append(depart_time)
-                break
-
-        if len(depart_times) < train_num:
-            logger.warning(f"Skipping train {train_num} due to departure time constraints.")
-            continue
-
-        vehicle_elem = ET.SubElement(
-            root,
-            "vehicle",
-            id=f"train_{linenr}_{train_num}",
-            type=vtype_id,
-            route=route_id,
-            depart=str(depart_time),
-            maxSpeed=str(speed)
-        )
-
-        for stop_station in waiting_stations:
-            if stop_station in stations:
-                stop_idx = stations.index(stop_station)
-                if stop_idx > 0:
-                    station1 = stations[stop_idx - 1]
-                    station2 = stop_station
-                    pattern1 = f"{station1}_{station2}"
-                    pattern2 = f"{station2}_{station1}"
-                    edges = edge_map.get(pattern1) or edge_map.get(pattern2)
-                    if edges:
-                        stop_edge = edges[-1]
-                        duration = random.randint(*wait_time_range)
-                        ET.SubElement(vehicle_elem, "stop", edge=stop_edge, duration=str(duration))
-
     try:
-        prettified_xml = prettify_xml(root)
-        with open(output_file, "w", encoding="utf-8") as f:
-            f.write(prettified_xml)
+        with open_sumo_xml(output_file, "routes") as f:
+            write_element(f, "route", {"id": route_id, "edges": " ".join(route_edges)})
+
+            for train_num in range(1, 6):
+                vtype_id = generate_vehicle_type(f, train_num, DEFAULT_ACCEL_RANGE, DEFAULT_DECEL_RANGE, rng)
+
+                min_speed, max_speed = speed_range
+                speed = round(rng.uniform(min_speed, max_speed) / 3.6, 2)
+
+                while True:
+                    if not depart_times:
+                        depart_time = rng.randint(min_depart_time, max_depart_time)
+                    else:
+                        next_depart_start = depart_times[-1] + min_depart_gap
+                        if next_depart_start > max_depart_time:
+                            logger.warning(f"Cannot add train {train_num} due to insufficient departure window.")
+                            break
+                        depart_time = rng.randint(next_depart_start, max_depart_time)
+
+                    if not depart_times or (depart_time - depart_times[-1]) >= min_depart_gap:
+                        depart_times.append(depart_time)
+                        break
+
+                if len(depart_times) < train_num:
+                    logger.warning(f"Skipping train {train_num} due to departure time constraints.")
+                    continue
+
+                start_element(f, "vehicle", {
+                    "id": f"train_{linenr}_{train_num}",
+                    "type": vtype_id,
+                    "route": route_id,
+                    "depart": depart_time,
+                    "maxSpeed": speed,
+                })
+
+                for stop_station in waiting_stations:
+                    if stop_station in stations:
+                        stop_idx = stations.index(stop_station)
+                        if stop_idx > 0:
+                            station1 = stations[stop_idx - 1]
+                            station2 = stop_station
+                            pattern1 = f"{station1}_{station2}"
+                            pattern2 = f"{station2}_{station1}"
+                            edges = edge_map.get(pattern1) or edge_map.get(pattern2)
+                            if edges:
+                                stop_edge = edges[-1]
+                                duration = rng.randint(*wait_time_range)
+                                write_element(f, "stop", {"edge": stop_edge, "duration": duration}, depth=2)
+
+                end_element(f, "vehicle")
         logger.info(f"Route file created: {output_file}")
     except IOError as e:
         logger.error(f"Failed to write route file: {e}")
@@ -212,7 +205,8 @@ def main():
         MIN_DEPART_TIME,
         MAX_DEPART_TIME,
         MIN_DEPART_GAP,
-        OUTPUT_ROUTE_FILE
+        OUTPUT_ROUTE_FILE,
+        random.Random(SEED),
     )
 
     logger.info("Route generation and validation completed successfully.")
@@ -1,30 +1,31 @@
 # scripts/route_extraction/analyze_trips.py
 
-import pandas as pd
 import logging
 from pathlib import Path
+from gtfs_store import load_stop_times, load_gtfs_table
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)-8s %(message)s")
 
 # === File paths ===
-STOP_TIMES_FILE = Path("data/raw/swiss/gtfs_ftp_2025/stop_times.txt")
-TRIPS_FILE = Path("data/raw/swiss/gtfs_ftp_2025/trips.txt")
 OUTPUT_FILE = Path("data/processed/routes/cleaned_stop_times_enriched.csv")
 
 def main():
-    logging.info("🚀 Reading GTFS stop_times.txt...")
-    stop_times = pd.read_csv(STOP_TIMES_FILE)
+    logging.info("🚀 Reading stop_times from GTFS store...")
+    stop_times = load_stop_times(columns=[
+        "trip_id", "arrival_time", "departure_time", "stop_id",
+        "stop_sequence", "pickup_type", "drop_off_type", "route_id"
+    ])
     logging.info(f"✅ Loaded {len(stop_times):,} rows from stop_times")
 
-    logging.info("🚀 Reading GTFS trips.txt...")
-    trips = pd.read_csv(TRIPS_FILE, low_memory=False)
+    logging.info("🚀 Reading trips from GTFS store...")
+    trips = load_gtfs_table("trips", columns=["trip_id", "trip_headsign"])
     logging.info(f"✅ Loaded {len(trips):,} rows from trips")
 
-    # Join with trips to enrich with route_id and headsign
-    logging.info("🔗 Merging stop_times with trips on trip_id...")
+    # stop_times already carries route_id; join with trips only for the headsign
+    logging.info("🔗 Merging stop_times with trip headsigns on trip_id...")
     merged = stop_times.merge(
-        trips[["trip_id", "route_id", "trip_headsign"]],
+        trips.astype({"trip_id": "category"}),
         how="left",
         on="trip_id"
     )
@@ -0,0 +1,52 @@
+"""
+build_stop_pattern_index.py
+
+Builds the stop pattern index for all GTFS trips.
+
+Thousands of trips serve exactly the same ordered stop list. Each trip's stop
+list is hashed into a pattern ID (see utils.build_stop_patterns), so edge
+mapping, route XML generation and per-route exports can run once per pattern
+instead of once per trip.
+
+Output:
+- stop_patterns.parquet: pattern_id, stop_sequence, stop offsets, trip count
+- trip_patterns.parquet: trip_id, route_id, pattern_id, departure_sec
+
+Author: Onur Deniz
+"""
+
+import logging
+import pyarrow.parquet as pq
+from pathlib import Path
+from gtfs_store import load_stop_times
+from utils import build_trip_sequences, build_stop_patterns, pattern_tables
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# === File Paths ===
+PATTERNS_FILE = Path("data/processed/routes/stop_patterns.parquet")
+TRIP_PATTERNS_FILE = Path("data/processed/routes/trip_patterns.parquet")
+
+def main():
+    logging.info("🚀 Loading stop_times from GTFS store...")
+    df = load_stop_times(columns=["route_id", "trip_id", "stop_id", "stop_sequence", "departure_sec"])
+
+    logging.info("🔄 Building trip stop sequences...")
+    seqs = build_trip_sequences(df)
+
+    logging.info("🧬 Hashing stop sequences into patterns...")
+    patterns = build_stop_patterns(seqs)
+    logging.info(
+        f"✅ {len(seqs['trip_ids']):,} trips share {len(patterns['n_trips']):,} stop patterns"
+    )
+
+    patterns_table, trips_table = pattern_tables(seqs, patterns)
+    PATTERNS_FILE.parent.mkdir(parents=True, exist_ok=True)
+    pq.write_table(patterns_table, PATTERNS_FILE)
+    pq.write_table(trips_table, TRIP_PATTERNS_FILE)
+    logging.info(f"💾 Saved: {PATTERNS_FILE}")
+    logging.info(f"💾 Saved: {TRIP_PATTERNS_FILE}")
+
+if __name__ == "__main__":
+    main()
@@ -1,63 +1,72 @@
 """
 extract_routes_from_gtfs.py
 
-This script processes the enriched GTFS stop_times data to extract
+This script processes the GTFS stop_times data (read from the GTFS store) to extract
 origin-destination (OD) pairs along with full stop sequences for each trip.
-It outputs a structured CSV listing route_id, trip_id, origin_stop_id,
-destination_stop_id, and the ordered list of intermediate stops.
+It outputs a Parquet file listing route_id, trip_id, origin_stop_id,
+destination_stop_id, and the ordered list of stops as a native list column.
+
+Extraction is vectorized: stop_times is sorted once and split into per-trip
+slices with offsets (see utils.build_trip_sequences), so no Python object
+is created per trip.
 
 Author: Onur Deniz
 """
 
-import pandas as pd
+import numpy as np
+import pyarrow as pa
 import logging
 from pathlib import Path
-from ast import literal_eval
+from gtfs_store import load_stop_times
+from utils import build_trip_sequences, filter_trip_sequences, write_trip_sequences, trip_sequences_to_table
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
 
 # === File Paths ===
-INPUT_FILE = Path("data/processed/routes/cleaned_stop_times_enriched.csv")
-OUTPUT_FILE = Path("data/processed/routes/extracted_gtfs_routes.csv")
+OUTPUT_FILE = Path("data/processed/routes/extracted_gtfs_routes.parquet")
+
+MIN_STOPS_PER_TRIP = 2  # Ignore malformed/short trips
+
+def extract_trip_sequences(df) -> dict:
+    """
+    Builds CSR stop sequences for all trips, dropping trips with too few stops.
+
+    Args:
+        df (pd.DataFrame): GTFS stop_times with route_id, trip_id, stop_id, stop_sequence.
+
+    Returns:
+        dict: CSR trip sequences (trip_ids, route_ids, offsets, stop_index, stop_ids).
+    """
+    logging.info("🔄 Sorting by trip_id and stop_sequence...")
+    seqs = build_trip_sequences(df)
+    keep = np.diff(seqs["offsets"]) >= MIN_STOPS_PER_TRIP
+    return filter_trip_sequences(seqs, keep)
 
-def extract_routes(df: pd.DataFrame) -> pd.DataFrame:
+def extract_routes(df) -> pa.Table:
     """
     Extracts origin, destination, and ordered stops from the GTFS dataframe.
 
     Args:
-        df (pd.DataFrame): Merged GTFS stop_times + trips data.
+        df (pd.DataFrame): GTFS stop_times with route_id, trip_id, stop_id, stop_sequence.
 
     Returns:
-        pd.DataFrame: DataFrame with route_id, trip_id, origin_stop_id,
-                      destination_stop_id, and stop_sequence list.
+        pa.Table: route_id, trip_id, origin_stop_id, destination_stop_id,
+                  and stop_sequence as list<string>.
     """
-    logging.info("🔄 Grouping by route_id and trip_id...")
-    grouped = df.sort_values(["trip_id", "stop_sequence"]).groupby(["route_id", "trip_id"])
-
-    extracted = []
-    for (route_id, trip_id), group in grouped:
-        stop_ids = group["stop_id"].tolist()
-        if len(stop_ids) >= 2:  # Ignore malformed/short trips
-            extracted.append({
-                "route_id": route_id,
-                "trip_id": trip_id,
-                "origin_stop_id": stop_ids[0],
-                "destination_stop_id": stop_ids[-1],
-                "stop_sequence": stop_ids
-            })
-
-    return pd.DataFrame(extracted)
+    return trip_sequences_to_table(extract_trip_sequences(df))
 
 def main():
-    logging.info(f"🚀 Loading enriched stop_times from {INPUT_FILE}")
-    df = pd.read_csv(INPUT_FILE)
+    logging.info("🚀 Loading stop_times from GTFS store...")
+    df = load_stop_times(columns=["route_id", "trip_id", "stop_id", "stop_sequence"])
 
     logging.info("✅ Data loaded. Extracting routes...")
-    routes_df = extract_routes(df)
+    seqs = extract_trip_sequences(df)
+    logging.info(f"🧮 {len(seqs['trip_ids']):,} trips, {len(seqs['stop_index']):,} stop events")
 
     logging.info(f"💾 Saving extracted routes to {OUTPUT_FILE}")
-    routes_df.to_csv(OUTPUT_FILE, index=False)
+    OUTPUT_FILE.parent.mkdir(parents=True, exist_ok=True)
+    write_trip_sequences(seqs, OUTPUT_FILE)
     logging.info("✅ Route extraction complete.")
 
 if __name__ == "__main__":
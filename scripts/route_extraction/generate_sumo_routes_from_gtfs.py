@@ -1,7 +1,13 @@
+import os
+import sys
 import pandas as pd
-import xml.etree.ElementTree as ET
 from pathlib import Path
 import logging
+from gtfs_store import gtfs_to_seconds
+from utils import build_trip_sequences, build_stop_patterns, trip_departures
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "april_2025"))
+from sumo_xml import open_sumo_xml, write_elements
 
 # ─── Setup Logging ─────────────────────────────────────────────────────────────
 logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
@@ -15,41 +21,36 @@ def sanitize_stop_id(stop_id: str) -> str:
     """Convert stop_id to a format valid for SUMO edge IDs."""
     return stop_id.replace(":", "_").replace("/", "_")
 
-def generate_trip_elements(df: pd.DataFrame) -> list:
+def generate_trip_elements(df: pd.DataFrame):
     """
-    Generate SUMO <trip> XML elements from GTFS route data.
+    Generate SUMO <trip> attributes from GTFS route data.
+
+    Trips are grouped into stop patterns first, so the sanitized route edges and
+    from/to stops are built once per pattern and shared by all its trips.
 
     Args:
         df (pd.DataFrame): Filtered GTFS trip-stop data.
 
     Returns:
-        List of ElementTree <trip> elements.
+        Iterator of <trip> attribute dicts, consumed lazily by the XML writer.
     """
-    trips = []
-    grouped = df.groupby("trip_id")
-
-    for trip_id, group in grouped:
-        group_sorted = group.sort_values("stop_sequence")
-        route_id = group_sorted["route_id"].iloc[0]
-        departure_time = group_sorted["departure_time"].iloc[0]  # First departure time
-
-        # Convert HH:MM:SS to seconds since midnight
-        h, m, s = map(int, departure_time.split(":"))
-        depart_seconds = h * 3600 + m * 60 + s
-
-        # Generate route by concatenating sanitized stop_ids
-        route_edges = " ".join(sanitize_stop_id(sid) for sid in group_sorted["stop_id"])
-
-        trip_elem = ET.Element("trip", attrib={
-            "id": trip_id,
-            "depart": str(depart_seconds),
-            "from": sanitize_stop_id(group_sorted["stop_id"].iloc[0]),
-            "to": sanitize_stop_id(group_sorted["stop_id"].iloc[-1]),
-            "route": route_edges
-        })
-        trips.append(trip_elem)
-
-    return trips
+    df = df.assign(departure_sec=gtfs_to_seconds(df["departure_time"]))
+    seqs = build_trip_sequences(df)
+    patterns = build_stop_patterns(seqs)
+    logging.info(f"🧬 {len(seqs['trip_ids']):,} trips share {len(patterns['n_trips']):,} stop patterns")
+
+    # Per-pattern attributes, computed once
+    offsets = seqs["offsets"]
+    pattern_attrs = []
+    for rep in patterns["pattern_trip"]:
+        stop_ids = [sanitize_stop_id(seqs["stop_ids"][i]) for i in seqs["stop_index"][offsets[rep]:offsets[rep + 1]]]
+        pattern_attrs.append({"from": stop_ids[0], "to": stop_ids[-1], "route": " ".join(stop_ids)})
+
+    departures = trip_departures(seqs)
+    return (
+        {"id": trip_id, "depart": int(depart_seconds), **pattern_attrs[pattern_id]}
+        for trip_id, pattern_id, depart_seconds in zip(seqs["trip_ids"], patterns["pattern_ids"], departures)
+    )
 
 # ─── Main Logic ────────────────────────────────────────────────────────────────
 def main():
@@ -60,13 +61,8 @@ def main():
     trips = generate_trip_elements(df)
 
     logging.info(f"💾 Writing to {OUTPUT_XML}")
-    root = ET.Element("routes")
-    for trip_elem in trips:
-        root.append(trip_elem)
-
-    tree = ET.ElementTree(root)
-    OUTPUT_XML.parent.mkdir(parents=True, exist_ok=True)
-    tree.write(OUTPUT_XML, encoding="utf-8", xml_declaration=True)
+    with open_sumo_xml(OUTPUT_XML, "routes") as f:
+        write_elements(f, "trip", trips)
     logging.info("✅ .rou.xml file written successfully.")
 
 if __name__ == "__main__":
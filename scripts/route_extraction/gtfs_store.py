@@ -0,0 +1,185 @@
+"""
+gtfs_store.py
+
+GTFS ingestion stage: converts the raw Swiss GTFS feed once into typed,
+dictionary-encoded Parquet tables, and provides the single loader that all
+downstream route extraction scripts read through.
+
+Layout of the store (data/processed/gtfs_store/):
+- routes.parquet, trips.parquet, stops.parquet
+- stop_times/route_type=<type>/agency_id=<agency>/part-*.parquet
+  (stop_times carries route_id and seconds-since-midnight columns, so most
+  steps no longer need to merge trips.txt)
+
+The store is rebuilt automatically when any source file changes (size/mtime).
+
+Usage:
+    python scripts/route_extraction/gtfs_store.py
+
+Author: Onur Deniz
+"""
+
+import json
+import shutil
+import logging
+import pandas as pd
+from pathlib import Path
+
+# Setup logging
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+# === File paths ===
+GTFS_DIR = Path("data/raw/swiss/gtfs_ftp_2025")
+STORE_DIR = Path("data/processed/gtfs_store")
+
+STOP_TIMES_CHUNK_ROWS = 2_000_000
+PARTITION_COLUMNS = ["route_type", "agency_id"]
+
+# Typed schemas of the converted tables ("category" = dictionary-encoded)
+SCHEMAS = {
+    "routes": {
+        "route_id": "string", "agency_id": "category", "route_short_name": "category",
+        "route_long_name": "category", "route_desc": "category", "route_type": "int16",
+    },
+    "trips": {
+        "route_id": "category", "service_id": "category", "trip_id": "string",
+        "trip_headsign": "category", "trip_short_name": "category", "direction_id": "Int8",
+    },
+    "stops": {
+        "stop_id": "string", "stop_name": "string", "stop_lat": "float64", "stop_lon": "float64",
+        "location_type": "Int8", "parent_station": "string", "platform_code": "category",
+    },
+    "stop_times": {
+        "trip_id": "category", "arrival_time": "category", "departure_time": "category",
+        "stop_id": "category", "stop_sequence": "int32", "pickup_type": "Int8", "drop_off_type": "Int8",
+    },
+}
+
+SOURCE_FILES = ["routes.txt", "trips.txt", "stops.txt", "stop_times.txt"]
+
+
+def _read_gtfs_csv(gtfs_dir, name, **kwargs):
+    """Reads a GTFS text file with its typed schema, keeping only known columns."""
+    schema = SCHEMAS[name]
+    path = Path(gtfs_dir) / f"{name}.txt"
+    header = pd.read_csv(path, nrows=0).columns
+    usecols = [col for col in schema if col in header]
+    dtypes = {col: ("string" if dtype == "category" else dtype) for col, dtype in schema.items() if col in usecols}
+    return pd.read_csv(path, usecols=usecols, dtype=dtypes, **kwargs)
+
+
+def _categorize(df, name):
+    for col, dtype in SCHEMAS[name].items():
+        if dtype == "category" and col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def _source_manifest(gtfs_dir):
+    manifest = {}
+    for file_name in SOURCE_FILES:
+        stat = (Path(gtfs_dir) / file_name).stat()
+        manifest[file_name] = [stat.st_size, stat.st_mtime_ns]
+    return manifest
+
+
+def gtfs_to_seconds(times):
+    """Vectorized HH:MM:SS -> seconds since service-day midnight (handles hours >= 24)."""
+    return pd.to_timedelta(times.astype("string")).dt.total_seconds().astype("Int32")
+
+
+def build_gtfs_store(gtfs_dir=GTFS_DIR, store_dir=STORE_DIR):
+    """
+    Converts the GTFS feed into the Parquet store. stop_times.txt is streamed
+    in chunks, enriched with route_id/route_type/agency_id and partitioned.
+    """
+    gtfs_dir, store_dir = Path(gtfs_dir), Path(store_dir)
+    logging.info(f"🚀 Building GTFS store from {gtfs_dir} -> {store_dir}")
+    if store_dir.exists():
+        shutil.rmtree(store_dir)
+    store_dir.mkdir(parents=True)
+
+    routes = _categorize(_read_gtfs_csv(gtfs_dir, "routes"), "routes")
+    trips = _categorize(_read_gtfs_csv(gtfs_dir, "trips"), "trips")
+    stops = _read_gtfs_csv(gtfs_dir, "stops")
+    stops = _categorize(stops, "stops")
+
+    for name, df in [("routes", routes), ("trips", trips), ("stops", stops)]:
+        df.to_parquet(store_dir / f"{name}.parquet", index=False)
+        logging.info(f"💾 {name}: {len(df):,} rows")
+
+    # trip_id -> route_id / route_type / agency_id lookup for the stop_times partitions
+    trip_lookup = trips[["trip_id", "route_id"]].astype({"route_id": "string"}).merge(
+        routes[["route_id", "route_type", "agency_id"]],
+        on="route_id", how="left"
+    )
+    trip_lookup["route_type"] = trip_lookup["route_type"].fillna(-1).astype("int16")
+    trip_lookup["agency_id"] = trip_lookup["agency_id"].astype("string").fillna("unknown")
+    trip_lookup = trip_lookup.set_index("trip_id")
+
+    total_rows = 0
+    reader = _read_gtfs_csv(gtfs_dir, "stop_times", chunksize=STOP_TIMES_CHUNK_ROWS)
+    for chunk_no, chunk in enumerate(reader):
+        chunk = chunk.join(trip_lookup, on="trip_id")
+        chunk["arrival_sec"] = gtfs_to_seconds(chunk["arrival_time"])
+        chunk["departure_sec"] = gtfs_to_seconds(chunk["departure_time"])
+        chunk["route_id"] = chunk["route_id"].astype("category")
+        chunk = _categorize(chunk, "stop_times")
+
+        chunk.to_parquet(
+            store_dir / "stop_times",
+            index=False,
+            partition_cols=PARTITION_COLUMNS,
+            basename_template=f"part-{chunk_no:04d}-{{i}}.parquet",
+        )
+        total_rows += len(chunk)
+        logging.info(f"📦 stop_times chunk {chunk_no}: {total_rows:,} rows written")
+
+    with open(store_dir / "manifest.json", "w", encoding="utf-8") as f:
+        json.dump(_source_manifest(gtfs_dir), f)
+    logging.info("✅ GTFS store complete.")
+
+
+def ensure_gtfs_store(gtfs_dir=GTFS_DIR, store_dir=STORE_DIR):
+    """Builds the store if it is missing or older than the GTFS source files."""
+    manifest_path = Path(store_dir) / "manifest.json"
+    if manifest_path.exists():
+        with open(manifest_path, "r", encoding="utf-8") as f:
+            if json.load(f) == _source_manifest(gtfs_dir):
+                return
+        logging.info("♻️ GTFS source changed. Rebuilding store...")
+    build_gtfs_store(gtfs_dir, store_dir)
+
+
+def load_gtfs_table(name, columns=None, filters=None, gtfs_dir=GTFS_DIR, store_dir=STORE_DIR):
+    """
+    Loads one table from the GTFS store, reading only the requested columns.
+
+    Args:
+        name (str): "routes", "trips", "stops" or "stop_times".
+        columns (list, optional): Columns to project. None reads all columns.
+        filters (list, optional): pyarrow filters, e.g. [("route_type", "in", [102, 103])].
+            On stop_times, filters on route_type/agency_id only touch matching partitions.
+
+    Returns:
+        pd.DataFrame
+    """
+    ensure_gtfs_store(gtfs_dir, store_dir)
+    path = Path(store_dir) / ("stop_times" if name == "stop_times" else f"{name}.parquet")
+    df = pd.read_parquet(path, columns=columns, filters=filters)
+    logging.info(f"📂 Loaded {name} from GTFS store: {len(df):,} rows, {len(df.columns)} columns")
+    return df
+
+
+def load_stop_times(columns=None, route_types=None, agency_ids=None, **kwargs):
+    """Loads stop_times, optionally restricted to some route types and/or agencies."""
+    filters = []
+    if route_types is not None:
+        filters.append(("route_type", "in", list(route_types)))
+    if agency_ids is not None:
+        filters.append(("agency_id", "in", list(agency_ids)))
+    return load_gtfs_table("stop_times", columns=columns, filters=filters or None, **kwargs)
+
+
+if __name__ == "__main__":
+    build_gtfs_store()
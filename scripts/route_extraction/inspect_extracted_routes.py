@@ -24,17 +24,17 @@ logging.basicConfig(
 )
 
 # === File paths ===
-EXTRACTED_ROUTES_FILE = Path("data/processed/routes/extracted_gtfs_routes.csv")
+EXTRACTED_ROUTES_FILE = Path("data/processed/routes/extracted_gtfs_routes.parquet")
 STOPS_FILE = Path("data/raw/swiss/gtfs_ftp_2025/stops.txt")
 OUTPUT_FILE = Path("data/processed/routes/enriched_gtfs_routes_with_names.csv")
 
 def load_extracted_routes() -> pd.DataFrame:
     """
     Load extracted route-stop sequences.
-    The stop_sequence column contains a list of stop_ids (as a string).
+    The stop_sequence column is stored natively as a list of stop_ids.
     """
     logging.info(f"📂 Loading extracted routes from {EXTRACTED_ROUTES_FILE}")
-    return pd.read_csv(EXTRACTED_ROUTES_FILE, converters={"stop_sequence": eval})
+    return pd.read_parquet(EXTRACTED_ROUTES_FILE)
 
 
 def load_stop_names() -> pd.DataFrame:
@@ -0,0 +1,236 @@
+"""
+utils.py
+
+Shared helpers for the route extraction scripts.
+
+Trip stop sequences are held in CSR form (like a sparse matrix row layout)
+instead of one Python list per trip:
+- trip_ids, route_ids: one entry per trip
+- offsets:    int64, length n_trips + 1; trip i owns stop_index[offsets[i]:offsets[i + 1]]
+- stop_index: int32 positions into stop_ids, in stop_sequence order
+- stop_ids:   the distinct stop IDs
+- arrival_sec/departure_sec (optional): per stop event, aligned with stop_index
+
+Trips that serve the same ordered stop list share a stop pattern
+(build_stop_patterns), so per-route work can run once per pattern.
+
+On disk they are stored as Parquet with a native list<string> stop_sequence
+column, so no literal_eval/eval round-trip is needed.
+
+Author: Onur Deniz
+"""
+
+import numpy as np
+import logging
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+TIME_COLUMNS = ("arrival_sec", "departure_sec")
+
+# Bases of the two polynomial stop-sequence hashes (uint64 arithmetic wraps mod 2**64)
+PATTERN_HASH_BASES = (np.uint64(1_000_003), np.uint64(0x9E3779B97F4A7C15))
+
+
+def build_trip_sequences(stop_times: pd.DataFrame) -> dict:
+    """
+    Sorts stop_times once by (trip_id, stop_sequence) and returns CSR trip sequences.
+
+    Args:
+        stop_times (pd.DataFrame): Needs trip_id, route_id, stop_id, stop_sequence.
+            arrival_sec/departure_sec are carried along when present.
+
+    Returns:
+        dict: trip_ids, route_ids, offsets, stop_index, stop_ids (see module docstring).
+            Trips without a route_id (missing from trips.txt) are dropped.
+    """
+    orphans = stop_times["route_id"].isna()
+    if orphans.any():
+        logging.warning(
+            f"⚠️ Dropping {stop_times.loc[orphans, 'trip_id'].nunique():,} trips without a route_id "
+            f"({orphans.sum():,} stop_times rows)."
+        )
+        stop_times = stop_times[~orphans]
+    df = stop_times.sort_values(["trip_id", "stop_sequence"], kind="stable")
+    trip_codes, trip_ids = pd.factorize(df["trip_id"])
+    stop_index, stop_ids = pd.factorize(df["stop_id"])
+
+    starts = np.flatnonzero(np.r_[True, trip_codes[1:] != trip_codes[:-1]]) if len(df) else np.array([], dtype=np.int64)
+    offsets = np.r_[starts, len(df)].astype(np.int64)
+
+    seqs = {
+        "trip_ids": np.asarray(trip_ids, dtype=object),
+        "route_ids": df["route_id"].to_numpy(dtype=object)[starts],
+        "offsets": offsets,
+        "stop_index": stop_index.astype(np.int32),
+        "stop_ids": np.asarray(stop_ids, dtype=object),
+    }
+    for col in TIME_COLUMNS:
+        if col in df.columns:
+            seqs[col] = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+    return seqs
+
+
+def filter_trip_sequences(seqs: dict, keep: np.ndarray) -> dict:
+    """Keeps only the trips where keep is True, rebuilding offsets and stop_index."""
+    lengths = np.diff(seqs["offsets"])
+    row_mask = np.repeat(keep, lengths)
+    filtered = {
+        "trip_ids": seqs["trip_ids"][keep],
+        "route_ids": seqs["route_ids"][keep],
+        "offsets": np.r_[0, np.cumsum(lengths[keep])].astype(np.int64),
+        "stop_index": seqs["stop_index"][row_mask],
+        "stop_ids": seqs["stop_ids"],
+    }
+    for col in TIME_COLUMNS:
+        if col in seqs:
+            filtered[col] = seqs[col][row_mask]
+    return filtered
+
+
+def trip_sequences_to_table(seqs: dict) -> pa.Table:
+    """
+    Converts CSR trip sequences into an Arrow table with route_id, trip_id,
+    origin_stop_id, destination_stop_id and a list<string> stop_sequence column.
+    """
+    offsets = seqs["offsets"]
+    stop_ids = pa.array(seqs["stop_ids"], type=pa.string())
+    stop_values = stop_ids.take(pa.array(seqs["stop_index"]))
+    first = seqs["stop_index"][offsets[:-1]]
+    last = seqs["stop_index"][offsets[1:] - 1]
+
+    return pa.table({
+        "route_id": pa.array(seqs["route_ids"], type=pa.string()),
+        "trip_id": pa.array(seqs["trip_ids"], type=pa.string()),
+        "origin_stop_id": stop_ids.take(pa.array(first)),
+        "destination_stop_id": stop_ids.take(pa.array(last)),
+        "stop_sequence": pa.ListArray.from_arrays(pa.array(offsets, type=pa.int32()), stop_values),
+    })
+
+
+def write_trip_sequences(seqs: dict, path) -> None:
+    pq.write_table(trip_sequences_to_table(seqs), path)
+
+
+def read_trip_sequences(path) -> dict:
+    """Reads a trip sequence Parquet file back into CSR arrays without per-trip Python lists."""
+    table = pq.read_table(path)
+    sequences = table.column("stop_sequence").combine_chunks()
+    offsets = sequences.offsets.to_numpy().astype(np.int64)
+    offsets = offsets - offsets[0]
+    stop_index, stop_ids = pd.factorize(sequences.flatten().to_numpy(zero_copy_only=False))
+
+    return {
+        "trip_ids": table.column("trip_id").to_numpy(),
+        "route_ids": table.column("route_id").to_numpy(),
+        "offsets": offsets,
+        "stop_index": stop_index.astype(np.int32),
+        "stop_ids": np.asarray(stop_ids, dtype=object),
+    }
+
+
+def _sequence_hash(values, offsets, positions, base):
+    """Polynomial hash of every trip slice: sum(values[i] * base**position) mod 2**64."""
+    max_len = int(positions.max()) + 1
+    powers = np.ones(max_len, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        powers[1:] = np.cumprod(np.full(max_len - 1, base, dtype=np.uint64))
+        return np.add.reduceat(values * powers[positions], offsets[:-1])
+
+
+def build_stop_patterns(seqs: dict) -> dict:
+    """
+    Groups trips that serve the same ordered stop list into stop patterns.
+
+    Each trip slice is hashed twice (vectorized, no per-trip Python work);
+    trips with equal (hash1, hash2, length) share a pattern. Every trip is then
+    verified element-wise against its pattern representative, and the rare
+    hash collision falls back to exact byte keys.
+
+    Returns:
+        dict:
+            pattern_ids:  int64 per trip (numbered in first-appearance order)
+            pattern_trip: index of the representative (first) trip per pattern
+            n_trips:      number of trips per pattern
+    """
+    offsets = seqs["offsets"]
+    lengths = np.diff(offsets)
+    n_trips = len(lengths)
+    if n_trips == 0:
+        empty = np.array([], dtype=np.int64)
+        return {"pattern_ids": empty, "pattern_trip": empty, "n_trips": empty}
+
+    values = seqs["stop_index"].astype(np.uint64) + np.uint64(1)
+    trip_of_row = np.repeat(np.arange(n_trips), lengths)
+    positions = np.arange(len(values)) - offsets[:-1][trip_of_row]
+
+    keys = pd.DataFrame({
+        "h1": _sequence_hash(values, offsets, positions, PATTERN_HASH_BASES[0]),
+        "h2": _sequence_hash(values, offsets, positions, PATTERN_HASH_BASES[1]),
+        "length": lengths,
+    })
+    pattern_ids = keys.groupby(["h1", "h2", "length"], sort=False).ngroup().to_numpy()
+
+    # Exact verification against each pattern's first trip
+    _, pattern_trip = np.unique(pattern_ids, return_index=True)
+    rep_rows = offsets[pattern_trip[pattern_ids]][trip_of_row] + positions
+    if not np.array_equal(values, values[rep_rows]):
+        logging.warning("⚠️ Stop pattern hash collision detected. Falling back to exact keys.")
+        exact = {}
+        stop_index = seqs["stop_index"]
+        pattern_ids = np.array([
+            exact.setdefault(stop_index[offsets[i]:offsets[i + 1]].tobytes(), len(exact))
+            for i in range(n_trips)
+        ])
+        _, pattern_trip = np.unique(pattern_ids, return_index=True)
+
+    return {
+        "pattern_ids": pattern_ids.astype(np.int64),
+        "pattern_trip": pattern_trip.astype(np.int64),
+        "n_trips": np.bincount(pattern_ids).astype(np.int64),
+    }
+
+
+def trip_departures(seqs: dict) -> np.ndarray:
+    """First departure (seconds since service-day midnight) of every trip."""
+    return seqs["departure_sec"][seqs["offsets"][:-1]]
+
+
+def pattern_tables(seqs: dict, patterns: dict):
+    """
+    Builds the pattern index tables.
+
+    Returns:
+        tuple: (patterns_table, trips_table) as pa.Table
+            patterns_table: pattern_id, n_stops, n_trips, origin_stop_id,
+                            destination_stop_id, stop_sequence (list<string>),
+                            stop_offset_sec (list<double>, representative trip, if times present)
+            trips_table:    trip_id, route_id, pattern_id, departure_sec (if times present)
+    """
+    rep = patterns["pattern_trip"]
+    rep_seqs = filter_trip_sequences(seqs, np.isin(np.arange(len(seqs["trip_ids"])), rep))
+    # filter_trip_sequences keeps trip order, and representatives are first appearances,
+    # so rep_seqs is already ordered by pattern_id
+    # Patterns are route-agnostic; the route of each trip lives in trips_table
+    patterns_table = trip_sequences_to_table(rep_seqs).drop_columns(["route_id", "trip_id"])
+    patterns_table = patterns_table.add_column(0, "pattern_id", pa.array(np.arange(len(rep)), type=pa.int64()))
+    patterns_table = patterns_table.append_column("n_stops", pa.array(np.diff(rep_seqs["offsets"]), type=pa.int32()))
+    patterns_table = patterns_table.append_column("n_trips", pa.array(patterns["n_trips"], type=pa.int64()))
+
+    trips_columns = {
+        "trip_id": pa.array(seqs["trip_ids"], type=pa.string()),
+        "route_id": pa.array(seqs["route_ids"], type=pa.string()),
+        "pattern_id": pa.array(patterns["pattern_ids"], type=pa.int64()),
+    }
+
+    if "departure_sec" in seqs:
+        rep_offsets = rep_seqs["offsets"]
+        start = np.repeat(trip_departures(rep_seqs), np.diff(rep_offsets))
+        stop_offsets = rep_seqs["departure_sec"] - start
+        patterns_table = patterns_table.append_column(
+            "stop_offset_sec",
+            pa.ListArray.from_arrays(pa.array(rep_offsets, type=pa.int32()), pa.array(stop_offsets, from_pandas=True)),
+        )
+        trips_columns["departure_sec"] = pa.array(trip_departures(seqs), from_pandas=True)
+
+    return patterns_table, pa.table(trips_columns)
@@ -22,6 +22,7 @@ STOP_DURATION_MIN = 10  # seconds
 STOP_DURATION_MAX = 60  # seconds
 DEPARTURE_JITTER = 5     # ± seconds jitter
 STOP_OFFSET_JITTER = 2   # ± meters offset (not critical in SUMO rail)
+SEED = None              # Fixed seed -> reproducible realization
 
 # ─────────────────────────────────────────────────────────────
 # PATHS (adjust only if needed)
@@ -34,7 +35,8 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(me
 # ─────────────────────────────────────────────────────────────
 # Main logic
 # ─────────────────────────────────────────────────────────────
-def generate_randomized_routes():
+def generate_randomized_routes(seed=SEED):
+    rng = random.Random(seed)
     logging.info("📂 Loading selected inter-city route data...")
     df = pd.read_csv(INPUT_CSV)
 
@@ -55,8 +57,8 @@ def generate_randomized_routes():
         # Determine randomized headway
         if route_id not in time_counter:
             time_counter[route_id] = 0
-        depart_time = time_counter[route_id] + random.randint(-DEPARTURE_JITTER, DEPARTURE_JITTER)
-        headway = random.randint(HEADWAY_MIN, HEADWAY_MAX)
+        depart_time = time_counter[route_id] + rng.randint(-DEPARTURE_JITTER, DEPARTURE_JITTER)
+        headway = rng.randint(HEADWAY_MIN, HEADWAY_MAX)
         time_counter[route_id] += headway
 
         trip_elem = ET.SubElement(root, "trip", {
@@ -69,8 +71,8 @@ def generate_randomized_routes():
 
         # Add stop elements
         for _, row in group_sorted.iterrows():
-            duration = random.randint(STOP_DURATION_MIN, STOP_DURATION_MAX)
-            offset = round(random.uniform(-STOP_OFFSET_JITTER, STOP_OFFSET_JITTER), 2)
+            duration = rng.randint(STOP_DURATION_MIN, STOP_DURATION_MAX)
+            offset = round(rng.uniform(-STOP_OFFSET_JITTER, STOP_OFFSET_JITTER), 2)
             ET.SubElement(trip_elem, "stop", {
                 "busStop": row["stop_id"],
                 "duration": str(duration),
@@ -0,0 +1,204 @@
+"""
+traci_control.py
+
+TraCI-driven simulation runner with online KPI aggregation.
+
+Instead of writing FCD/tripinfo XML and parsing it afterwards, the runner
+folds KPIs into running accumulators while the simulation steps:
+- Each departing vehicle is subscribed once to speed, position, edge, stop
+  state, distance and time loss. Every step then fetches all values with one
+  getAllSubscriptionResults() call instead of per-vehicle getter calls. The
+  step loop is sumo_runner.run_simulation(), so BACKEND can be "traci" or the
+  in-process "libsumo".
+- Every update is O(1): Welford mean/variance, min and max per KPI (travel
+  time, delay, dwell, headway, speed). Dwell and headway are also kept per
+  stop edge. Headways below the HEADWAY_THRESHOLDS_SEC are counted as
+  violations.
+
+Output:
+- outputs/traci_kpis/kpi_summary.json (network-wide KPIs)
+- outputs/traci_kpis/station_kpis.csv (dwell and headway per stop edge)
+"""
+
+import os
+import json
+import math
+import logging
+import pandas as pd
+from sumo_runner import run_simulation, sumo_command
+import traci.constants as tc
+
+# --- Config ---
+BACKEND = "libsumo"  # "traci" for sumo-gui or remote control
+SUMO_CONFIG = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\april_2025_swiss\april_2025_swiss_mapped_kpis.sumocfg"
+OUTPUT_DIR = r"D:\PhD\codingPractices\progress-report-dec-2024\outputs\traci_kpis"
+END_TIME = 10000  # s; the run also stops when no vehicles are left
+
+HEADWAY_THRESHOLDS_SEC = (30, 60, 120, 180)  # As in april_2025/headway_engine.py
+STOPPED_BIT = 1  # Bit 0 of VAR_STOPSTATE: vehicle is stopped
+
+VEHICLE_VARS = (tc.VAR_SPEED, tc.VAR_POSITION, tc.VAR_ROAD_ID, tc.VAR_STOPSTATE, tc.VAR_DISTANCE, tc.VAR_TIMELOSS)
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+
+
+# -------------------------
+# Online accumulators
+# -------------------------
+
+def new_stats():
+    """Running count/mean/variance (Welford) with min and max."""
+    return {"n": 0, "mean": 0.0, "m2": 0.0, "min": math.inf, "max": -math.inf}
+
+
+def update_stats(stats, value):
+    stats["n"] += 1
+    delta = value - stats["mean"]
+    stats["mean"] += delta / stats["n"]
+    stats["m2"] += delta * (value - stats["mean"])
+    if value < stats["min"]:
+        stats["min"] = value
+    if value > stats["max"]:
+        stats["max"] = value
+
+
+def stats_summary(stats):
+    n = stats["n"]
+    return {
+        "n": n,
+        "mean": stats["mean"] if n else None,
+        "std": math.sqrt(stats["m2"] / (n - 1)) if n > 1 else None,
+        "min": stats["min"] if n else None,
+        "max": stats["max"] if n else None,
+    }
+
+
+def new_kpis():
+    return {
+        "travel_time": new_stats(),
+        "delay": new_stats(),
+        "route_length": new_stats(),
+        "speed": new_stats(),
+        "dwell": new_stats(),
+        "headway": new_stats(),
+        "headway_violations": {t: 0 for t in HEADWAY_THRESHOLDS_SEC},
+        "station_dwell": {},      # stop edge -> stats
+        "station_headway": {},    # stop edge -> stats
+        "last_stop_arrival": {},  # stop edge -> time of the latest stop start
+        "vehicles": {},           # vehicle -> {"depart", "stop_start", "stop_edge", "distance", "time_loss"}
+    }
+
+
+def on_depart(kpis, vehicle_id, time):
+    kpis["vehicles"][vehicle_id] = {"depart": time, "stop_start": None, "stop_edge": None, "distance": 0.0, "time_loss": 0.0}
+
+
+def on_update(kpis, vehicle_id, values, time):
+    """Folds one vehicle's subscription values of the current step into the KPIs."""
+    state = kpis["vehicles"].get(vehicle_id)
+    if state is None:
+        return
+    update_stats(kpis["speed"], values[tc.VAR_SPEED])
+    state["distance"] = values[tc.VAR_DISTANCE]
+    state["time_loss"] = values[tc.VAR_TIMELOSS]
+
+    stopped = values[tc.VAR_STOPSTATE] & STOPPED_BIT
+    if stopped and state["stop_start"] is None:
+        edge = values[tc.VAR_ROAD_ID]
+        state["stop_start"], state["stop_edge"] = time, edge
+
+        previous = kpis["last_stop_arrival"].get(edge)
+        kpis["last_stop_arrival"][edge] = time
+        if previous is not None:
+            headway = time - previous
+            update_stats(kpis["headway"], headway)
+            update_stats(kpis["station_headway"].setdefault(edge, new_stats()), headway)
+            for threshold in HEADWAY_THRESHOLDS_SEC:
+                if headway < threshold:
+                    kpis["headway_violations"][threshold] += 1
+    elif not stopped and state["stop_start"] is not None:
+        end_stop(kpis, state, time)
+
+
+def end_stop(kpis, state, time):
+    dwell = time - state["stop_start"]
+    update_stats(kpis["dwell"], dwell)
+    update_stats(kpis["station_dwell"].setdefault(state["stop_edge"], new_stats()), dwell)
+    state["stop_start"] = state["stop_edge"] = None
+
+
+def on_arrival(kpis, vehicle_id, time):
+    state = kpis["vehicles"].pop(vehicle_id, None)
+    if state is None:
+        return
+    if state["stop_start"] is not None:
+        end_stop(kpis, state, time)
+    update_stats(kpis["travel_time"], time - state["depart"])
+    update_stats(kpis["delay"], state["time_loss"])
+    update_stats(kpis["route_length"], state["distance"])
+
+
+def kpi_summary(kpis):
+    summary = {name: stats_summary(kpis[name]) for name in ("travel_time", "delay", "route_length", "speed", "dwell", "headway")}
+    summary["headway_violations"] = {f"below_{t}s": count for t, count in kpis["headway_violations"].items()}
+    summary["vehicles_running"] = len(kpis["vehicles"])
+    return summary
+
+
+def station_table(kpis):
+    edges = sorted(set(kpis["station_dwell"]) | set(kpis["station_headway"]))
+    rows = []
+    for edge in edges:
+        dwell = stats_summary(kpis["station_dwell"].get(edge, new_stats()))
+        headway = stats_summary(kpis["station_headway"].get(edge, new_stats()))
+        rows.append({
+            "station_edge": edge,
+            "n_stops": dwell["n"], "mean_dwell_sec": dwell["mean"], "max_dwell_sec": dwell["max"],
+            "n_headways": headway["n"], "min_headway_sec": headway["min"], "mean_headway_sec": headway["mean"],
+        })
+    return pd.DataFrame(rows)
+
+
+# -------------------------
+# Simulation loop
+# -------------------------
+
+def run_kpi_simulation(sumo_cmd, end_time=END_TIME, backend=BACKEND):
+    """
+    Runs SUMO and aggregates KPIs online.
+
+    Returns:
+        tuple: (KPI accumulators (see new_kpis()), run stats of sumo_runner.run_simulation())
+    """
+    kpis = new_kpis()
+
+    def on_step(time, departed, arrived, vehicle_values):
+        for vehicle_id in departed:
+            on_depart(kpis, vehicle_id, time)
+        for vehicle_id, values in vehicle_values.items():
+            on_update(kpis, vehicle_id, values, time)
+        for vehicle_id in arrived:
+            on_arrival(kpis, vehicle_id, time)
+
+    run_stats = run_simulation(sumo_cmd, on_step, vehicle_vars=VEHICLE_VARS, end_time=end_time, backend=backend)
+    return kpis, run_stats
+
+
+def main():
+    kpis, _ = run_kpi_simulation(sumo_command(SUMO_CONFIG))
+
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    summary = kpi_summary(kpis)
+    with open(os.path.join(OUTPUT_DIR, "kpi_summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    station_table(kpis).to_csv(os.path.join(OUTPUT_DIR, "station_kpis.csv"), index=False)
+
+    logging.info(
+        f"📊 Trips: {summary['travel_time']['n']:,} | mean travel time: {summary['travel_time']['mean']} s | "
+        f"mean delay: {summary['delay']['mean']} s | headways: {summary['headway']['n']:,}"
+    )
+    logging.info(f"💾 Saved KPIs to: {OUTPUT_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+trajectory_analytics.py
+
+Vectorized per-vehicle trajectory metrics for FCD data.
+
+All functions work on column arrays sorted by (vehicle, time) plus segment
+offsets: vehicle k owns rows offsets[k]:offsets[k + 1]. Per-sample quantities
+(step distance, acceleration, jerk) are computed with one np.diff over all
+vehicles, invalidated at segment starts, and reduced per vehicle with
+np.add.reduceat / np.maximum.reduceat. Speed percentiles come from one sort of
+packed (vehicle, speed) keys. No Python loop runs over vehicles or samples.
+
+Typical use:
+    sorted_store = vehicle_sorted(open_fcd_store(path))       # fcd_store.py
+    metrics = trajectory_metrics(sorted_store["offsets"], sorted_store["time"],
+                                 sorted_store["x"], sorted_store["y"], sorted_store["speed"])
+"""
+
+import numpy as np
+import pandas as pd
+
+STOP_SPEED = 0.1  # m/s; slower samples count as stopped
+SPEED_PERCENTILES = (50, 85, 95)
+BATCH_ROWS = 5_000_000  # Samples per batch in iter_vehicle_batches
+
+
+def iter_vehicle_batches(offsets, max_rows=BATCH_ROWS):
+    """Yields (first vehicle, last vehicle + 1) ranges covering about max_rows samples each."""
+    n_vehicles = len(offsets) - 1
+    first = 0
+    while first < n_vehicles:
+        last = int(np.searchsorted(offsets, offsets[first] + max_rows, side="right")) - 1
+        last = min(max(last, first + 1), n_vehicles)
+        yield first, last
+        first = last
+
+
+def _segment_diff(values, offsets):
+    """values[i] - values[i - 1] within each segment; NaN at segment starts."""
+    diff = np.empty(len(values), dtype=np.float64)
+    diff[0:1] = np.nan
+    np.subtract(values[1:], values[:-1], out=diff[1:], dtype=np.float64)
+    diff[offsets[:-1]] = np.nan
+    return diff
+
+
+def motion_profiles(offsets, time, speed):
+    """
+    Per-sample acceleration (m/s²) and jerk (m/s³) from consecutive speed samples.
+
+    Returns:
+        tuple: (dt, acceleration, jerk); NaN where a sample has no predecessor
+               (jerk needs two) within its vehicle.
+    """
+    dt = _segment_diff(time, offsets)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        acceleration = _segment_diff(speed, offsets) / dt
+        jerk = _segment_diff(acceleration, offsets) / dt
+    acceleration[~np.isfinite(acceleration)] = np.nan
+    jerk[~np.isfinite(jerk)] = np.nan
+    return dt, acceleration, jerk
+
+
+def _reduce(ufunc, values, offsets, empty):
+    """Per-segment reduction ignoring NaN (empty -> result for segments without valid values)."""
+    valid = ~np.isnan(values)
+    result = ufunc.reduceat(np.where(valid, values, empty), offsets[:-1])
+    return np.where(np.add.reduceat(valid, offsets[:-1]) > 0, result, np.nan)
+
+
+def _sortable_bits(values):
+    """Maps float32 values to uint32 keys with the same ordering."""
+    bits = np.ascontiguousarray(values, dtype=np.float32).view(np.uint32)
+    return np.where(bits >> 31, ~bits, bits | np.uint32(1 << 31))
+
+
+def _float_from_bits(keys):
+    """Inverse of _sortable_bits."""
+    keys = keys.astype(np.uint32)
+    return np.where(keys >> 31, keys & np.uint32(0x7FFFFFFF), ~keys).view(np.float32)
+
+
+def segment_percentiles(values, offsets, percentiles=SPEED_PERCENTILES):
+    """
+    Linear-interpolated percentiles of every segment (like np.percentile per vehicle),
+    at float32 precision (the FCD store precision of speeds).
+
+    All segments are sorted at once by sorting (segment << 32 | float bits) uint64
+    keys, which is several times faster than an argsort/lexsort.
+
+    Returns:
+        np.ndarray: (n_segments, len(percentiles))
+    """
+    n_segments = len(offsets) - 1
+    sizes = np.diff(offsets)
+    segment = np.repeat(np.arange(n_segments, dtype=np.uint64), sizes)
+    keys = np.sort((segment << np.uint64(32)) | _sortable_bits(values).astype(np.uint64))
+    sorted_values = _float_from_bits(keys & np.uint64(0xFFFFFFFF)).astype(np.float64)
+
+    q = np.asarray(percentiles, dtype=np.float64) / 100
+    position = (sizes[:, None] - 1) * q[None, :]
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(sizes[:, None] - 1, 0))
+    base = offsets[:-1, None]
+    low_values = sorted_values[base + lower]
+    high_values = sorted_values[base + upper]
+    return low_values + (high_values - low_values) * (position - lower)
+
+
+def trajectory_metrics(offsets, time, x, y, speed, stop_speed=STOP_SPEED, percentiles=SPEED_PERCENTILES):
+    """
+    Computes per-vehicle trajectory metrics in one vectorized pass.
+
+    Args:
+        offsets (np.ndarray): Segment offsets; vehicle k owns rows offsets[k]:offsets[k + 1].
+            Every vehicle must have at least one sample.
+        time, x, y, speed (np.ndarray): Samples sorted by (vehicle, time).
+        stop_speed (float): Samples slower than this count as stopped.
+        percentiles (tuple): Speed percentiles to report.
+
+    Returns:
+        pd.DataFrame: One row per vehicle: n_samples, total_distance (Euclidean, m),
+            total_time (s), avg_speed, max_speed, speed_p<q>, stopped_time (s),
+            max_acceleration, max_deceleration, rms_jerk, max_abs_jerk.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    if len(offsets) < 2:
+        return pd.DataFrame()
+    starts = offsets[:-1]
+    n_samples = np.diff(offsets)
+    speed = np.asarray(speed, dtype=np.float64)
+
+    step = np.hypot(_segment_diff(x, offsets), _segment_diff(y, offsets))
+    dt, acceleration, jerk = motion_profiles(offsets, time, speed)
+
+    # Time until the next sample is attributed to the current sample's state
+    dt_next = np.r_[dt[1:], np.nan]
+    dt_next[offsets[1:] - 1] = np.nan
+    stopped = np.where(speed < stop_speed, dt_next, np.nan)
+
+    metrics = {
+        "n_samples": n_samples,
+        "total_distance": np.nan_to_num(_reduce(np.add, step, offsets, 0.0)),
+        "total_time": np.asarray(time)[offsets[1:] - 1] - np.asarray(time)[starts],
+        "avg_speed": np.add.reduceat(speed, starts) / n_samples,
+        "max_speed": np.maximum.reduceat(speed, starts),
+    }
+    for q, values in zip(percentiles, segment_percentiles(speed, offsets, percentiles).T):
+        metrics[f"speed_p{q:g}"] = values
+    metrics["stopped_time"] = np.nan_to_num(_reduce(np.add, stopped, offsets, 0.0))
+    metrics["max_acceleration"] = _reduce(np.maximum, acceleration, offsets, -np.inf)
+    metrics["max_deceleration"] = -_reduce(np.minimum, acceleration, offsets, np.inf)
+
+    jerk_count = np.add.reduceat(~np.isnan(jerk), starts)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics["rms_jerk"] = np.sqrt(_reduce(np.add, np.square(jerk), offsets, 0.0) / jerk_count)
+    metrics["max_abs_jerk"] = _reduce(np.maximum, np.abs(jerk), offsets, -np.inf)
+    return pd.DataFrame(metrics)
@@ -1,8 +1,12 @@
-import pandas as pd
+import os
+import sys
 import matplotlib.pyplot as plt
 
-# Read the tripinfo.xml
-tripinfo_df = pd.read_xml("sumo/outputs/sw_real_comp/sw_comp_output_tripinfo.xml")
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "april_2025"))
+from sumo_output_reader import load_sumo_output
+
+# Read the tripinfo.xml (streamed into a cached Parquet table)
+tripinfo_df = load_sumo_output("sumo/outputs/sw_real_comp/sw_comp_output_tripinfo.xml", "tripinfo")
 
 
 # Basic Metrics
@@ -1,31 +1,44 @@
+import os
+import sys
 import xml.etree.ElementTree as ET
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "april_2025"))
+from network_connectivity import connectivity_report
 
 # Absolute paths for the node and edge files
 node_file = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\sw_real_samp\sw_real_samp.nod.xml"
 edge_file = r"D:\PhD\codingPractices\progress-report-dec-2024\sumo\inputs\sw_real_samp\sw_real_samp.edge.xml"
 
-# Parse XML files
-node_tree = ET.parse(node_file)
-edge_tree = ET.parse(edge_file)
-
 # Extract node IDs from the node file
-nodes = {node.attrib["id"] for node in node_tree.findall(".//node")}
+nodes = [node.attrib["id"] for _, node in ET.iterparse(node_file) if node.tag == "node"]
 
-# Extract edge references from the edge file
-edges = edge_tree.findall(".//edge")
-missing_nodes = set()
+def shape_wkt(shape):
+    """SUMO shape ("x1,y1 x2,y2 ...") as WKT; None without a shape."""
+    if not shape:
+        return None
+    return "LINESTRING (" + ", ".join(point.replace(",", " ") for point in shape.split()) + ")"
 
-for edge in edges:
-    from_node = edge.attrib.get("from")
-    to_node = edge.attrib.get("to")
-    if from_node not in nodes:
-        missing_nodes.add(from_node)
-    if to_node not in nodes:
-        missing_nodes.add(to_node)
+# Extract edge references (and shapes, for turning angles) from the edge file
+edges = pd.DataFrame(
+    [(edge.attrib.get("id"), edge.attrib.get("from"), edge.attrib.get("to"), shape_wkt(edge.attrib.get("shape")))
+     for _, edge in ET.iterparse(edge_file) if edge.tag == "edge"],
+    columns=["id", "from", "to", "geometry"],
+)
+
+report = connectivity_report(nodes, edges)
+summary = report["summary"]
+table = report["edges"]
 
 # Output results
+missing_nodes = set(edges["from"]).union(edges["to"]).difference(nodes)
 if missing_nodes:
     print("Missing nodes:")
-    print("\n".join(missing_nodes))
+    print("\n".join(sorted(map(str, missing_nodes))))
 else:
     print("All node references are valid.")
+
+print(f"Strongly connected components: {summary['n_components']} "
+      f"(largest: {summary['main_component_edges']} of {summary['n_edges']} edges)")
+print(f"Dead ends ({summary['dead_ends']}): " + ", ".join(table.loc[table["dead_end"], "id"].astype(str)))
+print(f"Entry-only edges ({summary['entries']}): " + ", ".join(table.loc[table["entry"], "id"].astype(str)))
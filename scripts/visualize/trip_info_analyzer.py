@@ -1,7 +1,11 @@
-import xml.etree.ElementTree as ET
+import os
+import sys
 import pandas as pd
 import matplotlib.pyplot as plt
 
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "april_2025"))
+from sumo_output_reader import load_sumo_output
+
 # Path to tripinfo-output file
 TRIPINFO_FILE = "D:\\PhD\\codingPractices\\progress-report-dec-2024\\sumo\\outputs\\sw_real_comp\\sw_comp_output.tripinfo.xml"
 
@@ -16,26 +20,16 @@ def parse_tripinfo(file_path):
     Returns:
         pd.DataFrame: A DataFrame containing parsed tripinfo data.
     """
-    data = []
     try:
-        tree = ET.parse(file_path)
-        root = tree.getroot()
-        for trip in root.findall("tripinfo"):
-            data.append({
-                "train_id": trip.get("id"),
-                "depart": float(trip.get("depart")),
-                "arrival": float(trip.get("arrival")),
-                "duration": float(trip.get("duration")),
-                "route_length": float(trip.get("routeLength")),
-                "stop_time": float(trip.get("stopTime")),
-                "CO2_abs": float(trip.find("emissions").get("CO2_abs")),
-                "fuel_abs": float(trip.find("emissions").get("fuel_abs")),
-            })
+        trips = load_sumo_output(
+            file_path, "tripinfo",
+            columns=["id", "depart", "arrival", "duration", "routeLength", "stopTime", "CO2_abs", "fuel_abs"],
+        )
     except Exception as e:
         print(f"Error parsing tripinfo file: {e}")
         return None
-    
-    return pd.DataFrame(data)
+
+    return trips.rename(columns={"id": "train_id", "routeLength": "route_length", "stopTime": "stop_time"})
 
 def plot_duration_vs_emissions(df):
     """
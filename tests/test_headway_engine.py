@@ -0,0 +1,44 @@
+import os
+import sys
+
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "april_2025"))
+from headway_engine import compute_headways, headway_distribution
+
+
+def stop_events(rows):
+    return pd.DataFrame(rows, columns=["train_id", "stop_edge", "arrival_time", "departure_time"])
+
+
+def test_distribution_without_repeated_stations_is_empty():
+    stops = stop_events([("t1", "A", 0.0, 30.0), ("t2", "B", 10.0, 40.0)])
+    summary = headway_distribution(compute_headways(stops))
+    assert summary.empty
+    assert {"station_edge", "direction", "n_headways", "headway_p50", "violations_60s"} <= set(summary.columns)
+
+
+def test_trains_with_different_stopping_patterns_share_the_stop_edge_stream():
+    # IC from X skips Y; the regional train stops at Y before reaching the same stop edge S
+    stops = stop_events([
+        ("ic", "X", 0.0, 10.0), ("ic", "S", 100.0, 130.0),
+        ("re", "Y", 50.0, 60.0), ("re", "S", 145.0, 175.0),
+        ("ir", "S", 0.0, 20.0),  # Starts at S
+    ])
+    headways = compute_headways(stops)
+    at_s = headways[headways["station_edge"] == "S"].sort_values("arrival_time")
+    assert at_s["headway_sec"].tolist()[1:] == [100.0, 45.0]
+    assert at_s["separation_sec"].tolist()[1:] == [80.0, 15.0]
+
+    summary = headway_distribution(headways).set_index("station_edge")
+    assert summary.loc["S", "n_headways"] == 2
+    assert summary.loc["S", "violations_60s"] == 1
+
+
+def test_reverse_edges_are_separate_unless_pooled():
+    stops = stop_events([("a", "S", 0.0, 10.0), ("b", "-S", 20.0, 30.0)])
+    assert compute_headways(stops)["headway_sec"].isna().all()
+
+    pooled = compute_headways(stops, by_direction=False)
+    assert set(pooled["station_edge"]) == {"S"}
+    assert pooled["headway_sec"].tolist()[1:] == [20.0]
@@ -0,0 +1,86 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from pyproj import Transformer
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "april_2025"))
+from edge_index import load_edge_index, nearest_edge_ids
+from map_matching import match_traces
+
+X0, Y0 = 2_600_000, 1_200_000  # Local origin in EPSG:2056
+
+# Main line e1 -> e2 -> e3 along y = 0, an unconnected siding s 8 m north of e2,
+# and an isolated edge iso 1 km away
+EDGES = {
+    "e1": ("A", "B", [(0, 0), (100, 0)]),
+    "e2": ("B", "C", [(100, 0), (200, 0)]),
+    "e3": ("C", "D", [(200, 0), (300, 0)]),
+    "s": ("S1", "S2", [(100, 8), (200, 8)]),
+    "iso": ("Y", "Z", [(0, 1000), (100, 1000)]),
+}
+CONNECTIONS = [("e1", "e2"), ("e2", "e3")]
+
+
+@pytest.fixture(scope="module")
+def network(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("net")
+    edge_file = folder / "edges.csv"
+    pd.DataFrame({
+        "edge_id_human": list(EDGES),
+        "geometry": [shapely.LineString([(X0 + x, Y0 + y) for x, y in coords]).wkt for _, _, coords in EDGES.values()],
+    }).to_csv(edge_file, index=False)
+
+    lines = ["<net>"]
+    for edge_id, (start, end, coords) in EDGES.items():
+        length = shapely.LineString(coords).length
+        lines.append(f'<edge id="{edge_id}" from="{start}" to="{end}">'
+                     f'<lane id="{edge_id}_0" index="0" speed="30" length="{length}"/></edge>')
+    for from_edge, to_edge in CONNECTIONS:
+        lines.append(f'<connection from="{from_edge}" to="{to_edge}" fromLane="0" toLane="0" dir="s" state="M"/>')
+    lines.append("</net>")
+    net_file = folder / "test.net.xml"
+    net_file.write_text("\n".join(lines), encoding="utf-8")
+
+    return load_edge_index(str(edge_file), use_cache=False), str(net_file)
+
+
+def trace(trace_id, xs, ys):
+    lon, lat = Transformer.from_crs("EPSG:2056", "EPSG:4326", always_xy=True).transform(
+        X0 + np.asarray(xs, dtype=float), Y0 + np.asarray(ys, dtype=float)
+    )
+    return pd.DataFrame({"trace_id": trace_id, "lon": lon, "lat": lat})
+
+
+def test_connected_track_wins_over_nearer_siding(network):
+    edge_index, net_file = network
+    # The middle points lie 3 m from the siding and 5 m from e2
+    xs, ys = [10, 50, 90, 120, 150, 180, 220, 260], [0, 0, 0, 5, 5, 5, 0, 0]
+    assert set(nearest_edge_ids(edge_index, shapely.points(np.c_[X0 + np.array(xs[3:6]), Y0 + np.array(ys[3:6])]))) == {"s"}
+
+    matched, report = match_traces(trace("main", xs, ys), edge_index, net_file, workers=1)
+    assert matched["main"] == (["e1", "e2", "e3"], 0)
+    assert report.set_index("trace_id").loc["main", ["n_points", "n_dropped_points", "n_breaks"]].tolist() == [8, 0, 0]
+
+
+def test_disconnected_gap_is_one_break_and_restarts_decoding(network):
+    edge_index, net_file = network
+    xs, ys = [10, 50, 90, 20, 60], [0, 0, 0, 1000, 1000]
+
+    matched, report = match_traces(trace("jump", xs, ys), edge_index, net_file, workers=1)
+    assert matched["jump"] == (["e1", "iso"], 1)
+    row = report.set_index("trace_id").loc["jump"]
+    assert row["n_breaks"] == 1
+    assert row["n_gaps"] == 1
+
+
+def test_points_without_candidate_edge_are_reported(network):
+    edge_index, net_file = network
+    xs, ys = [10, 150, 5000, 260], [0, 0, 5000, 0]
+
+    matched, report = match_traces(trace("lost", xs, ys), edge_index, net_file, workers=1)
+    assert matched["lost"] == (["e1", "e2", "e3"], 0)
+    assert report.set_index("trace_id").loc["lost", "n_dropped_points"] == 1
@@ -0,0 +1,51 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "april_2025"))
+import route_completion
+from route_completion import init_route_completion, edge_graph, complete_route, edge_path, reachable_edges
+
+# Main line e1 -> e2 -> e3 -> e4 (100 m each) and a branch e1 -> far -> e5,
+# where far is longer than SEARCH_LIMIT_METERS
+LANE_LENGTHS = {"e1": 100, "e2": 100, "e3": 100, "e4": 100, "far": 150_000, "e5": 100}
+CONNECTIONS = [("e1", "e2"), ("e2", "e3"), ("e3", "e4"), ("e1", "far"), ("far", "e5")]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def network(tmp_path_factory):
+    lines = ["<net>"]
+    for i, (edge_id, length) in enumerate(LANE_LENGTHS.items()):
+        lines.append(f'<edge id="{edge_id}" from="n{i}" to="n{i + 1}">'
+                     f'<lane id="{edge_id}_0" index="0" speed="30" length="{length}"/></edge>')
+    for from_edge, to_edge in CONNECTIONS:
+        lines.append(f'<connection from="{from_edge}" to="{to_edge}" fromLane="0" toLane="0" dir="s" state="M"/>')
+    lines.append("</net>")
+    net_file = tmp_path_factory.mktemp("net") / "test.net.xml"
+    net_file.write_text("\n".join(lines), encoding="utf-8")
+    init_route_completion(str(net_file))
+
+
+def test_stop_edges_are_connected_with_shortest_paths():
+    assert complete_route(["e1", "e3", "e3", "e4"]) == (["e1", "e2", "e3", "e4"], 0)
+    assert edge_path("e2", "e4") == ("e2", "e3", "e4")
+    assert edge_path("e4", "e1") is None
+
+
+def test_stops_beyond_the_search_limit_stay_unconnected():
+    assert LANE_LENGTHS["far"] > route_completion.SEARCH_LIMIT_METERS
+    assert complete_route(["e1", "e5"]) == (["e1", "e5"], 1)
+    assert edge_path("e1", "far") is None
+
+
+def test_reachable_edges_are_trimmed_to_the_limit():
+    nodes = edge_graph()["nodes"]
+
+    reached, dist = reachable_edges("e1", 250)
+    assert (np.diff(reached) > 0).all()  # map_matching.transition_scores searches the node indices
+    assert dict(zip(nodes[reached], dist)) == {"e1": 0, "e2": 100, "e3": 200}
+
+    reached, dist = reachable_edges("e1")
+    assert dict(zip(nodes[reached], dist)) == {"e1": 0, "e2": 100, "e3": 200, "e4": 300}
@@ -0,0 +1,89 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "scripts", "route_extraction"))
+import utils
+from utils import build_trip_sequences, build_stop_patterns, pattern_tables, write_trip_sequences, read_trip_sequences
+
+
+def stop_times(trips):
+    """trip_id -> (route_id, [stop_id, ...]) as a stop_times table."""
+    return pd.DataFrame(
+        [
+            (trip_id, route_id, stop_id, sequence)
+            for trip_id, (route_id, stop_ids) in trips.items()
+            for sequence, stop_id in enumerate(stop_ids, start=1)
+        ],
+        columns=["trip_id", "route_id", "stop_id", "stop_sequence"],
+    )
+
+
+TRIPS = {
+    "t1": ("r1", ["A", "B", "C"]),
+    "t2": ("r2", ["A", "B", "C"]),  # Same stops as t1 on another route
+    "t3": ("r1", ["A", "C", "B"]),  # Same stops, different order
+    "t4": ("r1", ["A", "B"]),       # Prefix of t1
+    "t5": ("r1", ["A", "B", "C", "C"]),
+}
+
+
+def test_identical_sequences_share_a_pattern():
+    seqs = build_trip_sequences(stop_times(TRIPS))
+    patterns = build_stop_patterns(seqs)
+    pattern_of = dict(zip(seqs["trip_ids"], patterns["pattern_ids"]))
+
+    assert pattern_of["t1"] == pattern_of["t2"]
+    assert len({pattern_of[t] for t in ("t1", "t3", "t4", "t5")}) == 4
+    assert patterns["n_trips"].tolist() == [2, 1, 1, 1]
+    assert patterns["pattern_trip"].tolist() == [0, 2, 3, 4]
+
+
+def test_hash_collision_is_resolved_by_verification(monkeypatch, caplog):
+    # Base 0 hashes only the first stop, so every same-length trip starting at A collides
+    monkeypatch.setattr(utils, "PATTERN_HASH_BASES", (np.uint64(0), np.uint64(0)))
+    seqs = build_trip_sequences(stop_times(TRIPS))
+    patterns = build_stop_patterns(seqs)
+    pattern_of = dict(zip(seqs["trip_ids"], patterns["pattern_ids"]))
+
+    assert pattern_of["t1"] == pattern_of["t2"]
+    assert pattern_of["t1"] != pattern_of["t3"]
+    assert len(set(patterns["pattern_ids"])) == 4
+    assert "hash collision" in caplog.text
+
+
+def test_pattern_tables_keep_representative_stops():
+    seqs = build_trip_sequences(stop_times(TRIPS))
+    patterns_table, trips_table = pattern_tables(seqs, build_stop_patterns(seqs))
+
+    assert patterns_table.column("stop_sequence").to_pylist() == [
+        ["A", "B", "C"], ["A", "C", "B"], ["A", "B"], ["A", "B", "C", "C"]
+    ]
+    assert patterns_table.column("n_trips").to_pylist() == [2, 1, 1, 1]
+    assert trips_table.column("pattern_id").to_pylist() == [0, 0, 1, 2, 3]
+
+
+def test_trip_sequences_round_trip(tmp_path):
+    seqs = build_trip_sequences(stop_times(TRIPS))
+    path = tmp_path / "trip_sequences.parquet"
+    write_trip_sequences(seqs, path)
+    loaded = read_trip_sequences(path)
+
+    assert loaded["trip_ids"].tolist() == list(TRIPS)
+    assert loaded["route_ids"].tolist() == [route_id for route_id, _ in TRIPS.values()]
+    assert loaded["offsets"].tolist() == seqs["offsets"].tolist()
+    assert [
+        loaded["stop_ids"][loaded["stop_index"][start:stop]].tolist()
+        for start, stop in zip(loaded["offsets"][:-1], loaded["offsets"][1:])
+    ] == [stop_ids for _, stop_ids in TRIPS.values()]
+
+
+def test_trips_without_route_are_dropped():
+    df = stop_times(TRIPS)
+    df.loc[df["trip_id"] == "t3", "route_id"] = np.nan  # Trip missing from trips.txt
+    seqs = build_trip_sequences(df)
+
+    assert seqs["trip_ids"].tolist() == ["t1", "t2", "t4", "t5"]
+    assert utils.trip_sequences_to_table(seqs).num_rows == 4